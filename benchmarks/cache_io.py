@@ -0,0 +1,87 @@
+"""ML-ENSEMBLE
+
+Benchmark of estimation cache write and read throughput.
+
+Fitted estimators are written to the estimation cache by each sub-learner
+and read back when the learner collects its sub-learners. This benchmark
+compares cache serialization settings on a random forest.
+
+Run from the command line ::
+
+    python cache_io.py
+
+For each setting, the benchmark prints the size of the cached estimator and
+the write and read throughput, measured against the size of the estimator
+pickled with the default protocol.
+"""
+
+import os
+import shutil
+import tempfile
+
+from mlens import config
+from mlens.utils import pickle_save, pickle_load, print_time
+from mlens.parallel.learner import IndexedEstimator
+
+from sklearn.datasets import make_friedman1
+from sklearn.ensemble import RandomForestRegressor
+from time import perf_counter
+
+SEED = 2017
+ROWS = int(1e5)
+REPEATS = 3
+
+SETTINGS = [('default', None, 0, None),
+            ('protocol 5', 5, 0, None),
+            ('protocol 5 + mmap', 5, 0, 'r'),
+            ('zlib 1', 5, 1, None),
+            ('gzip 1', 5, ('gzip', 1), None)]
+
+
+def run(obj, path, protocol, compress, mmap_mode):
+    """Time cache writes and reads with a given setting."""
+    config.set_protocol(protocol)
+    config.set_compress(compress)
+    config.set_mmap_mode(mmap_mode)
+
+    w = r = 0
+    for _ in range(REPEATS):
+        t0 = perf_counter()
+        pickle_save(obj, path)
+        w += perf_counter() - t0
+
+        t0 = perf_counter()
+        pickle_load(path)
+        r += perf_counter() - t0
+
+    return os.path.getsize(path + '.pkl') / 1e6, w / REPEATS, r / REPEATS
+
+
+if __name__ == '__main__':
+
+    print("\nML-ENSEMBLE\n")
+    print("Cache throughput benchmark for "
+          "RandomForestRegressor(n_estimators=100)\n")
+
+    X, y = make_friedman1(n_samples=ROWS, random_state=SEED)
+    est = RandomForestRegressor(n_estimators=100, random_state=SEED).fit(X, y)
+    obj = IndexedEstimator(est, 'rf', 0, None, None, None)
+
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'rf.0.0')
+    mb = run(obj, path, None, 0, None)[0]
+    print("Estimator size: %.1f MB\n" % mb)
+
+    print("%-20s | %10s | %13s | %13s" %
+          ('setting', 'size (MB)', 'write (MB/s)', 'read (MB/s)'))
+
+    t0 = perf_counter()
+    try:
+        for name, protocol, compress, mmap_mode in SETTINGS:
+            size, w, r = run(obj, path, protocol, compress, mmap_mode)
+            print("%-20s | %10.1f | %13.1f | %13.1f" %
+                  (name, size, mb / w, mb / r))
+    finally:
+        shutil.rmtree(tmp)
+
+    print_time(t0, "\nBenchmark done")
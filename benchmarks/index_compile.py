@@ -0,0 +1,121 @@
+"""ML-ENSEMBLE
+
+Benchmark of repeated fold index compilation across workers.
+
+Compiled fold indexes are cached per process (see
+:class:`~mlens.parallel._base_functions.IndexCache`). With the threading
+backend, every fold is compiled once. With the multiprocessing backend,
+workers store the index arrays they compile in the cache directory of the
+job, and load the folds compiled by other workers from there, so that a
+fold sliced by tasks in different workers is not compiled again.
+
+This benchmark fits a :class:`~mlens.ensemble.Subsemble` whose partitions
+are drawn at random, so that every fold is fragmented into many index
+ranges and compiles into an index array, which is the worst case for
+compilation. It records every compilation and prints, for each backend,
+the time to fit, the number of compilations, the number of distinct folds
+compiled, and the time spent compiling, in total and on folds already
+compiled by another worker.
+
+Run from the command line ::
+
+    python index_compile.py [rows]
+
+with ``rows`` the number of rows of the data (default ``10 ** 5``).
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+import mlens.parallel._base_functions as base_functions
+from mlens.ensemble import Subsemble
+from mlens.utils.dummy import OLS
+from time import perf_counter
+
+SEED = 2017
+COLS = 10
+PARTITIONS = 4
+FOLDS = 2
+ESTIMATORS = 8
+N_JOBS = 4
+
+LOG = os.path.join(tempfile.mkdtemp(), 'compile.log')
+_compile_index = base_functions.compile_index
+
+
+def compile_index(idx, r=0):
+    """Compile an index and record the process, fold and time taken"""
+    t0 = perf_counter()
+    index = _compile_index(idx, r)
+    t = perf_counter() - t0
+    with open(LOG, 'a') as f:
+        f.write('%i %i %f\n' % (os.getpid(), hash((tuple(idx), r)), t))
+    return index
+
+
+# Workers are forked with the recording compile function
+base_functions.compile_index = compile_index
+
+
+class RandomClusters(object):
+
+    """Assign rows to clusters at random"""
+
+    def __init__(self, n_clusters):
+        self.n_clusters = n_clusters
+
+    def fit(self, X, y=None):
+        """Vacuous"""
+        return self
+
+    def predict(self, X):
+        """Random cluster labels"""
+        rs = np.random.RandomState(SEED)
+        return rs.randint(self.n_clusters, size=X.shape[0])
+
+
+def run(backend, X, y):
+    """Fit a subsemble and summarize the compilations"""
+    open(LOG, 'w').close()
+    base_functions.INDEXES.clear()
+
+    ens = Subsemble(partitions=PARTITIONS,
+                    partition_estimator=RandomClusters(PARTITIONS),
+                    folds=FOLDS, backend=backend, n_jobs=N_JOBS)
+    ens.add([OLS(i) for i in range(ESTIMATORS)])
+
+    t0 = perf_counter()
+    ens.fit(X, y)
+    t = perf_counter() - t0
+
+    with open(LOG, 'r') as f:
+        records = [line.split() for line in f]
+
+    seen = set()
+    repeated = 0.
+    for _, key, ct in records:
+        if key in seen:
+            repeated += float(ct)
+        seen.add(key)
+    total = sum(float(ct) for _, _, ct in records)
+    workers = len(set(pid for pid, _, _ in records))
+    return t, len(records), len(seen), workers, total, repeated
+
+
+if __name__ == '__main__':
+    n = int(float(sys.argv[1])) if len(sys.argv) > 1 else 10 ** 5
+    X = np.random.RandomState(SEED).rand(n, COLS)
+    y = X.sum(axis=1)
+
+    print("\nML-ENSEMBLE\n")
+    print("Fold index compilation benchmark: Subsemble with %i random "
+          "partitions, %i folds, %i estimators, %i workers, %i rows\n"
+          % (PARTITIONS, FOLDS, ESTIMATORS, N_JOBS, n))
+    print("%15s | %8s | %8s | %8s | %7s | %11s | %12s"
+          % ('backend', 'fit (s)', 'compiles', 'folds', 'workers',
+             'compile (s)', 'repeated (s)'))
+    for backend in ['threading', 'multiprocessing']:
+        print("%15s | %8.2f | %8i | %8i | %7i | %11.3f | %12.3f"
+              % ((backend,) + run(backend, X, y)), flush=True)
@@ -0,0 +1,77 @@
+"""ML-ENSEMBLE
+
+Benchmark of fold index generation.
+
+Times fitting a :class:`~mlens.index.ClusteredSubsetIndex` and generating
+all its train and test folds, for data sets of increasing size. Cluster
+labels are drawn at random, so that every partition and fold is
+fragmented into many index ranges, which is the worst case for index
+generation.
+
+Run from the command line ::
+
+    python index_scaling.py [max_exponent]
+
+to time data sets of ``10 ** 4`` up to ``10 ** max_exponent`` rows (default
+``8``). Memory use grows linearly with the number of index ranges; peak
+memory is about 0.6 GB at ``10 ** 7`` rows, and 5 GB at ``10 ** 8`` rows.
+For each size, the benchmark prints the time and the time per million rows,
+which is constant if index generation scales linearly.
+"""
+import sys
+from collections import deque
+
+import numpy as np
+
+from mlens.index import ClusteredSubsetIndex
+from mlens.utils import print_time
+from time import perf_counter
+
+SEED = 2017
+PARTITIONS = 4
+FOLDS = 3
+
+
+class RandomClusters(object):
+
+    """Assign rows to clusters at random"""
+
+    def __init__(self, n_clusters):
+        self.n_clusters = n_clusters
+
+    def fit(self, X):
+        """Vacuous"""
+        return self
+
+    def predict(self, X):
+        """Random cluster labels"""
+        rs = np.random.RandomState(SEED)
+        return rs.randint(self.n_clusters, size=X.shape[0], dtype=np.int8)
+
+
+def run(n):
+    """Time index fitting and fold generation on n rows"""
+    X = np.empty((n, 0))
+    t0 = perf_counter()
+    idx = ClusteredSubsetIndex(RandomClusters(PARTITIONS), PARTITIONS, FOLDS)
+    idx.fit(X)
+    # Drop each fold before the next is generated
+    deque(idx.generate(), maxlen=0)
+    return perf_counter() - t0
+
+
+if __name__ == '__main__':
+    max_exp = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+
+    print("\nML-ENSEMBLE\n")
+    print("Index generation benchmark for ClusteredSubsetIndex "
+          "(%i partitions, %i folds)\n" % (PARTITIONS, FOLDS))
+    print("%12s | %10s | %14s" % ('rows', 'time (s)', 's / 1M rows'))
+
+    t0 = perf_counter()
+    for exp in range(4, max_exp + 1):
+        n = 10 ** exp
+        t = run(n)
+        print("%12i | %10.3f | %14.3f" % (n, t, t / n * 1e6))
+
+    print_time(t0, "\nBenchmark done")
@@ -0,0 +1,85 @@
+"""ML-ENSEMBLE
+
+Benchmark of longest-processing-time-first scheduling.
+
+Once an ensemble has been fitted, the recorded cost of each task is used to
+dispatch the longest tasks first. This benchmark fits a super learner where
+one estimator is much slower than the others, and where the slow estimator
+is added last, so that without cost history its tasks are dispatched last
+and run on their own at the end of the job.
+
+Estimators sleep instead of computing, so that the benchmark measures the
+schedule of a given number of workers independently of the number of
+available CPUs.
+
+Run from the command line ::
+
+    python lpt_schedule.py
+
+The benchmark prints the time to fit without cost history and the time to
+fit a new instance of the ensemble with the costs recorded during the first
+fit.
+"""
+
+import time
+import numpy as np
+
+from mlens.ensemble import SuperLearner
+from mlens.parallel.scheduler import COSTS
+from mlens.externals.sklearn.base import BaseEstimator
+from time import perf_counter
+
+N_JOBS = 4
+FOLDS = 2
+CHEAP = 9
+CHEAP_COST = 0.2
+HEAVY_COST = 1.5
+REPEATS = 3
+
+
+class Sleep(BaseEstimator):
+
+    """Estimator that sleeps for ``cost`` seconds when fitted"""
+
+    def __init__(self, cost=0.):
+        self.cost = cost
+
+    def fit(self, X, y):
+        time.sleep(self.cost)
+        return self
+
+    def predict(self, X):
+        return np.zeros(X.shape[0])
+
+
+def build():
+    """Super learner with cheap estimators and one heavy estimator last"""
+    ens = SuperLearner(folds=FOLDS, backend='threading', n_jobs=N_JOBS)
+    estimators = [('cheap-%i' % i, Sleep(CHEAP_COST)) for i in range(CHEAP)]
+    ens.add(estimators + [('heavy', Sleep(HEAVY_COST))])
+    return ens
+
+
+def fit(ens, X, y):
+    """Time to fit an ensemble"""
+    t0 = perf_counter()
+    ens.fit(X, y)
+    return perf_counter() - t0
+
+
+if __name__ == '__main__':
+
+    X, y = np.zeros((100, 2)), np.zeros(100)
+
+    print("\nML-ENSEMBLE\n")
+    print("LPT scheduling benchmark: %i estimators sleeping %.1fs and one "
+          "sleeping %.1fs, %i folds, %i workers\n"
+          % (CHEAP, CHEAP_COST, HEAVY_COST, FOLDS, N_JOBS))
+
+    for _ in range(REPEATS):
+        COSTS.clear()
+        t1 = fit(build(), X, y)
+
+        # A new instance is scheduled with the costs of the first fit
+        t2 = fit(build(), X, y)
+        print("First fit: %6.2fs | Refit: %6.2fs" % (t1, t2), flush=True)
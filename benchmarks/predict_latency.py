@@ -0,0 +1,72 @@
+"""ML-ENSEMBLE
+
+Benchmark of prediction latency.
+
+Predicting with a fitted ensemble builds one task per fitted estimator. This
+benchmark times :class:`~mlens.ensemble.SuperLearner.predict` on batches of
+a few rows, where the cost of handing fitted estimators to the tasks is
+large compared to the cost of predicting. Fitted estimators are random
+forests, for which copying the estimator is expensive.
+
+Run from the command line ::
+
+    python predict_latency.py
+
+For each backend, the benchmark prints the median and best latency over
+repeated calls.
+"""
+
+import numpy as np
+
+from mlens.ensemble import SuperLearner
+from mlens.utils import print_time
+
+from sklearn.datasets import make_friedman1
+from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor
+from sklearn.linear_model import LinearRegression
+from time import perf_counter
+
+SEED = 2017
+ROWS = int(1e4)
+BATCH = 10
+REPEATS = 20
+
+
+def build(backend):
+    """Fit a super learner with tree ensembles"""
+    ens = SuperLearner(folds=2, backend=backend, n_jobs=4,
+                       random_state=SEED)
+    ens.add([RandomForestRegressor(n_estimators=100, random_state=SEED),
+             ExtraTreesRegressor(n_estimators=100, random_state=SEED)])
+    ens.add_meta(LinearRegression())
+    return ens
+
+
+def run(ens, X):
+    """Time repeated predictions on a batch"""
+    times = list()
+    for _ in range(REPEATS):
+        t0 = perf_counter()
+        ens.predict(X)
+        times.append(perf_counter() - t0)
+    return np.median(times), np.min(times)
+
+
+if __name__ == '__main__':
+
+    print("\nML-ENSEMBLE\n")
+    print("Prediction latency benchmark for SuperLearner with two "
+          "tree ensembles (n_estimators=100)\n")
+
+    X, y = make_friedman1(n_samples=ROWS, random_state=SEED)
+
+    print("%-16s | %11s | %11s" % ('backend', 'median (ms)', 'best (ms)'))
+
+    t0 = perf_counter()
+    for backend in ['threading', 'multiprocessing']:
+        ens = build(backend)
+        ens.fit(X, y)
+        med, best = run(ens, X[:BATCH])
+        print("%-16s | %11.1f | %11.1f" % (backend, 1e3 * med, 1e3 * best))
+
+    print_time(t0, "\nBenchmark done")
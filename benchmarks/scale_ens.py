@@ -32,6 +32,10 @@ Sample size
      260000 SuperLearner : 0.252 (1226.66s) | BlendEnsemble : 0.273 (350.77s) | Subsemble : 0.279 (462.97s) |
 Benchmark done | 04:20:34
 
+Each ensemble is fitted twice: once without a cost history (tasks dispatched
+in build order) and once with the costs recorded by the first fit (longest
+tasks first). The second time is reported after ``LPT``.
+
 Plotting results...
 Figure written to /Users/Sebastian/Documents/python/mlens_dev/scale_benchmark2_time.png
 Figure written to /Users/Sebastian/Documents/python/mlens_dev/scale_benchmark2_score.png
@@ -45,13 +49,13 @@ import numpy as np
 from mlens.ensemble import SuperLearner, BlendEnsemble, Subsemble
 from mlens.utils import print_time
 from mlens.metrics import rmse
+from mlens.parallel.scheduler import COSTS
 
 from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.linear_model import Lasso, LinearRegression
 from sklearn.neural_network import MLPRegressor
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.svm import SVR
-from sklearn.base import clone
 from sklearn.datasets import make_friedman1
 from time import perf_counter
 import warnings
@@ -92,17 +96,14 @@ if __name__ == '__main__':
           "dimensioned up to (%i, %i)" % (MAX, COLS))
     print("Available CPUs: %i\n" % c)
     print('Ensemble architecture')
-    print("Num layers: %i" % ens[0].layers.n_layers)
-
-    for lyr in ens[0].layers.layers:
-        if int(lyr[-1]) == ens[0].layers.n_layers:
-            continue
+    print("Num layers: %i" % len(ens[0].layers))
 
+    for lyr in ens[0].layers[:-1]:
         print('%s | Estimators: %r.' %
-              (lyr, [e for e, _ in ens[0].layers.layers[lyr].estimators]))
+              (lyr.name, [lr.name for lr in lyr.learners]))
 
     print("%s | Meta Estimator: %s" %
-          ('layer-2', ens[0].layers.layers['layer-2'].estimators[0][0]))
+          (ens[0].layers[-1].name, ens[0].layers[-1].learners[0].name))
 
     print('\nSCORES (TIME TO FIT)')
     print('%11s' % 'Sample size', flush=True)
@@ -110,6 +111,7 @@ if __name__ == '__main__':
     ###########################################################################
     # ESTIMATION
     times = {kls().__class__.__name__: [] for kls in ENS}
+    times_lpt = {kls().__class__.__name__: [] for kls in ENS}
     scores = {kls().__class__.__name__: [] for kls in ENS}
 
     ts = perf_counter()
@@ -122,20 +124,30 @@ if __name__ == '__main__':
         X, y = make_friedman1(n_samples=s, n_features=COLS, random_state=SEED)
 
         # Iterate over ensembles with given number of cores
-        for e in ens:
-            name = e.__class__.__name__
-            e = clone(e)
+        for kls, kwd in zip(ENS, KWG):
+            name = kls.__name__
+            # No cost history: tasks are dispatched in build order
+            COSTS.clear()
+            e = build_ensemble(kls, n_jobs=-1, **kwd)
 
             t0 = perf_counter()
             e.fit(X[:q], y[:q])
             t1 = perf_counter() - t0
 
+            # Fit a new instance with recorded costs: longest tasks first
+            e = build_ensemble(kls, n_jobs=-1, **kwd)
+            t0 = perf_counter()
+            e.fit(X[:q], y[:q])
+            t2 = perf_counter() - t0
+
             sc = rmse(y[q:], e.predict(X[q:]))
 
             times[name].append(t1)
+            times_lpt[name].append(t2)
             scores[name].append(sc)
 
-            print('%s : %.3f (%6.2fs) |' % (name, sc, t1), end=" ", flush=True)
+            print('%s : %.3f (%6.2fs | LPT %6.2fs) |' % (name, sc, t1, t2),
+                  end=" ", flush=True)
         print()
 
     print_time(ts, "Benchmark done")
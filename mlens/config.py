@@ -26,6 +26,48 @@ Variables
 
 7. ``IVALS``: load exception handling interval. Default is ``(0.01, 120)``.
 
+8. ``STORAGE``: storage of input and prediction arrays when
+   ``backend != 'threading'``. One of ``'mmap'`` (memory-mapped files in
+   the cache) and ``'shm'`` (named shared memory segments, Python 3.8+).
+   Default is ``'mmap'``.
+
+9. ``INPUT_CACHE``: maximum number of input arrays kept materialized across
+   estimation calls when ``backend != 'threading'``. Inputs are matched on
+   content, so repeated calls on the same data skip the dump. Default is
+   ``0`` (disabled).
+
+10. ``PROTOCOL``: pickle protocol of cached estimators. With protocol ``5``
+    (Python 3.8+), numpy arrays are written out-of-band, next to the pickle
+    stream. Default is the ``pickle`` default protocol.
+
+11. ``COMPRESS``: compression of cached estimators, as ``[method]_[level]``
+    or ``[level]`` (``zlib``). Methods are those of the vendored
+    ``numpy_pickle`` compressors. Default is ``0`` (no compression).
+
+12. ``MMAP_MODE``: memory-map mode for loading out-of-band arrays of cached
+    estimators (i.e. ``PROTOCOL=5`` without compression). Default is no
+    memory-mapping.
+
+13. ``MEMO``: directory for persistent fit memoization. Sub-learners are
+    saved with their out-of-fold predictions, and restored instead of refit
+    in later runs with the same estimator, data, preprocessing and fold.
+    Default is ``''`` (disabled).
+
+14. ``THREADS``: thread budget, as ``[threads]_[n_jobs]``. The threads are
+    split between the workers of a job, and OpenMP and BLAS thread pools in
+    each worker are limited to its share. If ``n_jobs`` is ``1``, the
+    ``n_jobs`` parameters of estimators are also capped to the share.
+    Default is ``0`` (no limits).
+
+15. ``FOLD_CACHE``: whether preprocessing pipelines cache the folds they
+    transform during fitting, so that learners in the same preprocessing
+    case read the transformed folds instead of re-transforming them.
+    Default is ``0`` (disabled).
+
+16. ``PIPELINE_CACHE``: memory limit, in MB, of the per-process cache of
+    preprocessing pipelines loaded from disk by learners. Default is
+    ``128``. Set to ``0`` to disable.
+
 Environmental variables can be set by ::
 
     export MLENS_[VARIABLE]=VALUE
@@ -67,6 +109,29 @@ _VERBOSE = os.environ.get('MLENS_VERBOSE', 'Y')
 _IVALS = os.environ.get('MLENS_IVALS', '0.01_120').split('_')
 _IVALS = (float(_IVALS[0]), float(_IVALS[1]))
 
+_STORAGE = os.environ.get('MLENS_STORAGE', 'mmap')
+
+_INPUT_CACHE = int(os.environ.get('MLENS_INPUT_CACHE', 0))
+
+_PROTOCOL = os.environ.get('MLENS_PROTOCOL', '')
+_PROTOCOL = int(_PROTOCOL) if _PROTOCOL else None
+
+_COMPRESS = os.environ.get('MLENS_COMPRESS', '0').split('_')
+_COMPRESS = (_COMPRESS[0], int(_COMPRESS[1])) if len(_COMPRESS) == 2 else \
+    ('zlib', int(_COMPRESS[0]))
+
+_MMAP_MODE = os.environ.get('MLENS_MMAP_MODE', '') or None
+
+_MEMO = os.environ.get('MLENS_MEMO', '')
+
+_THREADS = os.environ.get('MLENS_THREADS', '0').split('_')
+_THREADS = (int(_THREADS[0]),
+            len(_THREADS) == 2 and bool(int(_THREADS[1])))
+
+_FOLD_CACHE = bool(int(os.environ.get('MLENS_FOLD_CACHE', '0')))
+
+_PIPELINE_CACHE = float(os.environ.get('MLENS_PIPELINE_CACHE', 128))
+
 _PY_VERSION = float(sysconfig._PY_VERSION_SHORT)
 
 
@@ -102,6 +167,51 @@ def get_tmpdir():
     """Return start method"""
     return _TMPDIR
 
+
+def get_storage():
+    """Return array storage"""
+    return _STORAGE
+
+
+def get_input_cache():
+    """Return input cache size"""
+    return _INPUT_CACHE
+
+
+def get_protocol():
+    """Return pickle protocol of cached estimators"""
+    return _PROTOCOL
+
+
+def get_compress():
+    """Return compression of cached estimators"""
+    return _COMPRESS
+
+
+def get_mmap_mode():
+    """Return memory-map mode of cached estimators"""
+    return _MMAP_MODE
+
+
+def get_memo():
+    """Return fit memoization directory"""
+    return _MEMO
+
+
+def get_threads():
+    """Return thread budget"""
+    return _THREADS
+
+
+def get_fold_cache():
+    """Return whether transformed folds are cached"""
+    return _FOLD_CACHE
+
+
+def get_pipeline_cache():
+    """Return memory limit of loaded pipeline cache, in MB"""
+    return _PIPELINE_CACHE
+
 ###############################################################################
 # Configuration calls
 
@@ -182,6 +292,174 @@ def set_ivals(interval, limit):
     _IVALS = (interval, limit)
 
 
+def set_storage(storage):
+    """Set the storage of input and prediction arrays during estimation.
+
+    Only applies to backends that do not share memory by default (i.e.
+    ``backend != 'threading'``).
+
+    Parameters
+    ----------
+    storage : str
+        storage type, one of 'mmap' (memory-mapped files in the estimation
+        cache) and 'shm' (named shared memory segments, requires Python 3.8+).
+    """
+    global _STORAGE
+    _STORAGE = storage
+
+
+def set_input_cache(size):
+    """Set the number of input arrays to keep materialized across calls.
+
+    When set, input arrays are fingerprinted and their memory-mapped files
+    (or shared memory segments) are re-used by subsequent calls on the same
+    data. The least recently used inputs are evicted once more than ``size``
+    arrays are held. Only applies if ``backend != 'threading'``.
+
+    Parameters
+    ----------
+    size : int
+        maximum number of input arrays to keep. Set to ``0`` to disable.
+    """
+    global _INPUT_CACHE
+    _INPUT_CACHE = size
+
+
+def set_protocol(protocol):
+    """Set the pickle protocol of cached estimators.
+
+    With protocol ``5`` (requires Python 3.8+) and no compression, numpy
+    arrays are written as raw buffers next to the pickle stream instead of
+    being copied into it, and can be memory-mapped when loaded (see
+    :func:`set_mmap_mode`).
+
+    Parameters
+    ----------
+    protocol : int, None
+        pickle protocol. Set to ``None`` for the default protocol, or ``-1``
+        for the highest protocol available.
+    """
+    global _PROTOCOL
+    _PROTOCOL = protocol
+
+
+def set_compress(compress):
+    """Set the compression of cached estimators.
+
+    Parameters
+    ----------
+    compress : int, tuple
+        compression level between 0 (no compression) and 9, or a tuple
+        ``(method, level)``, where method is one of 'zlib', 'gzip', 'bz2',
+        'lzma' and 'xz'. An integer level uses 'zlib'.
+    """
+    global _COMPRESS
+    if not isinstance(compress, tuple):
+        compress = ('zlib', int(compress))
+    _COMPRESS = compress
+
+
+def set_mmap_mode(mmap_mode):
+    """Set the memory-map mode for loading cached estimators.
+
+    Only applies to estimators cached with protocol 5 and no compression.
+    Arrays of loaded estimators are then views on the memory-mapped cache
+    file, and are read-only with ``mmap_mode='r'``.
+
+    Parameters
+    ----------
+    mmap_mode : str, None
+        one of 'r' (read-only) and 'c' (copy-on-write).
+        Set to ``None`` to read arrays into memory.
+    """
+    global _MMAP_MODE
+    _MMAP_MODE = mmap_mode
+
+
+def set_memo(path):
+    """Set the directory for persistent fit memoization.
+
+    When set, fitted sub-learners are saved to the directory together with
+    their out-of-fold predictions, keyed by a hash of the estimator
+    parameters, the input data, the fitted preprocessing pipeline and the
+    fold. Sub-learners with a matching entry are restored instead of refit,
+    so that re-running an ensemble after changing some of its learners
+    only refits the learners that changed. The directory persists across
+    runs and must be cleared manually.
+
+    Parameters
+    ----------
+    path : str
+        directory path. Created if it does not exist. Set to ``''`` to
+        disable memoization.
+    """
+    global _MEMO
+    _MEMO = path
+
+
+def set_threads(threads, n_jobs=False):
+    """Set the thread budget of parallel estimation.
+
+    Estimators parallelized with ``n_jobs``, or through a multi-threaded
+    BLAS, start threads of their own in each worker. With a budget, the
+    threads are split between the workers of a job, and the OpenMP and BLAS
+    thread pools of each worker are limited to its share, so that the total
+    number of threads matches the budget. Limiting thread pools requires
+    `threadpoolctl <https://github.com/joblib/threadpoolctl>`_.
+
+    Parameters
+    ----------
+    threads : int
+        number of threads, typically the number of cores. Set to ``0`` to
+        disable thread limits.
+
+    n_jobs : bool (default = False)
+        whether to also cap the ``n_jobs`` parameters of estimators and
+        transformers to the share of each worker.
+    """
+    global _THREADS
+    _THREADS = (threads, n_jobs)
+
+
+def set_fold_cache(fold_cache):
+    """Set whether to cache transformed folds during fitting.
+
+    When set, each preprocessing pipeline saves the training and test folds
+    it transforms to the estimation cache, next to the fitted pipeline.
+    Learners in the same preprocessing case then read the transformed folds
+    instead of loading the pipeline and transforming their fold. In a
+    cache directory, dense arrays are saved as ``.npy`` files and
+    memory-mapped on load, so that learners share the pages of the file.
+    Trades cache size for the transformation cost of every learner but
+    one.
+
+    Parameters
+    ----------
+    fold_cache : bool
+        whether to cache transformed folds.
+    """
+    global _FOLD_CACHE
+    _FOLD_CACHE = fold_cache
+
+
+def set_pipeline_cache(size):
+    """Set the memory limit of the cache of loaded pipelines.
+
+    Each process keeps the preprocessing pipelines it loads from disk, so
+    that a worker running several learners of the same preprocessing case
+    and fold unpickles the pipeline once. Pipelines are evicted in least
+    recently used order once the total size of their cache files exceeds
+    the limit.
+
+    Parameters
+    ----------
+    size : float
+        memory limit in MB. Set to ``0`` to disable.
+    """
+    global _PIPELINE_CACHE
+    _PIPELINE_CACHE = size
+
+
 def __get_default_start_method(method):
     """Determine default backend."""
     # Check for environmental variables
@@ -14,11 +14,17 @@ Base classes for ensemble layer management.
 from __future__ import division, print_function, with_statement
 
 from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager
 import warnings
 
+import numpy as np
+from scipy.sparse import issparse, vstack
+
 from .. import config
-from ..parallel import Layer, ParallelProcessing, make_group
+from ..parallel import Layer, ParallelProcessing, Session, make_group
 from ..parallel.base import BaseStacker
+from ..parallel.planner import plan
+from ..parallel.wrapper import AsyncMixin
 from ..externals.sklearn.validation import check_random_state
 from ..utils import (check_ensemble_build, check_inputs, print_time,
                      safe_print, IdTrain, format_name)
@@ -75,6 +81,73 @@ def print_job(lc, start_message):
     return f, t0
 
 
+def iter_chunks(n_samples, chunk_size):
+    """Generate row block boundaries.
+
+    Parameters
+    ----------
+    n_samples : int
+        number of rows.
+
+    chunk_size : int
+        number of rows per block. The last block may be smaller.
+    """
+    if chunk_size < 1:
+        raise ValueError(
+            "chunk_size must be a positive integer. Got %r" % chunk_size)
+    for start in range(0, n_samples, chunk_size):
+        yield start, min(start + chunk_size, n_samples)
+
+
+def assemble_chunks(chunks, n_samples):
+    """Write prediction blocks into an output array.
+
+    Dense blocks are written into a pre-allocated array so that only one
+    block needs to be held in memory in addition to the output. Sparse
+    blocks are stacked once all blocks have been generated.
+
+    Parameters
+    ----------
+    chunks : iterable
+        generator of prediction blocks. Each block is either an array or a
+        list of arrays.
+
+    n_samples : int
+        total number of rows.
+
+    Returns
+    -------
+    out : array-like or list
+        assembled prediction array(s).
+    """
+    out = list()
+    is_list = False
+    start = 0
+    for chunk in chunks:
+        is_list = isinstance(chunk, list)
+        if not is_list:
+            chunk = [chunk]
+
+        if not out:
+            out = [list() if issparse(p) else
+                   np.empty((n_samples,) + p.shape[1:], dtype=p.dtype)
+                   for p in chunk]
+
+        stop = start + chunk[0].shape[0]
+        for o, p in zip(out, chunk):
+            if isinstance(o, list):
+                o.append(p)
+            else:
+                o[start:stop] = p
+        start = stop
+
+    out = [vstack(o, format='csr') if isinstance(o, list) else o
+           for o in out]
+    if is_list:
+        return out
+    return out[0]
+
+
 ###############################################################################
 class Sequential(BaseStacker):
 
@@ -125,13 +198,43 @@ class Sequential(BaseStacker):
         name = format_name(name, 'sequential', GLOBAL_SEQUENTIAL_NAME)
         super(Sequential, self).__init__(
             stack=stack, name=name, verbose=verbose, **kwargs)
+        self._session = None
 
     def __iter__(self):
         """Generator for stacked layers"""
         for layer in self.stack:
             yield layer
 
-    def fit(self, X, y=None, **kwargs):
+    def session(self, n_jobs=None, backend=None):
+        """Start a long-lived worker pool for subsequent calls.
+
+        Until the session is closed, ``fit``, ``predict`` and ``transform``
+        run on the session's workers instead of starting a new pool for
+        every call. Use as a context manager, or call ``close`` on the
+        returned session to shut down the pool.
+
+        .. versionadded:: 0.2.3
+
+        Parameters
+        ----------
+        n_jobs : int, optional
+            Degree of concurrency. Defaults to the instance's ``n_jobs``.
+
+        backend : str, optional
+            Type of backend. Defaults to the instance's ``backend``.
+
+        Returns
+        -------
+        session : :class:`~mlens.parallel.backend.Session`
+            active session.
+        """
+        session = Session(backend if backend else self.backend,
+                          n_jobs if n_jobs else self.n_jobs,
+                          max(self.verbose - 4, 0))
+        self._session = session.open()
+        return session
+
+    def fit(self, X, y=None, memory_limit=None, **kwargs):
         r"""Fit instance.
 
         Iterative fits each layer in the stack on the output of
@@ -145,6 +248,15 @@ class Sequential(BaseStacker):
         y : array-like of shape = [n_samples, ]
             training labels.
 
+        memory_limit : int, str, optional
+            memory budget, in bytes or as a string such as ``'2GB'``. If
+            the estimated memory need of the job exceeds the limit, the job
+            is run with the backend and dtype chosen by
+            :func:`~mlens.ensemble.base.Sequential.plan`, or refused
+            with a ``MemoryError`` before fitting starts.
+
+            .. versionadded:: 0.2.3
+
         **kwargs : optional
             optional arguments to processor
        """
@@ -153,9 +265,12 @@ class Sequential(BaseStacker):
 
         f, t0 = print_job(self, "Fitting")
 
-        with ParallelProcessing(self.backend, self.n_jobs,
-                                max(self.verbose - 4, 0)) as manager:
-            out = manager.stack(self, 'fit', X, y, **kwargs)
+        with self._use_plan(X, y, 'fit', memory_limit) as (
+                backend, storage, _):
+            with ParallelProcessing(backend, self.n_jobs,
+                                    max(self.verbose - 4, 0), storage=storage,
+                                    session=self._session) as manager:
+                out = manager.stack(self, 'fit', X, y, **kwargs)
 
         if self.verbose:
             print_time(t0, "{:<35}".format("Fit complete"), file=f)
@@ -182,7 +297,7 @@ class Sequential(BaseStacker):
         """
         return self.fit(X, y, return_preds=True, **kwargs)
 
-    def predict(self, X, **kwargs):
+    def predict(self, X, chunk_size=None, memory_limit=None, **kwargs):
         r"""Predict.
 
         Parameters
@@ -190,6 +305,22 @@ class Sequential(BaseStacker):
         X : array-like of shape = [n_samples, n_features]
             input matrix to be used for prediction.
 
+        chunk_size : int, optional
+            number of rows to run through all layers at a time. Bounds the
+            size of intermediate prediction arrays to
+            ``[chunk_size, n_features]``. See
+            :func:`~mlens.ensemble.base.Sequential.predict_iter`.
+
+            .. versionadded:: 0.2.3
+
+        memory_limit : int, str, optional
+            memory budget, in bytes or as a string such as ``'2GB'``. Unless
+            ``chunk_size`` is set, the job is run with the chunk size and
+            backend chosen by :func:`~mlens.ensemble.base.Sequential.plan`,
+            or refused with a ``MemoryError`` before predicting.
+
+            .. versionadded:: 0.2.3
+
         **kwargs : optional
             optional keyword arguments.
 
@@ -201,15 +332,58 @@ class Sequential(BaseStacker):
         if not self.__fitted__:
             NotFittedError("Instance not fitted.")
 
+        if chunk_size:
+            # Chunk size takes precedence over the memory limit
+            memory_limit = None
+
         f, t0 = print_job(self, "Predicting")
 
-        out = self._predict(X, 'predict', **kwargs)
+        with self._use_plan(X, None, 'predict', memory_limit) as (
+                backend, storage, planned):
+            chunk_size = chunk_size if chunk_size else planned
+            if chunk_size:
+                out = assemble_chunks(
+                    self._predict_iter(
+                        X, chunk_size, backend, storage, **kwargs),
+                    X.shape[0])
+            else:
+                out = self._predict(X, 'predict', backend, storage, **kwargs)
 
         if self.verbose:
             print_time(t0, "{:<35}".format("Predict complete"),
                        file=f, flush=True)
         return out
 
+    def predict_iter(self, X, chunk_size, **kwargs):
+        r"""Predict in row blocks.
+
+        Runs blocks of ``chunk_size`` rows through all layers and yields the
+        final layer's predictions block by block. Memory use is bounded by
+        the block size regardless of the number of rows in ``X``.
+
+        .. versionadded:: 0.2.3
+
+        Parameters
+        -----------
+        X : array-like of shape = [n_samples, n_features]
+            input matrix to be used for prediction.
+
+        chunk_size : int
+            number of rows per block.
+
+        **kwargs : optional
+            optional keyword arguments.
+
+        Returns
+        -------
+        X_pred : generator
+            generator of prediction arrays of shape
+            ``[chunk_size, n_fitted_estimators]``.
+        """
+        if not self.__fitted__:
+            raise NotFittedError("Instance not fitted.")
+        return self._predict_iter(X, chunk_size, **kwargs)
+
     def transform(self, X, **kwargs):
         """Predict using sub-learners as is done during the ``fit`` call.
 
@@ -242,7 +416,73 @@ class Sequential(BaseStacker):
 
         return out
 
-    def _predict(self, X, job, **kwargs):
+    def plan(self, X, y=None, job='fit', memory_limit=None):
+        """Plan the memory and disk needs of a job.
+
+        Walks the stack using the shape of the prediction array each layer
+        would allocate, without running any estimation. While a session is
+        active, jobs run on the session's backend, so the plan keeps it. See
+        :func:`~mlens.parallel.planner.plan` for details.
+
+        .. versionadded:: 0.2.3
+
+        Parameters
+        ----------
+        X : array-like of shape = [n_samples, n_features]
+            input matrix. Only the shape and dtype are used.
+
+        y : array-like of shape = [n_samples, ], optional
+            training labels.
+
+        job : str (default = 'fit')
+            type of job. One of ``'fit'``, ``'predict'`` and
+            ``'transform'``.
+
+        memory_limit : int, str, optional
+            memory budget, in bytes or as a string such as ``'2GB'``. If
+            given, the plan is adjusted to fit the budget.
+
+        Returns
+        -------
+        plan : :class:`~mlens.parallel.planner.Plan`
+            estimated memory and disk needs, and the configuration to use.
+
+        Raises
+        ------
+        MemoryError :
+            if the job cannot fit the memory limit.
+        """
+        backend, n_jobs = self.backend, self.n_jobs
+        session = self._session is not None and self._session.active
+        if session:
+            # Jobs run on the session's workers
+            backend, n_jobs = self._session.backend, self._session.n_jobs
+        return plan(self, job, X, y, backend, n_jobs,
+                    memory_limit=memory_limit, keep_backend=session)
+
+    @contextmanager
+    def _use_plan(self, X, y, job, memory_limit):
+        """Context of a job run with a configuration that fits a memory limit.
+
+        Yields the backend, storage and chunk size to use. If the plan uses
+        a lower precision, layer dtypes are changed for the job only.
+        """
+        if memory_limit is None:
+            yield self.backend, None, None
+            return
+
+        p = self.plan(X, y, job, memory_limit)
+        dtypes = [layer.dtype for layer in self.stack]
+        if p.dtype is not None:
+            for layer in self.stack:
+                layer.dtype = p.dtype
+        try:
+            yield p.backend, p.storage, p.chunk_size
+        finally:
+            for layer, dtype in zip(self.stack, dtypes):
+                layer.dtype = dtype
+
+    def _predict(self, X, job, backend=None, storage=None, **kwargs):
         r"""Generic for processing a predict job through all layers.
 
         Parameters
@@ -253,6 +493,12 @@ class Sequential(BaseStacker):
         job : str
             type of prediction. Should be 'predict' or 'transform'.
 
+        backend : str, optional
+            backend to use. Defaults to the instance's backend.
+
+        storage : str, optional
+            array storage to use. Defaults to the global storage.
+
         Returns
         -------
         X_pred : array-like
@@ -261,8 +507,10 @@ class Sequential(BaseStacker):
             data.
         """
         r = kwargs.pop('return_preds', True)
-        with ParallelProcessing(self.backend, self.n_jobs,
-                                max(self.verbose - 4, 0)) as manager:
+        backend = backend if backend else self.backend
+        with ParallelProcessing(backend, self.n_jobs,
+                                max(self.verbose - 4, 0), storage=storage,
+                                session=self._session) as manager:
             out = manager.stack(self, job, X, return_preds=r, **kwargs)
 
         if not isinstance(out, list):
@@ -272,6 +520,39 @@ class Sequential(BaseStacker):
             out = out[0]
         return out
 
+    def _predict_iter(self, X, chunk_size, backend=None, storage=None,
+                      **kwargs):
+        """Generator for processing a predict job in row blocks."""
+        r = kwargs.pop('return_preds', True)
+
+        # Keep one worker pool for all blocks
+        session = self._session
+        if session is None or not session.active:
+            session = Session(backend if backend else self.backend,
+                              self.n_jobs, max(self.verbose - 4, 0)).open()
+            close = True
+        else:
+            close = False
+
+        try:
+            for start, stop in iter_chunks(X.shape[0], chunk_size):
+                with ParallelProcessing(
+                        storage=storage, session=session) as manager:
+                    out = manager.stack(self, 'predict', X[start:stop],
+                                        return_preds=r, **kwargs)
+
+                # Only drop the feature dimension: blocks can have one row
+                if not isinstance(out, list):
+                    out = [out]
+                out = [p[:, 0] if p.ndim == 2 and p.shape[1] == 1 else p
+                       for p in out]
+                if len(out) == 1:
+                    out = out[0]
+                yield out
+        finally:
+            if close:
+                session.close()
+
     @property
     def data(self):
         """Ensemble data"""
@@ -285,7 +566,7 @@ class Sequential(BaseStacker):
 
 
 ###############################################################################
-class BaseEnsemble(BaseEstimator):
+class BaseEnsemble(AsyncMixin, BaseEstimator):
 
     """BaseEnsemble class.
 
@@ -595,7 +876,7 @@ class BaseEnsemble(BaseEstimator):
         kwargs.pop('return_preds', None)
         return self.fit(X, y, return_preds=True)
 
-    def predict(self, X, **kwargs):
+    def predict(self, X, chunk_size=None, memory_limit=None, **kwargs):
         """Predict with fitted ensemble.
 
         Parameters
@@ -603,6 +884,22 @@ class BaseEnsemble(BaseEstimator):
         X : array-like, shape=[n_samples, n_features]
             input matrix to be used for prediction.
 
+        chunk_size : int, optional
+            number of rows to run through the ensemble at a time. Bounds the
+            size of intermediate prediction arrays. See
+            :func:`~mlens.ensemble.base.BaseEnsemble.predict_iter`.
+
+            .. versionadded:: 0.2.3
+
+        memory_limit : int, str, optional
+            memory budget, in bytes or as a string such as ``'2GB'``. Unless
+            ``chunk_size`` is set, predictions are made in the chunk size
+            and backend chosen by
+            :func:`~mlens.ensemble.base.BaseEnsemble.plan`. Raises a
+            ``MemoryError`` if no configuration fits the budget.
+
+            .. versionadded:: 0.2.3
+
         Returns
         -------
         pred : array-like or tuple, shape=[n_samples, n_features]
@@ -612,7 +909,102 @@ class BaseEnsemble(BaseEstimator):
             # No layers instantiated, but raise_on_exception is False
             return
         X, _ = check_inputs(X, check_level=self.array_check)
-        return self._backend.predict(X, **kwargs)
+        return self._backend.predict(
+            X, chunk_size=chunk_size, memory_limit=memory_limit, **kwargs)
+
+    def plan(self, X, y=None, job='fit', memory_limit=None):
+        """Plan the memory and disk needs of a job.
+
+        Estimates the peak memory and disk needs of a ``fit``, ``predict``
+        or ``transform`` call from the shapes of the prediction arrays of
+        each layer, without running any estimation. To fit or predict within
+        a memory budget, pass ``memory_limit`` to ``fit`` or ``predict``. ::
+
+            plan = ensemble.plan(X, y, memory_limit='1GB')
+            print(plan.memory, plan.disk)
+
+        .. versionadded:: 0.2.3
+
+        Parameters
+        ----------
+        X : array-like, shape=[n_samples, n_features]
+            input matrix. Only the shape and dtype are used.
+
+        y : array-like, shape=[n_samples, ], optional
+            training labels.
+
+        job : str (default = 'fit')
+            type of job to plan for.
+
+        memory_limit : int, str, optional
+            memory budget, in bytes or as a string such as ``'2GB'``.
+
+        Returns
+        -------
+        plan : :class:`~mlens.parallel.planner.Plan`
+            estimated memory and disk needs, and the configuration to use.
+        """
+        if not check_ensemble_build(self._backend):
+            # No layers instantiated, but raise_on_exception is False
+            return
+        return self._backend.plan(X, y, job, memory_limit)
+
+    def session(self, n_jobs=None, backend=None):
+        """Start a long-lived worker pool for subsequent calls.
+
+        Keeps the ensemble's workers alive across ``fit``, ``predict`` and
+        ``transform`` calls, and across layers, until the session is closed.
+        Use as a context manager, or call ``close`` on the returned session
+        to shut down the pool. ::
+
+            with ensemble.session(n_jobs=16):
+                for X in batches:
+                    ensemble.predict(X)
+
+        .. versionadded:: 0.2.3
+
+        Parameters
+        ----------
+        n_jobs : int, optional
+            Degree of concurrency. Defaults to the ensemble's ``n_jobs``.
+
+        backend : str, optional
+            Type of backend. Defaults to the ensemble's ``backend``.
+
+        Returns
+        -------
+        session : :class:`~mlens.parallel.backend.Session`
+            active session.
+        """
+        return self._backend.session(n_jobs, backend)
+
+    def predict_iter(self, X, chunk_size, **kwargs):
+        """Predict with fitted ensemble in row blocks.
+
+        Yields predictions for blocks of ``chunk_size`` rows, keeping memory
+        bounded regardless of the size of ``X``.
+
+        .. versionadded:: 0.2.3
+
+        Parameters
+        ----------
+        X : array-like, shape=[n_samples, n_features]
+            input matrix to be used for prediction.
+
+        chunk_size : int
+            number of rows per block.
+
+        Returns
+        -------
+        pred : generator
+            generator of prediction arrays of shape
+            ``[chunk_size, n_features]``.
+        """
+        if not check_ensemble_build(self._backend):
+            # No layers instantiated, but raise_on_exception is False
+            return iter(())
+        X, _ = check_inputs(X, check_level=self.array_check)
+        return self._backend.predict_iter(X, chunk_size, **kwargs)
 
     def predict_proba(self, X, **kwargs):
         """Predict class probabilities with fitted ensemble.
@@ -1,5 +1,6 @@
 """ML-ENSEMBLE
 """
+import sys
 import numpy as np
 from mlens.ensemble import (SequentialEnsemble,
                             SuperLearner,
@@ -7,6 +8,8 @@ from mlens.ensemble import (SequentialEnsemble,
                             Subsemble)
 
 from mlens.ensemble.base import Sequential
+from mlens.index import SubsampledFoldIndex
+from mlens.utils.dummy import OLS
 from mlens.testing.dummy import (Data,
                                  PREPROCESSING,
                                  ESTIMATORS,
@@ -121,3 +124,142 @@ def test_equivalence_subsemble():
     P = seq.fit(X, y).predict(X)
 
     np.testing.assert_array_equal(P, F)
+
+
+def test_predict_chunks_seq():
+    """[Sequential] Test chunked multilayer prediction."""
+    seq.fit(X, y)
+    P = seq.predict(X)
+    C = seq.predict(X, chunk_size=5)
+    np.testing.assert_array_equal(P, C)
+
+    blocks = list(seq.predict_iter(X, 5))
+    assert len(blocks) == 5
+    assert blocks[-1].shape[0] == 4
+    np.testing.assert_array_equal(P, np.vstack(blocks))
+
+
+def test_predict_chunks():
+    """[SequentialEnsemble] Test chunked multilayer prediction."""
+    ens = SequentialEnsemble()
+    ens.add('stack', ESTIMATORS, PREPROCESSING, dtype=np.float64)
+    ens.add('blend', ECM, dtype=np.float64)
+    ens.add('subsemble', ECM, dtype=np.float64)
+    ens.fit(X, y)
+
+    P = ens.predict(X)
+    C = ens.predict(X, chunk_size=7)
+    np.testing.assert_array_equal(P, C)
+
+
+def test_memory_limit():
+    """[SequentialEnsemble] Test prediction within a memory limit."""
+    ens = SequentialEnsemble()
+    ens.add('stack', ESTIMATORS, PREPROCESSING, dtype=np.float64)
+    ens.add('blend', ECM, dtype=np.float64)
+    ens.fit(X, y)
+    P = ens.predict(X)
+
+    limit = ens.plan(X, job='predict').memory // 2
+    p = ens.plan(X, job='predict', memory_limit=limit)
+    assert p.memory <= limit
+    assert p.chunk_size or p.backend == 'multiprocessing'
+    np.testing.assert_array_equal(P, ens.predict(X, memory_limit=limit))
+    np.testing.assert_raises(MemoryError, ens.predict, X, memory_limit=1)
+
+
+def test_memory_limit_dtype():
+    """[SequentialEnsemble] Test reduced precision is used for a job only."""
+    ens = SequentialEnsemble(backend='multiprocessing', n_jobs=1)
+    ens.add('stack', ESTIMATORS, PREPROCESSING, dtype=np.float64)
+    ens.add('blend', ECM, dtype=np.float64)
+
+    # Folds of the first layer's predictions dominate narrow inputs
+    limit = ens.plan(X[:, :1], y).memory - 1
+    assert ens.plan(X[:, :1], y, memory_limit=limit).dtype == np.float32
+
+    P = ens.fit(X[:, :1], y, memory_limit=limit, return_preds=True)
+    assert P.dtype == np.float32
+    assert all(layer.dtype == np.float64 for layer in ens._backend.stack)
+    assert ens.predict(X[:, :1]).dtype == np.float64
+
+
+def test_session():
+    """[SequentialEnsemble] Test prediction in a session."""
+    ens = SequentialEnsemble(backend='multiprocessing')
+    ens.add('stack', ESTIMATORS, PREPROCESSING, dtype=np.float64)
+    ens.add('blend', ECM, dtype=np.float64)
+    P = ens.fit(X, y).predict(X)
+
+    with ens.session(n_jobs=2) as session:
+        assert session.active
+        np.testing.assert_array_equal(P, ens.predict(X))
+        np.testing.assert_array_equal(P, ens.predict(X, chunk_size=5))
+    assert not session.active
+    np.testing.assert_array_equal(P, ens.predict(X))
+
+
+def test_async():
+    """[SequentialEnsemble] Test awaitable prediction in a session."""
+    if sys.version_info < (3, 7):
+        return
+    import asyncio
+
+    ens = SequentialEnsemble(backend='multiprocessing')
+    ens.add('stack', ESTIMATORS, PREPROCESSING, dtype=np.float64)
+    ens.add('blend', ECM, dtype=np.float64)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        out = loop.run_until_complete(ens.fit_async(X, y))
+        assert out is ens
+        P = ens.predict(X)
+        with ens.session(n_jobs=2):
+            preds = loop.run_until_complete(asyncio.gather(
+                *[ens.predict_async(X) for _ in range(4)]))
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+    for p in preds:
+        np.testing.assert_array_equal(P, p)
+
+
+def test_window():
+    """[SequentialEnsemble] Test time series window layers."""
+    ens = SequentialEnsemble()
+    ens.add('rolling', [OLS()], train_size=4, folds=3, gap=1,
+            dtype=np.float64)
+    ens.add('expanding', [OLS()], folds=2, dtype=np.float64)
+    out = ens.fit_transform(X, y)
+
+    # First layer predicts the last 3 windows of 6 observations
+    P = np.zeros(18)
+    for i, start in enumerate(range(6, 24, 6)):
+        P[6 * i:6 * (i + 1)] = OLS().fit(
+            X[start - 5:start - 1], y[start - 5:start - 1]
+        ).predict(X[start:start + 6])
+
+    # Second layer is fitted on targets rebased to the first layer output
+    P, z = P.reshape(-1, 1), y[6:]
+    Q = np.zeros(12)
+    for i, start in enumerate(range(6, 18, 6)):
+        Q[6 * i:6 * (i + 1)] = OLS().fit(
+            P[:start], z[:start]).predict(P[start:start + 6])
+
+    np.testing.assert_allclose(out.ravel(), Q)
+
+
+def test_subsampled():
+    """[SequentialEnsemble] Test subsampled fold layer."""
+    ens = SequentialEnsemble()
+    ens.add('subsampled', [OLS()], folds=3, train_size=6, block_size=2,
+            random_state=1, dtype=np.float64)
+    out = ens.fit_transform(X, y)
+
+    P = np.zeros(LEN)
+    idx = SubsampledFoldIndex(3, 6, 2, random_state=1, X=X)
+    for tri, tei in idx.generate(as_array=True):
+        assert tri.size == 6
+        P[tei] = OLS().fit(X[tri], y[tri]).predict(X[tei])
+    np.testing.assert_allclose(out.ravel(), P)
@@ -10,13 +10,14 @@ standard estimators.
 """
 from ..parallel import Layer, make_group
 from ..parallel.base import ParamMixin
-from ..parallel.wrapper import EstimatorMixin
+from ..parallel.wrapper import EstimatorMixin, AsyncMixin
 from ..parallel._base_functions import check_stack
 from ..externals.sklearn.base import BaseEstimator as _BaseEstimator
 from ..externals.sklearn.base import clone, TransformerMixin
 
 
-class BaseEstimator(EstimatorMixin, ParamMixin, _BaseEstimator):
+class BaseEstimator(AsyncMixin, EstimatorMixin, ParamMixin,
+                    _BaseEstimator):
 
     """Base class for estimators
 
@@ -2,6 +2,7 @@
 
 Test classes.
 """
+import sys
 import numpy as np
 from mlens.index import FoldIndex
 from mlens.utils.dummy import OLS, Scale
@@ -103,3 +104,24 @@ if run_sklearn:
     def test_learner():
         """[Module | LearnerEstimator] test pass estimator checks"""
         check_estimator(Tmp)
+
+
+def test_learner_async():
+    """[Module | LearnerEstimator] test awaitable calls"""
+    if sys.version_info < (3, 7):
+        return
+    import asyncio
+
+    e = LearnerEstimator(OLS(), FoldIndex(), dtype=np.float64)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        out = loop.run_until_complete(e.fit_async(X, y))
+        assert out is e
+        p, t = loop.run_until_complete(asyncio.gather(
+            e.predict_async(X), e.transform_async(X)))
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+    np.testing.assert_array_equal(p, P[:, [0]])
+    np.testing.assert_array_equal(t, F[:, [0]])
@@ -9,27 +9,36 @@ ML-Ensemble indexers generates list of tuples, as opposed to array indexes,
 to avoid serialization during multiprocessing.
 """
 
-from .base import FullIndex, BaseIndex, prune_train, make_tuple, partition
-from .fold import FoldIndex
+from .base import (FullIndex, BaseIndex, prune_train, make_tuple, partition,
+                   compile_index)
+from .fold import FoldIndex, SubsampledFoldIndex
 from .blend import BlendIndex
 from .subsemble import SubsetIndex, ClusteredSubsetIndex
+from .window import ExpandingWindowIndex, RollingWindowIndex
 
 
 INDEXERS = {'stack': FoldIndex,
             'blend': BlendIndex,
             'subsemble': SubsetIndex,
             'clusteredsubsemble': ClusteredSubsetIndex,
-            'full': FullIndex
+            'full': FullIndex,
+            'expanding': ExpandingWindowIndex,
+            'rolling': RollingWindowIndex,
+            'subsampled': SubsampledFoldIndex
             }
 
 
 __all__ = ['BaseIndex',
            'BlendIndex',
            'FoldIndex',
+           'SubsampledFoldIndex',
            'SubsetIndex',
            'FullIndex',
            'ClusteredSubsetIndex',
+           'ExpandingWindowIndex',
+           'RollingWindowIndex',
            'prune_train',
            'partition',
-           'make_tuple'
+           'make_tuple',
+           'compile_index'
            ]
@@ -81,3 +81,43 @@ def check_subsample_index(n_samples, partitions, folds, raise_):
     if s > n_samples:
         raise ValueError("Number of total splits %i is greater than the "
                          "number of samples: %i." % (s, n_samples))
+
+
+def check_window_index(n_samples, folds, n_test, n_train, gap):
+    """Check that time series windows can be constructed."""
+    for name, val in zip(('folds', 'gap'), (folds, gap)):
+        if not isinstance(val, Integral):
+            raise ValueError("'%s' must be an integer. "
+                             "type(%s) was passed." % (name, type(val)))
+
+    if folds < 1:
+        raise ValueError("Need at least 1 fold to create test windows. "
+                         "Got %i." % folds)
+
+    if gap < 0:
+        raise ValueError("'gap' must be non-negative. Got %i." % gap)
+
+    if n_test < 1:
+        raise ValueError("The test window size is 0 with current selection: "
+                         "cannot create test windows (total samples size: "
+                         "%i)." % n_samples)
+
+    n_first = n_samples - folds * n_test - gap
+    if n_train < 1 or n_train > n_first:
+        raise ValueError("Cannot create training windows of %i samples: "
+                         "%i samples precede the first test window after "
+                         "a gap of %i (%i test windows of %i samples, "
+                         "total samples size: %i)." %
+                         (n_train, max(n_first, 0), gap, folds, n_test,
+                          n_samples))
+
+
+def check_sampled_index(train_size, n_train, n_block):
+    """Check that training sets can be subsampled."""
+    if n_train < 1:
+        raise ValueError("The train set size is 0 with current selection "
+                         "(%r): cannot subsample training sets." % train_size)
+
+    if not isinstance(n_block, Integral) or n_block < 1:
+        raise ValueError("'block_size' must be a positive integer. "
+                         "Got %r." % n_block)
@@ -85,6 +85,76 @@ def partition(n, p):
     return sizes
 
 
+def make_ranges(arr, dtype=np.int64):
+    """Run-length encode an index array into ``(start, stop)`` ranges
+
+    Parameters
+    ----------
+    arr : array
+        sorted index array.
+
+    dtype : obj (default = np.int64)
+        dtype of the ranges.
+
+    Returns
+    -------
+    out : array of shape [n_ranges, 2]
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mlens.index.base import make_ranges
+    >>> make_ranges(np.array([0, 1, 2, 5, 6, 8, 9, 10])).tolist()
+    [[0, 3], [5, 7], [8, 11]]
+    """
+    arr = np.asarray(arr)
+    if not arr.size:
+        return np.empty((0, 2), dtype=dtype)
+
+    # Runs break where the index jumps by more than one
+    breaks = np.flatnonzero(np.diff(arr) > 1) + 1
+    out = np.empty((breaks.size + 1, 2), dtype=dtype)
+    out[:, 0] = arr[np.r_[0, breaks]]
+    out[:, 1] = arr[np.r_[breaks - 1, arr.size - 1]] + 1
+    return out
+
+
+def mask_ranges(mask, dtype=np.int64):
+    """Run-length encode the ``True`` entries of a mask into ranges
+
+    Equivalent to ``make_ranges(np.flatnonzero(mask))``, without building
+    the index array.
+
+    Parameters
+    ----------
+    mask : array of bool
+
+    dtype : obj (default = np.int64)
+        dtype of the ranges.
+
+    Returns
+    -------
+    out : array of shape [n_ranges, 2]
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mlens.index.base import mask_ranges
+    >>> mask_ranges(np.array([True, True, False, True])).tolist()
+    [[0, 2], [3, 4]]
+    """
+    # Ranges start and stop where the padded mask flips
+    padded = np.zeros(mask.shape[0] + 2, dtype=np.int8)
+    padded[1:-1] = mask
+    edges = np.flatnonzero(np.diff(padded))
+    return edges.reshape(-1, 2).astype(dtype, copy=False)
+
+
+def as_tuples(ranges):
+    """List of index tuples from an array of ranges"""
+    return list(zip(ranges[:, 0].tolist(), ranges[:, 1].tolist()))
+
+
 def make_tuple(arr):
     """Make a list of index tuples from array
 
@@ -103,18 +173,55 @@ def make_tuple(arr):
     >>> _make_tuple(np.array([0, 1, 2, 5, 6, 8, 9, 10]))
     [(0, 3), (5, 7), (8, 11)]
     """
-    out = list()
-    t1 = t0 = arr[0]
-    for i in arr[1:]:
-        if i - t1 <= 1:
-            t1 = i
-            continue
+    return as_tuples(make_ranges(arr))
 
-        out.append((t0, t1 + 1))
-        t1 = t0 = i
 
-    out.append((t0, t1 + 1))
-    return out
+# Index tuples with more ranges than this compile into an index array
+MAX_SLICES = 1024
+
+
+def compile_index(idx, r=0):
+    """Compile index tuples into an index to slice arrays with.
+
+    A single ``(start, stop)`` range compiles into a slice, which returns a
+    view. A few ranges compile into a list of slices, to be stacked, and many
+    ranges into an index array of the smallest integer type that holds the
+    index.
+
+    .. versionadded:: 0.2.3
+
+    Parameters
+    ----------
+    idx : tuple, list
+        index tuple ``(start, stop)``, or list or tuple of index tuples.
+
+    r : int (default = 0)
+        offset of the array to slice, i.e. the index of its first row.
+
+    Returns
+    -------
+    index : slice, list, array
+
+    Examples
+    --------
+    >>> from mlens.index.base import compile_index
+    >>> compile_index((2, 5))
+    slice(2, 5, None)
+    >>> compile_index(((0, 2), (4, 6)))
+    [slice(0, 2, None), slice(4, 6, None)]
+    """
+    if not isinstance(idx[0], tuple):
+        idx = (idx,)
+
+    if len(idx) == 1:
+        return slice(idx[0][0] - r, idx[0][1] - r)
+
+    if len(idx) <= MAX_SLICES:
+        return [slice(t0 - r, t1 - r) for t0, t1 in idx]
+
+    index = BaseIndex._build_range(idx) - r
+    dtype = np.int32 if index.size and index.max() < 2 ** 31 else np.int64
+    return index.astype(dtype)
 
 
 class BaseIndex(BaseEstimator):
@@ -280,8 +387,22 @@ class BaseIndex(BaseEstimator):
         >>> BaseIndex._build_range([(0, 2), (4, 6)])
         array([0, 1, 4, 5])
         """
-        if isinstance(idx[0], tuple):
-            return np.hstack([np.arange(t0, t1) for t0, t1 in idx])
+        if getattr(idx, 'ndim', 1) == 2 or isinstance(idx[0], tuple):
+            # List of index tuples, or array of ranges from make_ranges
+            ranges = np.asarray(idx)
+            sizes = ranges[:, 1] - ranges[:, 0]
+            if not sizes.all():
+                ranges, sizes = ranges[sizes > 0], sizes[sizes > 0]
+            if not sizes.size:
+                return np.arange(0)
+
+            # Steps of one within a range, and a jump to the next start at
+            # the end of each range, summed up in place
+            out = np.ones(sizes.sum(dtype=np.int64), dtype=np.int64)
+            out[0] = ranges[0, 0]
+            out[np.cumsum(sizes[:-1], dtype=np.int64)] = \
+                ranges[1:, 0] - ranges[:-1, 1] + 1
+            return np.cumsum(out, out=out)
         return np.arange(idx[0], idx[1])
 
     def set_params(self, **params):
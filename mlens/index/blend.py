@@ -157,8 +157,8 @@ class BlendIndex(BaseIndex):
             array to _collect dimension data from.
         y : None
             for compatibility
-        job : None
-            for compatibility
+        job : str, optional
+            type of job. Split sizes are not validated for ``'predict'``.
 
         Returns
         -------
@@ -185,8 +185,10 @@ class BlendIndex(BaseIndex):
         else:
             self.n_train = int(np.floor(self.train_size * self.n_samples))
 
-        check_partial_index(self.n_samples, self.test_size, self.train_size,
-                            self.n_test, self.n_train)
+        if job != 'predict':
+            # The split is not used for prediction
+            check_partial_index(self.n_samples, self.test_size,
+                                self.train_size, self.n_test, self.n_train)
 
         self.n_test_samples = self.n_test
 
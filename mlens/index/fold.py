@@ -8,7 +8,10 @@ Stack indexing.
 """
 from __future__ import division
 
-from ._checks import check_full_index
+from numbers import Integral
+import numpy as np
+
+from ._checks import check_full_index, check_sampled_index
 from .base import BaseIndex
 
 
@@ -118,8 +121,8 @@ class FoldIndex(BaseIndex):
             array to _collect dimension data from.
         y : None
             for compatibility
-        job : None
-            for compatibility
+        job : str, optional
+            type of job. Split sizes are not validated for ``'predict'``.
 
         Returns
         -------
@@ -127,7 +130,9 @@ class FoldIndex(BaseIndex):
             indexer with stores sample size data.
         """
         n = X.shape[0]
-        check_full_index(n, self.folds, self.raise_on_exception)
+        if job != 'predict':
+            # Folds are not used for prediction
+            check_full_index(n, self.folds, self.raise_on_exception)
 
         self.n_test_samples = self.n_samples = n
         self.__fitted__ = True
@@ -136,3 +141,147 @@ class FoldIndex(BaseIndex):
     def _gen_indices(self):
         """Generate K-Fold iterator."""
         return super(FoldIndex, self)._gen_indices()
+
+
+class SubsampledFoldIndex(FoldIndex):
+
+    """K-Fold indexer with subsampled training sets.
+
+    Test sets are the folds of :class:`FoldIndex` and cover all of ``X``,
+    so out-of-fold predictions are complete. Training sets are capped at
+    ``train_size`` observations, drawn as blocks of ``block_size``
+    contiguous observations from the training set of :class:`FoldIndex`.
+    Training sets are therefore lists of a few ``(start, stop)`` tuples,
+    which are cheap to slice, instead of a random subset of observations.
+
+    Blocks are drawn once per fit: all learners and transformers fitted
+    on a fold are fitted on the same subsample.
+
+    .. versionadded:: 0.2.3
+
+    Parameters
+    ----------
+    folds : int (default = 2)
+        number of folds to use during fitting.
+
+    train_size : int or float (default = 0.5)
+        maximum size of each training set. If ``float``, assumed to be
+        proportion of full data set.
+
+    block_size : int, optional
+        number of contiguous observations in a block. Defaults to a 32nd of
+        ``train_size``.
+
+    random_state : int, obj, optional
+        random seed or generator for drawing blocks.
+
+    X : array-like of shape [n_samples,] , optional
+        the training set to partition. The training label array is also,
+        accepted, as only the first dimension is used. If ``X`` is not
+        passed at instantiation, the ``fit`` method must be called before
+        ``generate``, or ``X`` must be passed as an argument of
+        ``generate``.
+
+    raise_on_exception : bool (default = True)
+        whether to warn on suspicious slices or raise an error.
+
+    See Also
+    --------
+    :class:`FoldIndex`, :class:`BlendIndex`
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mlens.index import SubsampledFoldIndex
+    >>> X = np.arange(12)
+    >>> idx = SubsampledFoldIndex(3, 4, 2, random_state=0)
+    >>> for tri, tei in idx.generate(X, as_array=True):
+    ...     print('TRAIN: %r | TEST: %r' % (tri, tei))
+    TRAIN: array([ 6,  7, 10, 11]) | TEST: array([0, 1, 2, 3])
+    TRAIN: array([ 2,  3, 10, 11]) | TEST: array([4, 5, 6, 7])
+    TRAIN: array([0, 1, 4, 5]) | TEST: array([ 8,  9, 10, 11])
+    """
+
+    def __init__(self, folds=2, train_size=0.5, block_size=None,
+                 random_state=None, X=None, raise_on_exception=True):
+        self.train_size = train_size
+        self.block_size = block_size
+        self.random_state = random_state
+        self.n_train = None
+        self.n_block = None
+        self._seed = None
+        super(SubsampledFoldIndex, self).__init__(
+            folds=folds, X=X, raise_on_exception=raise_on_exception)
+
+    def fit(self, X, y=None, job=None):
+        """Method for storing array data.
+
+        Parameters
+        ----------
+        X : array-like of shape [n_samples, optional]
+            array to _collect dimension data from.
+        y : None
+            for compatibility
+        job : str, optional
+            type of job. Split sizes are not validated for ``'predict'``.
+
+        Returns
+        -------
+        instance :
+            indexer with stores sample size data.
+        """
+        super(SubsampledFoldIndex, self).fit(X, y, job)
+
+        if isinstance(self.train_size, Integral):
+            self.n_train = self.train_size
+        else:
+            self.n_train = int(np.floor(self.train_size * self.n_samples))
+
+        if self.block_size is None:
+            self.n_block = max(self.n_train // 32, 1)
+        else:
+            self.n_block = self.block_size
+
+        if job != 'predict':
+            check_sampled_index(self.train_size, self.n_train, self.n_block)
+
+        # Draw the same blocks on every call to generate
+        rs = self.random_state
+        if not isinstance(rs, np.random.RandomState):
+            rs = np.random.RandomState(rs)
+        self._seed = rs.randint(2 ** 31 - 1)
+        return self
+
+    def _gen_indices(self):
+        """Generate K-Fold iterator with subsampled training sets."""
+        rs = np.random.RandomState(self._seed)
+        for tri, tei in super(SubsampledFoldIndex, self)._gen_indices():
+            yield self._sample(tri, rs), tei
+
+    def _sample(self, tri, rs):
+        """Draw blocks of a training set"""
+        starts, stops = np.asarray(tri, dtype=np.int64).reshape(-1, 2).T
+        if (stops - starts).sum() <= self.n_train:
+            return tri
+
+        # Blocks of each training range
+        b_starts = np.concatenate([np.arange(t0, t1, self.n_block)
+                                   for t0, t1 in zip(starts, stops)])
+        b_stops = np.concatenate([
+            np.minimum(np.arange(t0, t1, self.n_block) + self.n_block, t1)
+            for t0, t1 in zip(starts, stops)])
+
+        # Draw blocks until the training set is full, and trim the last
+        draw = rs.permutation(b_starts.size)
+        size = np.cumsum(b_stops[draw] - b_starts[draw])
+        draw = draw[:np.searchsorted(size, self.n_train) + 1]
+        b_starts, b_stops = b_starts[draw], b_stops[draw]
+        b_stops[-1] -= size[draw.size - 1] - self.n_train
+
+        # Merge adjacent blocks
+        order = np.argsort(b_starts)
+        b_starts, b_stops = b_starts[order], b_stops[order]
+        split = b_starts[1:] != b_stops[:-1]
+        b_starts = b_starts[np.r_[True, split]]
+        b_stops = b_stops[np.r_[split, True]]
+        return tuple(zip(b_starts.tolist(), b_stops.tolist()))
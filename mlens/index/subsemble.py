@@ -11,7 +11,8 @@ from __future__ import division
 import numpy as np
 
 from ._checks import check_subsample_index
-from .base import BaseIndex, partition, make_tuple, prune_train
+from .base import (BaseIndex, partition, make_tuple, make_ranges,
+                   mask_ranges, as_tuples, prune_train)
 
 
 class SubsetIndex(BaseIndex):
@@ -123,8 +124,8 @@ class SubsetIndex(BaseIndex):
             array to _collect dimension data from.
         y : None
             for compatibility
-        job : None
-            for compatibility
+        job : str, optional
+            type of job. Split sizes are not validated for ``'predict'``.
 
         Returns
         -------
@@ -132,8 +133,10 @@ class SubsetIndex(BaseIndex):
             indexer with stores sample size data.
         """
         n = X.shape[0]
-        check_subsample_index(n, self.partitions, self.folds,
-                              self.raise_on_exception)
+        if job != 'predict':
+            # Partitions are not used for prediction
+            check_subsample_index(n, self.partitions, self.folds,
+                                  self.raise_on_exception)
 
         self.n_samples = self.n_test_samples = n
         self.__fitted__ = True
@@ -431,7 +434,7 @@ class ClusteredSubsetIndex(BaseIndex):
 
             # Indexers are assumed to need fitting once, so we need to
             # generate cluster predictions during the fit call. To minimize
-            # memory consumption, store cluster indexes as list of tuples
+            # memory consumption, store cluster indexes as arrays of ranges
             self._clusters_ = self._get_partitions(X, y)
         self.__fitted__ = True
         return self
@@ -474,7 +477,7 @@ class ClusteredSubsetIndex(BaseIndex):
             if as_array:
                 yield self._build_range(cluster_index)
             else:
-                yield cluster_index
+                yield as_tuples(cluster_index)
 
     def _get_partitions(self, X, y=None):
         """Get clustered partition indices from estimator.
@@ -482,8 +485,6 @@ class ClusteredSubsetIndex(BaseIndex):
         Returns the index range for each partition of X. See :func:`partition`
         for further details.
         """
-        n_samples = X.shape[0]
-
         f = getattr(self.partition_estimator, self.attr)
         if self.partition_on == 'X':
             cluster_ids = f(X)
@@ -492,18 +493,19 @@ class ClusteredSubsetIndex(BaseIndex):
         else:
             cluster_ids = f(X, y)
 
-        clusters = np.unique(cluster_ids)
-        self.partitions = len(clusters)
-
-        # Condense the cluster index array into a list of tuples
-        out = list()  # list of cluster indexes
+        # A stable sort keeps the index of each cluster in ascending order
+        cluster_ids = np.ravel(cluster_ids)
+        order = np.argsort(cluster_ids, kind='mergesort')
+        labels = cluster_ids[order]
+        del cluster_ids
+        splits = np.flatnonzero(labels[1:] != labels[:-1]) + 1
+        del labels
+        self.partitions = splits.shape[0] + 1
 
-        index = np.arange(n_samples)
-        for c in clusters:
-            cluster_index = index[cluster_ids == c]
-            cluster_index_tup = make_tuple(cluster_index)
-            out.append(cluster_index_tup)
-        return out
+        # Condense the cluster index arrays into (start, stop) ranges
+        dtype = np.int32 if order.shape[0] < 2 ** 31 else np.int64
+        return [make_ranges(cluster_index, dtype)
+                for cluster_index in np.split(order, splits)]
 
     def _gen_indices(self):
         """Generator for clustered subsample.
@@ -518,7 +520,6 @@ class ClusteredSubsetIndex(BaseIndex):
         n_samples = self.n_samples
         folds = self.folds
 
-        I = np.arange(n_samples)
         for prt in self._partition_generator(as_array=True):
 
             t_len = partition(prt.shape[0], folds)
@@ -529,12 +530,14 @@ class ClusteredSubsetIndex(BaseIndex):
 
                 tri = prt[t_start:t_stop]
 
-                # Create test set by iterating over the index range
-                tei = np.asarray([i for i in I if i not in tri])
+                # Test set is the complement of the training set
+                mask = np.ones(n_samples, dtype=bool)
+                mask[tri] = False
 
                 # Condense indexes to list of tuples
                 tri = make_tuple(tri)
-                tei = make_tuple(tei)
+                tei = as_tuples(mask_ranges(mask))
+                del mask
 
                 yield tri, tei
                 t_last += t_size
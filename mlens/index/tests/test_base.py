@@ -12,12 +12,16 @@ import numpy as np
 from mlens import config
 from mlens.utils import IdTrain
 from mlens.index import (FoldIndex,
+                         SubsampledFoldIndex,
                          BlendIndex,
                          SubsetIndex,
                          ClusteredSubsetIndex,
+                         ExpandingWindowIndex,
+                         RollingWindowIndex,
                          FullIndex)
 
-from mlens.index.base import partition, prune_train
+from mlens.index.base import (partition, prune_train, make_tuple, BaseIndex,
+                              compile_index, MAX_SLICES)
 try:
     from contextlib import redirect_stderr
 except ImportError:
@@ -404,3 +408,109 @@ def test_prune_train():
 def test_partition():
     """[Base] indexers: test _partition."""
     np.testing.assert_array_equal(np.array([4, 3, 3]), partition(10, 3))
+
+
+def test_make_tuple():
+    """[Base] indexers: test make_tuple and _build_range round trip."""
+    assert make_tuple(np.array([0, 1, 2, 5, 6, 8, 9, 10])) == \
+        [(0, 3), (5, 7), (8, 11)]
+    assert make_tuple(np.array([4])) == [(4, 5)]
+
+    idx = np.flatnonzero(np.random.RandomState(0).rand(1000) > 0.5)
+    tup = make_tuple(idx)
+    assert all(t1 < t2 for (_, t1), (t2, _) in zip(tup[:-1], tup[1:]))
+    np.testing.assert_array_equal(BaseIndex._build_range(tup), idx)
+
+
+def test_clustered_subset_complement():
+    """[Base] ClusteredSubsetIndex: test test sets complement train sets."""
+    x = np.zeros((100, 1))
+    for tri, tei in ClusteredSubsetIndex(cl_2, 3, 3).generate(
+            x, as_array=True):
+        np.testing.assert_array_equal(np.setdiff1d(np.arange(100), tri), tei)
+
+
+def test_compile_index():
+    """[Base] indexers: test compile_index builds slices or index arrays."""
+    assert compile_index((2, 5)) == slice(2, 5)
+    assert compile_index(((2, 5),), r=2) == slice(0, 3)
+    assert compile_index(((0, 2), (4, 6))) == [slice(0, 2), slice(4, 6)]
+
+    tup = [(2 * i, 2 * i + 1) for i in range(1, MAX_SLICES + 2)]
+    idx = compile_index(tup, r=2)
+    assert idx.dtype == np.int32
+    np.testing.assert_array_equal(idx, BaseIndex._build_range(tup) - 2)
+
+
+###############################################################################
+def test_expanding_window_tuple_shape():
+    """[Base] ExpandingWindowIndex: test the tuple shape on generation."""
+    x = np.arange(10)
+    tup = list(ExpandingWindowIndex(3, 2, gap=1).generate(x))
+    assert tup == [((0, 3), (4, 6)), ((0, 5), (6, 8)), ((0, 7), (8, 10))]
+
+    idx = ExpandingWindowIndex(3).fit(x)
+    assert idx.n_test == 2
+    assert idx.n_test_samples == 6
+    assert list(idx.generate())[0] == ((0, 4), (4, 6))
+
+
+def test_rolling_window_tuple_shape():
+    """[Base] RollingWindowIndex: test the tuple shape on generation."""
+    x = np.arange(10)
+    tup = list(RollingWindowIndex(3, 3, 2, gap=1).generate(x))
+    assert tup == [((0, 3), (4, 6)), ((2, 5), (6, 8)), ((4, 7), (8, 10))]
+
+    # Defaults to the first training window
+    tup = list(RollingWindowIndex(folds=2, test_size=0.3).generate(x))
+    assert tup == [((0, 4), (4, 7)), ((3, 7), (7, 10))]
+
+
+def test_window_raises():
+    """[Base] Window indexers: check raises error on invalid windows."""
+    for kls, args, kwargs in [(ExpandingWindowIndex, (5, 2), {}),
+                              (ExpandingWindowIndex, (2, 2), {'gap': 6}),
+                              (ExpandingWindowIndex, (2, 0), {}),
+                              (ExpandingWindowIndex, (0,), {}),
+                              (ExpandingWindowIndex, (2,), {'gap': -1}),
+                              (RollingWindowIndex, (7, 2, 2), {})]:
+        with np.testing.assert_raises(ValueError):
+            kls(*args, X=np.arange(10), **kwargs)
+
+
+###############################################################################
+def test_subsampled_fold_index():
+    """[Base] SubsampledFoldIndex: test training sets are sampled blocks."""
+    n = 1000
+    x = np.arange(n)
+    idx = SubsampledFoldIndex(4, 0.3, 25, random_state=0).fit(x)
+    assert idx.n_test_samples == n
+
+    tests = list()
+    for tri, tei in idx.generate():
+        tests.append(BaseIndex._build_range(tei))
+        tr = BaseIndex._build_range(tri)
+        assert tr.size == 300
+        assert np.intersect1d(tr, tests[-1]).size == 0
+        # At most one block per 25 observations, including a trimmed block
+        assert len(tri) <= 300 // 25 + 1
+
+    # Test sets cover all rows
+    np.testing.assert_array_equal(np.hstack(tests), x)
+
+    # Blocks are drawn once per fit
+    assert list(idx.generate()) == list(idx.generate())
+
+
+def test_subsampled_fold_index_full():
+    """[Base] SubsampledFoldIndex: test small training sets are not sampled."""
+    x = np.arange(10)
+    assert list(SubsampledFoldIndex(2, 5).generate(x)) == \
+        list(FoldIndex(2).generate(x))
+
+
+def test_subsampled_fold_index_raises():
+    """[Base] SubsampledFoldIndex: check raises error on empty samples."""
+    for kwargs in [{'train_size': 0}, {'block_size': 0}]:
+        with np.testing.assert_raises(ValueError):
+            SubsampledFoldIndex(2, X=np.arange(10), **kwargs)
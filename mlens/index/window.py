@@ -0,0 +1,254 @@
+"""ML-ENSEMBLE
+
+:author: Sebastian Flennerhag
+:copyright: 2017-2018
+:licence: MIT
+
+Time series indexing.
+"""
+from __future__ import division
+
+from numbers import Integral
+import numpy as np
+
+from ._checks import check_window_index
+from .base import BaseIndex
+
+
+def _size(size, n_samples):
+    """Get number of samples from an absolute or relative size"""
+    if isinstance(size, Integral):
+        return size
+    return int(np.floor(size * n_samples))
+
+
+class _WindowIndex(BaseIndex):
+
+    """Base class for time series indexers.
+
+    Test sets are consecutive windows of ``test_size`` observations that
+    cover the last ``folds * test_size`` observations of ``X``. Each training
+    set ends ``gap`` observations before its test set starts. Train and test
+    sets are both single ``(start, stop)`` tuples, so folds are sliced as
+    views of the input array.
+    """
+
+    def __init__(self, folds=2, test_size=None, gap=0, X=None,
+                 raise_on_exception=True):
+        super(_WindowIndex, self).__init__()
+        self.folds = folds
+        self.test_size = test_size
+        self.gap = gap
+        self.raise_on_exception = raise_on_exception
+        self.n_test = None
+        self.n_train = None
+
+        if X is not None:
+            self.fit(X)
+
+    def fit(self, X, y=None, job=None):
+        """Method for storing array data.
+
+        Parameters
+        ----------
+        X : array-like of shape [n_samples, optional]
+            array to _collect dimension data from.
+        y : None
+            for compatibility
+        job : str, optional
+            type of job. Window sizes are not validated for ``'predict'``.
+
+        Returns
+        -------
+        instance :
+            indexer with stores sample size data.
+        """
+        self.n_samples = n = X.shape[0]
+
+        if self.test_size is None:
+            # Split into folds + 1 windows, with the first for training only
+            self.n_test = n // (self.folds + 1) if self.folds > 0 else 0
+        else:
+            self.n_test = _size(self.test_size, n)
+
+        # Observations before the first test window
+        start = n - self.folds * self.n_test
+        self.n_train = self._train_size(start - self.gap)
+
+        if job != 'predict':
+            # Windows are not used for prediction
+            check_window_index(n, self.folds, self.n_test, self.n_train,
+                               self.gap)
+
+        # Rows before the first test window are not predicted
+        self.n_test_samples = self.folds * self.n_test
+
+        self.__fitted__ = True
+        return self
+
+    def _train_size(self, n_first):
+        """Size of the training window, given the first training window"""
+        return n_first
+
+    def _gen_indices(self):
+        """Return train and test set index generator."""
+        start = self.n_samples - self.folds * self.n_test
+        for i in range(self.folds):
+            tei_start = start + i * self.n_test
+            tri_stop = tei_start - self.gap
+            tri_start = self._train_start(tri_stop)
+            yield (tri_start, tri_stop), (tei_start, tei_start + self.n_test)
+
+    def _train_start(self, stop):
+        """Start of the training window ending at stop"""
+        return 0
+
+
+class ExpandingWindowIndex(_WindowIndex):
+
+    """Time series indexer with expanding training windows.
+
+    Iterator that generates ``folds`` consecutive test windows at the end of
+    ``X``. Each training window starts at the first observation and ends
+    ``gap`` observations before its test window, so training sets expand
+    from one fold to the next. Observations are assumed to be ordered in
+    time.
+
+    Train and test sets are yielded as single ``(start, stop)`` tuples that
+    slice ``X`` without copying. Observations before the first test window
+    are not predicted, so layers output predictions for the last
+    ``folds * test_size`` observations only, and the targets are rebased
+    accordingly.
+
+    .. versionadded:: 0.2.3
+
+    Parameters
+    ----------
+    folds : int (default = 2)
+        number of test windows.
+
+    test_size : int or float, optional
+        size of each test window. If ``float``, assumed to be proportion of
+        full data set. Defaults to ``n_samples // (folds + 1)``.
+
+    gap : int (default = 0)
+        number of observations to leave out between the end of a training
+        window and the start of its test window, to avoid leaking
+        information through features computed over past observations.
+
+    X : array-like of shape [n_samples,] , optional
+        the training set to partition. The training label array is also,
+        accepted, as only the first dimension is used. If ``X`` is not
+        passed at instantiation, the ``fit`` method must be called before
+        ``generate``, or ``X`` must be passed as an argument of
+        ``generate``.
+
+    raise_on_exception : bool (default = True)
+        for compatibility with other indexers.
+
+    See Also
+    --------
+    :class:`RollingWindowIndex`, :class:`BlendIndex`
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mlens.index import ExpandingWindowIndex
+    >>> X = np.arange(10)
+    >>> idx = ExpandingWindowIndex(3, 2, gap=1)
+    >>> for tri, tei in idx.generate(X):
+    ...     print('TRAIN: %r | TEST: %r' % (X[tri[0]:tri[1]],
+    ...                                     X[tei[0]:tei[1]]))
+    TRAIN: array([0, 1, 2]) | TEST: array([4, 5])
+    TRAIN: array([0, 1, 2, 3, 4]) | TEST: array([6, 7])
+    TRAIN: array([0, 1, 2, 3, 4, 5, 6]) | TEST: array([8, 9])
+    """
+
+    def __init__(self, folds=2, test_size=None, gap=0, X=None,
+                 raise_on_exception=True):
+        super(ExpandingWindowIndex, self).__init__(
+            folds=folds, test_size=test_size, gap=gap, X=X,
+            raise_on_exception=raise_on_exception)
+
+
+class RollingWindowIndex(_WindowIndex):
+
+    """Time series indexer with rolling training windows.
+
+    Iterator that generates ``folds`` consecutive test windows at the end of
+    ``X``. Each training window holds the ``train_size`` observations that
+    end ``gap`` observations before its test window, so training windows
+    roll forward with the test windows. Observations are assumed to be
+    ordered in time.
+
+    Train and test sets are yielded as single ``(start, stop)`` tuples that
+    slice ``X`` without copying. Observations before the first test window
+    are not predicted, so layers output predictions for the last
+    ``folds * test_size`` observations only, and the targets are rebased
+    accordingly.
+
+    .. versionadded:: 0.2.3
+
+    Parameters
+    ----------
+    train_size : int or float, optional
+        size of each training window. If ``float``, assumed to be
+        proportion of full data set. Defaults to all observations before
+        the first training window ends.
+
+    folds : int (default = 2)
+        number of test windows.
+
+    test_size : int or float, optional
+        size of each test window. If ``float``, assumed to be proportion of
+        full data set. Defaults to ``n_samples // (folds + 1)``.
+
+    gap : int (default = 0)
+        number of observations to leave out between the end of a training
+        window and the start of its test window, to avoid leaking
+        information through features computed over past observations.
+
+    X : array-like of shape [n_samples,] , optional
+        the training set to partition. The training label array is also,
+        accepted, as only the first dimension is used. If ``X`` is not
+        passed at instantiation, the ``fit`` method must be called before
+        ``generate``, or ``X`` must be passed as an argument of
+        ``generate``.
+
+    raise_on_exception : bool (default = True)
+        for compatibility with other indexers.
+
+    See Also
+    --------
+    :class:`ExpandingWindowIndex`, :class:`BlendIndex`
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from mlens.index import RollingWindowIndex
+    >>> X = np.arange(10)
+    >>> idx = RollingWindowIndex(3, 3, 2, gap=1)
+    >>> for tri, tei in idx.generate(X):
+    ...     print('TRAIN: %r | TEST: %r' % (X[tri[0]:tri[1]],
+    ...                                     X[tei[0]:tei[1]]))
+    TRAIN: array([0, 1, 2]) | TEST: array([4, 5])
+    TRAIN: array([2, 3, 4]) | TEST: array([6, 7])
+    TRAIN: array([4, 5, 6]) | TEST: array([8, 9])
+    """
+
+    def __init__(self, train_size=None, folds=2, test_size=None, gap=0,
+                 X=None, raise_on_exception=True):
+        self.train_size = train_size
+        super(RollingWindowIndex, self).__init__(
+            folds=folds, test_size=test_size, gap=gap, X=X,
+            raise_on_exception=raise_on_exception)
+
+    def _train_size(self, n_first):
+        """Size of the training window, given the first training window"""
+        if self.train_size is None:
+            return n_first
+        return _size(self.train_size, self.n_samples)
+
+    def _train_start(self, stop):
+        """Start of the training window ending at stop"""
+        return stop - self.n_train
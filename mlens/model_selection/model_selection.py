@@ -19,11 +19,16 @@ from ._base_functions import (parse_key, set_job, cat, check_scorer,
 from ..index import FoldIndex
 from ..parallel import ParallelEvaluation
 from ..parallel.base import BaseBackend, IndexMixin
+from ..parallel.scheduler import schedule, batch, COSTS
+from ..parallel.threads import govern
+from ..parallel._base_functions import IndexedTask
 from ..metrics import Data, assemble_data
 from ..utils.formatting import _flatten, _check_instances
 from ..utils import (print_time, safe_print,
                      assert_correct_format, check_inputs)
 from ..externals.joblib import delayed
+from ..externals.joblib._parallel_backends import (ThreadingBackend,
+                                                   SequentialBackend)
 from ..externals.sklearn.base import clone
 
 try:
@@ -170,8 +175,22 @@ class BaseEval(IndexMixin, BaseBackend):
             generator = self._learners
             inp = 'main'
 
-        parallel(delayed(subtask, not _threading)()
-                 for task in generator for subtask in task(args, inp))
+        # Longest tasks first, by the costs of previous evaluations
+        scope = self.__class__.__name__
+        tasks = [subtask for task in generator for subtask in task(args, inp)]
+        tasks = schedule(tasks, [], scope=scope) if inp == 'auxiliary' else \
+            schedule([], tasks, scope=scope)
+
+        # Workers in other processes share the fold indexes they compile
+        # through the cache
+        # pylint: disable=protected-access
+        shared = None if isinstance(
+            parallel._backend, (ThreadingBackend, SequentialBackend)) else path
+
+        tasks = batch(tasks, parallel._effective_n_jobs(), scope=scope)
+        with govern(parallel, _threading) as wrap:
+            parallel(delayed(IndexedTask(wrap(task), shared),
+                             not _threading)() for task in tasks)
 
     def _fit(self, X, y, job):
         X, y = check_inputs(X, y, self.array_check)
@@ -184,9 +203,11 @@ class BaseEval(IndexMixin, BaseBackend):
         if case == 'transformers':
             for transformer in self._transformers:
                 transformer.collect(path)
+            COSTS.record(self._transformers, self.__class__.__name__)
         if case == 'estimators':
             for learner in self._learners:
                 learner.collect(path)
+            COSTS.record(self._learners, self.__class__.__name__)
 
     @property
     def raw_data(self):
@@ -11,11 +11,15 @@ Implements backend graph managers, base classes for interacting with graph
 managers, and job managers for preprocessing pipelines and estimators, as well
 as handles for multiple instances and wrappers for standard parallel job calls.
 """
-from .backend import ParallelProcessing, ParallelEvaluation, Job, dump_array
+from .backend import (ParallelProcessing, ParallelEvaluation, Job,
+                      dump_array, share_array, share_sparse, clear_inputs,
+                      Session)
 from .learner import Learner, EvalLearner, Transformer, EvalTransformer
 from .layer import Layer
 from .handles import Group, make_group, Pipeline
 from .wrapper import run, get_backend
+from .store import CacheStore, MemoryStore, DiskStore, SQLiteStore
+from .cluster import Cluster, serve
 
 __all__ = ['ParallelProcessing',
            'ParallelEvaluation',
@@ -30,5 +34,15 @@ __all__ = ['ParallelProcessing',
            'make_group',
            'run',
            'get_backend',
-           'dump_array'
+           'dump_array',
+           'share_array',
+           'share_sparse',
+           'clear_inputs',
+           'Session',
+           'CacheStore',
+           'MemoryStore',
+           'DiskStore',
+           'SQLiteStore',
+           'Cluster',
+           'serve'
            ]
@@ -0,0 +1,133 @@
+"""ML-Ensemble
+
+:author: Sebastian Flennerhag
+:copyright: 2017-2018
+:license: MIT
+
+Awaitable estimation calls. Requires Python 3.7 or later.
+"""
+import asyncio
+import threading
+from functools import partial
+from weakref import WeakKeyDictionary
+
+# Estimation calls on an instance are not reentrant: one lock per instance
+_ASYNC_LOCKS = WeakKeyDictionary()
+_ASYNC_LOCKS_LOCK = threading.Lock()
+
+
+def _get_lock(instance):
+    """Return the estimation lock of an instance"""
+    with _ASYNC_LOCKS_LOCK:
+        lock = _ASYNC_LOCKS.get(instance)
+        if lock is None:
+            lock = _ASYNC_LOCKS[instance] = threading.Lock()
+    return lock
+
+
+def _locked(lock, func, *args, **kwargs):
+    """Run func while holding lock"""
+    with lock:
+        return func(*args, **kwargs)
+
+
+class AsyncMixin(object):
+
+    """Awaitable estimation calls.
+
+    Mixin class that adds ``fit_async``, ``predict_async`` and
+    ``transform_async`` coroutines. Each coroutine runs the corresponding
+    synchronous method in an executor of the running event loop, so that
+    the loop is free while the estimation runs. Calls on the same instance
+    are serialized; calls on different instances run concurrently.
+
+    To share one worker pool between requests on an ensemble, start a
+    session (see :func:`~mlens.ensemble.base.BaseEnsemble.session`) before
+    awaiting calls. Process-based pools can only be started from the main
+    thread: without a session, executor threads fall back on sequential
+    processing with ``backend='multiprocessing'``.
+
+    .. versionadded:: 0.2.3
+
+    Examples
+    --------
+    >>> with ensemble.session(n_jobs=16):
+    ...     P = loop.run_until_complete(asyncio.gather(
+    ...         ensemble.predict_async(X1), ensemble.predict_async(X2)))
+    """
+
+    async def fit_async(self, X, y=None, executor=None, **kwargs):
+        """Fit in an executor.
+
+        Parameters
+        ----------
+        X: array of size [n_samples, n_features]
+            input data
+
+        y: array of size [n_samples,]
+            targets
+
+        executor: obj, optional
+            :mod:`concurrent.futures` executor to run the call in. Defaults
+            to the event loop's default executor.
+
+        **kwargs: optional
+            optional arguments to ``fit``.
+
+        Returns
+        -------
+        out: obj
+            output of ``fit``.
+        """
+        return await self._run_async('fit', executor, X, y, **kwargs)
+
+    async def predict_async(self, X, executor=None, **kwargs):
+        """Predict in an executor.
+
+        Parameters
+        ----------
+        X: array of size [n_samples, n_features]
+            input data
+
+        executor: obj, optional
+            :mod:`concurrent.futures` executor to run the call in. Defaults
+            to the event loop's default executor.
+
+        **kwargs: optional
+            optional arguments to ``predict``.
+
+        Returns
+        -------
+        out: obj
+            output of ``predict``.
+        """
+        return await self._run_async('predict', executor, X, **kwargs)
+
+    async def transform_async(self, X, executor=None, **kwargs):
+        """Transform in an executor.
+
+        Parameters
+        ----------
+        X: array of size [n_samples, n_features]
+            input data
+
+        executor: obj, optional
+            :mod:`concurrent.futures` executor to run the call in. Defaults
+            to the event loop's default executor.
+
+        **kwargs: optional
+            optional arguments to ``transform``.
+
+        Returns
+        -------
+        out: obj
+            output of ``transform``.
+        """
+        return await self._run_async('transform', executor, X, **kwargs)
+
+    def _run_async(self, method, executor, *args, **kwargs):
+        """Schedule a method call in an executor of the running loop"""
+        loop = asyncio.get_running_loop()
+        func = partial(
+            _locked, _get_lock(self), getattr(self, method), *args, **kwargs)
+        return loop.run_in_executor(executor, func)
@@ -9,26 +9,128 @@ Functions for base computations
 from __future__ import division
 
 import os
+import sys
+import hashlib
 import warnings
+import threading
 from copy import deepcopy
-from scipy.sparse import issparse
+from collections import OrderedDict
+from contextlib import contextmanager
+from scipy.sparse import issparse, vstack
 import numpy as np
 
-from ..utils import pickle_load, pickle_save, load as _load
-from ..utils.exceptions import MetricWarning, ParameterChangeWarning
+from ..config import get_pipeline_cache
+from ..index.base import compile_index
+from ..utils import pickle_load, pickle_save, load as _load, time
+from ..utils.utils import pickled
+from ..utils.exceptions import (MetricWarning, ParameterChangeWarning,
+                                ParallelProcessingError)
+from .store import CacheStore, DiskStore
+
+# Notified on every cache write in this process
+_WRITTEN = threading.Condition()
+
+
+def _exists(path, name):
+    """Check if an entry is in the cache"""
+    if isinstance(path, CacheStore):
+        return path.exists(name)
+    if isinstance(path, str):
+        return os.path.exists(pickled(os.path.join(path, name)))
+    return any(tup[0] == name for tup in path)
+
+
+def mark(path, name, status):
+    """Record the status of the task producing a cache entry.
+
+    Status markers are hidden from :func:`prune_files`.
+
+    Parameters
+    ----------
+    path : str, list, :class:`~mlens.parallel.store.CacheStore`
+        cache.
+
+    name : str
+        name of the cache entry.
+
+    status : str
+        one of ``'run'`` (task scheduled or started) and ``'err'`` (task
+        failed).
+    """
+    save(path, '.%s.%s' % (name, status), None)
+
+
+@contextmanager
+def produce(path, name):
+    """Context of the task producing a cache entry.
+
+    Marks the entry as running on entry, and as failed if the task raises,
+    so that tasks waiting on the entry are woken either way.
+
+    Parameters
+    ----------
+    path : str, list, :class:`~mlens.parallel.store.CacheStore`
+        cache.
+
+    name : str
+        name of the cache entry. Must be saved within the context.
+    """
+    mark(path, name, 'run')
+    try:
+        yield
+    except BaseException:
+        mark(path, name, 'err')
+        raise
+
+
+def wait(path, name):
+    """Wait for an entry written by a concurrently scheduled task.
+
+    Waits on cache writes in this process for as long as the entry is
+    marked as running, i.e. its producer has been scheduled in the same
+    job (see :func:`mark`) or has started (see :func:`produce`). Producers
+    always write the entry or an error marker, so the wait ends without
+    timeout. If no producer is marked, returns at once and leaves it to
+    the caller to handle a missing entry.
+
+    Workers in other processes are not notified of cache writes. Jobs on
+    such backends run producers to completion before starting the tasks
+    that wait on them.
+    """
+    if not isinstance(path, (str, list, CacheStore)):
+        return
+
+    with _WRITTEN:
+        while not _exists(path, name):
+            if _exists(path, '.%s.err' % name):
+                raise ParallelProcessingError(
+                    "Could not load %s: the task producing it failed." % name)
+            if not _exists(path, '.%s.run' % name):
+                return
+            _WRITTEN.wait()
 
 
 def load(path, name, raise_on_exception=True):
     """Utility for loading from cache"""
-    if isinstance(path, str):
+    # Dependencies can be scheduled in the same parallel job
+    wait(path, name)
+
+    if isinstance(path, CacheStore):
+        try:
+            obj = path.load(name)
+        except KeyError:
+            raise ValueError(
+                "No entry %s in cache %r. The task producing it has not "
+                "run, or saved it to another sub-cache." % (name, path))
+    elif isinstance(path, str):
         f = os.path.join(path, name)
         obj = _load(f, raise_on_exception)
     elif isinstance(path, list):
         obj = [tup[1] for tup in path if tup[0] == name]
         if not obj:
             raise ValueError(
-                "No preprocessing pipeline in cache. Auxiliary Transformer "
-                "have not cached pipelines, or cached to another sub-cache.")
+                "No entry %s in in-memory cache. The task producing it has "
+                "not run, or saved it to another sub-cache." % name)
         elif not len(obj) == 1:
             raise ValueError(
                 "Could not load unique preprocessing pipeline. "
@@ -39,18 +141,284 @@ def load(path, name, raise_on_exception=True):
     return obj
 
 
+class LoadCache(object):
+
+    """Per-process LRU cache of entries loaded from disk.
+
+    Entries are keyed by their file, and reloaded if the inode,
+    modification time or size of the file changed. Entries are evicted in least
+    recently used order once the total size of their files exceeds the
+    limit set by :func:`~mlens.config.set_pipeline_cache`. Only entries
+    of cache directories and :class:`~mlens.parallel.store.DiskStore`
+    caches are kept, as other caches are not deserialized from files.
+    Entries of a job's cache directory are dropped when the job ends.
+
+    .. versionadded:: 0.2.3
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self._lock = threading.Lock()
+
+    def load(self, path, name, raise_on_exception=True):
+        """Load an entry, from memory if loaded before"""
+        limit = get_pipeline_cache() * 2 ** 20
+        f = _entry_file(path, name)
+        if not limit or f is None:
+            return load(path, name, raise_on_exception)
+
+        wait(path, name)
+        try:
+            st = os.stat(f)
+        except OSError:
+            return load(path, name, raise_on_exception)
+
+        stamp = (st.st_ino, st.st_mtime, st.st_size)
+        with self._lock:
+            entry = self.entries.pop(f, None)
+            if entry is not None:
+                if entry[0] == stamp:
+                    self.entries[f] = entry
+                    return entry[1]
+                self.nbytes -= entry[0][-1]
+
+        obj = load(path, name, raise_on_exception)
+        if st.st_size <= limit:
+            with self._lock:
+                entry = self.entries.pop(f, None)
+                if entry is not None:
+                    self.nbytes -= entry[0][-1]
+                self.entries[f] = (stamp, obj)
+                self.nbytes += st.st_size
+                while self.nbytes > limit:
+                    _, (old, _) = self.entries.popitem(last=False)
+                    self.nbytes -= old[-1]
+        return obj
+
+    def clear(self, path=None):
+        """Drop loaded entries.
+
+        Parameters
+        ----------
+        path : str, optional
+            cache directory to drop the entries of. Drops all entries if not
+            specified.
+        """
+        with self._lock:
+            if path is None:
+                self.entries = OrderedDict()
+                self.nbytes = 0
+                return
+
+            path = os.path.join(path, '')
+            for f in [f for f in self.entries if f.startswith(path)]:
+                self.nbytes -= self.entries.pop(f)[0][-1]
+
+
+def _entry_file(path, name):
+    """File of a cache entry. None if the cache is not on disk"""
+    if isinstance(path, DiskStore):
+        path = path.path
+    if not isinstance(path, str):
+        return None
+    return pickled(os.path.join(path, name))
+
+
+PIPELINES = LoadCache()
+
+
+def _sizeof(obj):
+    """Approximate memory held by a compiled index or index tuple"""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (tuple, list)):
+        size += sum(_sizeof(o) for o in obj)
+    return size
+
+
+class IndexCache(object):
+
+    """Per-process LRU cache of compiled fold indexes.
+
+    Folds do not change once an indexer is fitted, so the index of a fold
+    is compiled once (see :func:`~mlens.index.base.compile_index`) and shared
+    by all sub-learners and transformers slicing the fold, across fit and
+    predict calls. Entries are evicted in least recently used order once
+    their size exceeds ``limit`` bytes. The size of an entry includes both
+    the compiled index and the index tuple it is keyed by.
+
+    Workers in other processes compile the same folds. Within
+    :meth:`stored`, compiled index arrays are also saved to the cache
+    directory of the job, next to memory-mapped inputs, and memory-mapped
+    by workers that have yet to compile them, so that each fold is compiled
+    once per job.
+
+    .. versionadded:: 0.2.3
+
+    Parameters
+    ----------
+    limit : int (default = 2 ** 28)
+        maximum total size in bytes of cached entries.
+    """
+
+    def __init__(self, limit=2 ** 28):
+        self.limit = limit
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def stored(self, path):
+        """Context in which compiled index arrays are stored in a cache.
+
+        Parameters
+        ----------
+        path : str, obj
+            cache of the job. Indexes are only stored in cache directories
+            and :class:`~mlens.parallel.store.DiskStore` caches.
+        """
+        if isinstance(path, DiskStore):
+            path = path.path
+        previous = getattr(self._local, 'path', None)
+        self._local.path = path if isinstance(path, str) else None
+        try:
+            yield
+        finally:
+            self._local.path = previous
+
+    def get(self, idx, r=0):
+        """Compiled index of an index tuple, relative to row ``r``"""
+        key = (tuple(idx), r)
+        with self._lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.entries[key] = entry
+                return entry[0]
+
+        index = self._compile(key)
+        nbytes = _sizeof(index) + _sizeof(key)
+        if nbytes <= self.limit:
+            with self._lock:
+                entry = self.entries.pop(key, None)
+                if entry is not None:
+                    self.nbytes -= entry[1]
+                self.entries[key] = (index, nbytes)
+                self.nbytes += nbytes
+                while self.nbytes > self.limit:
+                    _, (_, old) = self.entries.popitem(last=False)
+                    self.nbytes -= old
+        return index
+
+    def _compile(self, key):
+        """Compile an index, or load it if stored by another worker"""
+        path = getattr(self._local, 'path', None)
+        if path is None:
+            return compile_index(*key)
+
+        idx = np.asarray(key[0], dtype=np.int64)
+        digest = hashlib.sha1(idx.tobytes())
+        digest.update(repr((idx.shape, key[1])).encode())
+        f = os.path.join(path, '__index__.%s.npy' % digest.hexdigest())
+        if os.path.exists(f):
+            return np.load(f, mmap_mode='r')
+
+        index = compile_index(*key)
+        if isinstance(index, np.ndarray):
+            # Write to a temporary file to never expose a partial index
+            tmp = '%s.%i.%i.npy' % (f[:-4], os.getpid(),
+                                    threading.current_thread().ident)
+            try:
+                np.save(tmp, index)
+                os.rename(tmp, f)
+            except OSError:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        return index
+
+    def clear(self):
+        """Drop all compiled indexes"""
+        with self._lock:
+            self.entries = OrderedDict()
+            self.nbytes = 0
+
+
+class IndexedTask(object):
+
+    """Task storing the fold indexes it compiles in the job cache.
+
+    Wraps tasks dispatched to workers in other processes, see
+    :meth:`IndexCache.stored`.
+
+    .. versionadded:: 0.2.3
+    """
+
+    def __init__(self, task, path):
+        self.task = task
+        self.path = path
+
+    def __call__(self):
+        with INDEXES.stored(self.path):
+            return self.task()
+
+
+INDEXES = IndexCache()
+
+
 def save(path, name, obj):
     """Utility for saving to cache"""
-    if isinstance(path, str):
+    if isinstance(path, CacheStore):
+        path.save(name, obj)
+    elif isinstance(path, str):
         f = os.path.join(path, name)
         pickle_save(obj, f)
     elif isinstance(path, list):
         path.append((name, obj))
 
+    with _WRITTEN:
+        _WRITTEN.notify_all()
+
+
+def save_arrays(path, name, arrays):
+    """Save a list of arrays to cache.
+
+    In a cache directory, dense arrays are saved as ``.npy`` files next to
+    the entry, so that they can be memory-mapped on load.
+    """
+    if isinstance(path, str):
+        arrays = [_save_npy(path, '%s.%i' % (name, i), a)
+                  for i, a in enumerate(arrays)]
+    save(path, name, arrays)
+
+
+def load_arrays(path, name):
+    """Load a list of arrays saved with :func:`save_arrays`.
+
+    Arrays saved as ``.npy`` files are memory-mapped copy-on-write.
+    """
+    arrays = load(path, name)
+    if isinstance(path, str):
+        arrays = [np.load(os.path.join(path, a), mmap_mode='c')
+                  if isinstance(a, str) else a for a in arrays]
+    return arrays
+
+
+def _save_npy(path, name, array):
+    """Save a dense array as a npy file and return the file name"""
+    if not isinstance(array, np.ndarray) or array.dtype.hasobject:
+        return array
+    f = '%s.npy' % name
+    np.save(os.path.join(path, f), array)
+    return f
+
 
 def prune_files(path, name):
     """Utility for safely selecting only relevant files"""
-    if isinstance(path, str):
+    if isinstance(path, CacheStore):
+        files = path.prune(name)
+    elif isinstance(path, str):
         files = [os.path.join(path, f)
                  for f in os.listdir(path)
                  if name == '.'.join(f.split('.')[:-3])]
@@ -140,35 +508,47 @@ def set_output_columns(
         obj.output_columns = col_dict
 
 
-def slice_array(x, y, idx, r=0):
-    """Build training array index and slice data."""
+def slice_array(x, y, idx, r=0, order=None):
+    """Build training array index and slice data.
+
+    If ``order`` is passed, ``x`` and ``y`` are sliced as if their rows
+    were permuted by ``order``. Only the rows of the fold are copied.
+    """
     if idx == 'all':
         idx = None
 
-    if idx:
-        # Check if the idx is a tuple and if so, whether it can be made
-        # into a simple slice
-        if isinstance(idx[0], tuple):
-            if len(idx[0]) > 1:
-                # Advanced indexing is required. This will trigger a copy
-                # of the slice in question to be made
-                simple_slice = False
-                idx = np.hstack([np.arange(t0 - r, t1 - r) for t0, t1 in idx])
-                x = x[idx]
-                y = y[idx] if y is not None else y
+    if order is not None:
+        # Slice the permutation to index the data once
+        index = order
+        if idx:
+            index = INDEXES.get(idx, r)
+            if isinstance(index, list):
+                index = np.concatenate([order[s] for s in index])
             else:
-                # The tuple is of the form ((a, b),) and can be made
-                # into a simple (a, b) tuple for which basic slicing applies
-                # which allows a view to be returned instead of a copy
-                simple_slice = True
-                idx = idx[0]
+                index = order[index]
+        x = x[index]
+        y = y[index] if y is not None else y
+    elif idx:
+        index = INDEXES.get(idx, r)
+        if isinstance(index, slice):
+            # Basic slicing returns a view instead of a copy
+            x = x[index]
+            y = y[index] if y is not None else y
+        elif isinstance(index, list):
+            # Stacking contiguous blocks is cheaper than advanced indexing
+            if not issparse(x):
+                x = np.concatenate([x[s] for s in index])
+            elif x.format == 'csr':
+                x = vstack([x[s] for s in index], format='csr')
+            else:
+                x = x[np.hstack([np.arange(s.start, s.stop) for s in index])]
+            y = np.concatenate([y[s] for s in index]
+                               ) if y is not None else y
         else:
-            # Index tuples of the form (a, b) allows simple slicing
-            simple_slice = True
-
-        if simple_slice:
-            x = x[slice(idx[0] - r, idx[1] - r)]
-            y = y[slice(idx[0] - r, idx[1] - r)] if y is not None else y
+            # Advanced indexing is required. This will trigger a copy
+            # of the slice in question to be made
+            x = x[index]
+            y = y[index] if y is not None else y
 
     # Cast as ndarray to avoid passing memmaps to estimators
     if y is not None:
@@ -184,27 +564,25 @@ def assign_predictions(pred, p, tei, col, n):
     if tei == 'all':
         tei = None
 
-    if tei is None:
-        if len(p.shape) == 1:
-            pred[:, col] = p
-        else:
-            pred[:, col:(col + p.shape[1])] = p
+    if len(p.shape) == 1:
+        cols = col
     else:
-        r = n - pred.shape[0]
-
-        if isinstance(tei[0], tuple):
-            if len(tei) > 1:
-                idx = np.hstack([np.arange(t0 - r, t1 - r) for t0, t1 in tei])
-            else:
-                tei = tei[0]
-                idx = slice(tei[0] - r, tei[1] - r)
-        else:
-            idx = slice(tei[0] - r, tei[1] - r)
+        cols = slice(col, col + p.shape[1])
 
-        if len(p.shape) == 1:
-            pred[idx, col] = p
-        else:
-            pred[(idx, slice(col, col + p.shape[1]))] = p
+    if tei is None:
+        pred[:, cols] = p
+        return
+
+    index = INDEXES.get(tei, n - pred.shape[0])
+    if isinstance(index, list):
+        # Assign block by block
+        i = 0
+        for s in index:
+            j = i + s.stop - s.start
+            pred[s, cols] = p[i:j]
+            i = j
+    else:
+        pred[index, cols] = p
 
 
 def score_predictions(y, p, scorer, name, inst_name):
@@ -16,25 +16,42 @@ from __future__ import with_statement, division
 
 import gc
 import os
+import mmap
+import atexit
 import shutil
+import threading
 import subprocess
 import tempfile
 import warnings
 
 from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
 
 import numpy as np
-from scipy.sparse import issparse, hstack
+from scipy.sparse import issparse, hstack, csr_matrix
 
 from .. import config
 from ..externals.joblib import Parallel, dump, load
+from ..externals.joblib.hashing import hash as _hash
 from ..utils import check_initialized
+from .store import CacheStore, make_store
+from ._base_functions import PIPELINES
+from ..index import ClusteredSubsetIndex
 from ..utils.exceptions import (ParallelProcessingError,
                                 ParallelProcessingWarning)
 from ..externals.sklearn.validation import check_random_state
 
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python < 3.8
+    shared_memory = None
+
 
 ###############################################################################
+_SPARSE_ARRAYS = ('data', 'indices', 'indptr')
+
+
 def _dtype(a, b=None):
     """Utility for getting a dtype"""
     return getattr(a, 'dtype', getattr(b, 'dtype', None))
@@ -78,6 +95,172 @@ def dump_array(array, name, path):
     return f
 
 
+class SharedArray(np.ndarray):
+
+    """Array backed by a named shared memory segment.
+
+    A :class:`SharedArray` pickles by reference: unpickling attaches to the
+    segment instead of copying the buffer, so workers read and write the
+    same memory as the parent process. Views that do not span the full
+    segment pickle as regular arrays.
+
+    The segment stays mapped for as long as any view on it is alive. It is
+    unlinked (i.e. removed from the system namespace) by
+    :func:`~mlens.parallel.backend.BaseProcessor.clear`.
+
+    .. versionadded:: 0.2.3
+    """
+
+    def __array_finalize__(self, obj):
+        # Propagate the segment handle so views can be pickled by reference
+        self._shm = getattr(obj, '_shm', None)
+        self._shm_info = getattr(obj, '_shm_info', None)
+
+    def __reduce__(self):
+        if self._shm is None or not self._spans_segment():
+            return self.view(type=np.ndarray).__reduce__()
+        return _attach_shared, (self._shm.name, self.shape, self.dtype.str)
+
+    def _spans_segment(self):
+        """Check if instance is the canonical view on the segment"""
+        address, shape, dtype = self._shm_info
+        return (self.__array_interface__['data'][0] == address and
+                self.shape == shape and self.dtype.str == dtype and
+                self.flags.c_contiguous)
+
+
+def _shared_view(shm, shape, dtype):
+    """Build a shared array on a shared memory segment"""
+    # We map the segment separately from the handle: the handle unmaps its
+    # buffer on close, even if arrays still point to it. Our mapping is
+    # owned by the arrays and released once the last view is collected.
+    if getattr(shm, '_fd', -1) >= 0:
+        buf = mmap.mmap(shm._fd, shm.size)
+    else:
+        # Windows: named file mapping
+        buf = mmap.mmap(-1, shm.size, tagname=shm.name)
+    shm.close()
+
+    arr = np.ndarray(shape, dtype=dtype, buffer=buf).view(SharedArray)
+    arr._shm = shm
+    arr._shm_info = (
+        arr.__array_interface__['data'][0], arr.shape, arr.dtype.str)
+    return arr
+
+
+def _attach_shared(name, shape, dtype):
+    """Attach to an existing shared memory segment"""
+    return _shared_view(shared_memory.SharedMemory(name=name), shape, dtype)
+
+
+def share_array(array=None, shape=None, dtype=None):
+    """Persist array in shared memory.
+
+    .. versionadded:: 0.2.3
+
+    Parameters
+    ----------
+    array : array-like, optional
+        Array to be copied into shared memory. If ``None``, an uninitialized
+        array of given ``shape`` and ``dtype`` is allocated.
+
+    shape : tuple, optional
+        shape of array to allocate. Ignored if ``array`` is passed.
+
+    dtype : numpy dtype object, optional
+        dtype of array to allocate. Ignored if ``array`` is passed.
+
+    Returns
+    -------
+    f: :class:`SharedArray`
+        shared array. The (closed) segment handle is available as
+        ``f._shm`` for unlinking.
+    """
+    if shared_memory is None:
+        raise ParallelProcessingError(
+            "Shared memory storage requires Python 3.8 or later. "
+            "Use storage='mmap'.")
+
+    if array is not None:
+        array = np.asarray(array)
+        shape, dtype = array.shape, array.dtype
+
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+
+    f = _shared_view(shm, shape, dtype)
+    if array is not None:
+        f[...] = array
+    return f
+
+
+def share_sparse(matrix):
+    """Persist a sparse matrix in shared memory.
+
+    The ``data``, ``indices`` and ``indptr`` arrays of the matrix are each
+    copied into a shared memory segment, so that workers rebuild the matrix
+    on the shared buffers without copying.
+
+    .. versionadded:: 0.2.3
+
+    Parameters
+    ----------
+    matrix : :class:`scipy.sparse.csr_matrix`, :class:`scipy.sparse.csc_matrix`
+        matrix to be copied into shared memory.
+
+    Returns
+    -------
+    f: :class:`scipy.sparse.spmatrix`
+        shared matrix of the same format. The (closed) segment handles are
+        available as ``f.data._shm``, ``f.indices._shm`` and
+        ``f.indptr._shm``.
+    """
+    if matrix.format not in ('csr', 'csc'):
+        raise ValueError(
+            "Only csr and csc matrices can be shared. Got %r" % matrix.format)
+
+    # Assign the buffers directly: the constructor would cast them to
+    # regular arrays, which pickle by value
+    f = matrix.__class__(matrix.shape, dtype=matrix.dtype)
+    for attr in _SPARSE_ARRAYS:
+        setattr(f, attr, share_array(getattr(matrix, attr)))
+    return f
+
+
+def _shared_segments(arr):
+    """Return the shared memory segments of a shared array or matrix"""
+    if issparse(arr):
+        return [getattr(arr, attr)._shm for attr in _SPARSE_ARRAYS]
+    return [arr._shm]
+
+
+def _shareable(arr, storage):
+    """Check if an input array can be put in shared memory"""
+    if storage != 'shm' or isinstance(arr, str):
+        return False
+    return not issparse(arr) or arr.format in ('csr', 'csc')
+
+
+def _unlink(shm):
+    """Remove shared memory segment from the system namespace"""
+    try:
+        shm.unlink()
+    except OSError:
+        # Already removed
+        pass
+
+
+def _fits_on_data(task):
+    """Check if the indexers of a task are fitted on the data, not its size"""
+    try:
+        # pylint: disable=protected-access
+        indexers = task._get_indexers()
+    except AttributeError:
+        return False
+    return any(isinstance(idx, ClusteredSubsetIndex) for idx in indexers)
+
+
 def _load(arr):
     """Load array from file using default settings."""
     if arr.split('.')[-1] in ['npy', 'npz']:
@@ -100,8 +283,12 @@ def _load_mmap(f):
         return np.load(f, mmap_mode='r')
 
 
-def _set_path(job, path, threading):
+def _set_path(job, path, threading, cache=None):
     """Build path as a cache or list depending on whether using threading"""
+    if cache is not None:
+        # Disk-backed stores need a directory also with threading
+        threading = threading and (
+            cache == 'memory' or isinstance(cache, CacheStore))
     if path:
         if not isinstance(path, str) and not threading:
             raise ValueError("Path must be a str with backend=multiprocessing."
@@ -129,6 +316,237 @@ def _set_path(job, path, threading):
     return job
 
 
+###############################################################################
+class InputRegistry(object):
+
+    """Registry of materialized input arrays.
+
+    Input arrays are keyed by a fingerprint of their content, so that
+    repeated estimation calls on the same data re-use the memory-mapped file
+    or shared memory segment created by the first call instead of dumping
+    the array anew. Entries are evicted in least-recently-used order once
+    the registry holds more than :func:`~mlens.config.get_input_cache`
+    arrays. Entries in use by a job are pinned until the job is cleared.
+
+    Files are kept in a separate cache directory that outlives estimation
+    caches and is removed on exit.
+
+    .. versionadded:: 0.2.3
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.dir = None
+        self.hits = 0
+        self._lock = threading.Lock()
+
+    def load(self, array, storage):
+        """Return a materialized copy of an input array.
+
+        The entry is pinned and must be released with
+        :func:`~mlens.parallel.backend.InputRegistry.release` once the
+        caller is done with it.
+
+        Parameters
+        ----------
+        array : array-like
+            input array. Memory-mapped arrays are matched with the ndarray
+            they were created from.
+
+        storage : str
+            storage type, one of ``'mmap'`` and ``'shm'``.
+
+        Returns
+        -------
+        arr : array-like
+            memory-mapped or shared array.
+
+        key : tuple
+            registry key of the entry.
+        """
+        shared = _shareable(array, storage)
+        key = (_hash(array, coerce_mmap=True), shared)
+
+        with self._lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.hits += 1
+            elif shared:
+                arr = share_sparse(array) if issparse(array) else \
+                    share_array(array)
+                entry = [arr, _shared_segments(arr), 0]
+            else:
+                if self.dir is None or not os.path.exists(self.dir):
+                    self.dir = tempfile.mkdtemp(
+                        prefix=config.get_prefix() + 'inputs_',
+                        dir=config.get_tmpdir())
+                f = dump_array(array, key[0], self.dir)
+                entry = [_load_mmap(f), f, 0]
+
+            # Insert last to mark as most recently used
+            entry[2] += 1
+            self.entries[key] = entry
+            self._evict(config.get_input_cache())
+        return entry[0], key
+
+    def release(self, keys):
+        """Unpin entries and evict down to the registry size"""
+        with self._lock:
+            for key in keys:
+                if key in self.entries:
+                    self.entries[key][2] -= 1
+            self._evict(config.get_input_cache())
+
+    def clear(self):
+        """Release all unpinned inputs"""
+        with self._lock:
+            self._evict(0)
+            if not self.entries and self.dir is not None:
+                shutil.rmtree(self.dir, ignore_errors=True)
+                self.dir = None
+
+    def _evict(self, size):
+        """Release least recently used unpinned entries until size is met"""
+        for key in list(self.entries):
+            if len(self.entries) <= max(size, 0):
+                break
+            _, resource, pins = self.entries[key]
+            if pins > 0:
+                continue
+
+            del self.entries[key]
+            if isinstance(resource, str):
+                try:
+                    os.unlink(resource)
+                except OSError:
+                    # Still mapped on windows, removed with the directory
+                    pass
+            else:
+                for shm in resource:
+                    _unlink(shm)
+
+
+_INPUTS = InputRegistry()
+atexit.register(_INPUTS.clear)
+
+
+def clear_inputs():
+    """Release all input arrays held across estimation calls.
+
+    .. versionadded:: 0.2.3
+
+    See Also
+    --------
+    :func:`~mlens.config.set_input_cache`
+    """
+    _INPUTS.clear()
+
+
+###############################################################################
+class Session(object):
+
+    """Long-lived worker pool.
+
+    A :class:`Session` owns a :class:`~mlens.externals.joblib.Parallel`
+    instance whose workers are kept alive between estimation calls. Pass
+    the session to a processing manager to run jobs on the session's pool
+    instead of starting and tearing down a pool for every call. Calls on
+    the same session are serialized.
+
+    .. versionadded:: 0.2.3
+
+    Parameters
+    ----------
+    backend: str, optional
+        Type of backend. One of ``'threading'``, ``'multiprocessing'``,
+        ``'sequential'``.
+
+    n_jobs : int, optional
+        Degree of concurrency.
+
+    verbose: bool, int, optional
+        Level of verbosity of the
+        :class:`~mlens.externals.joblib.parallel.Parallel` instance.
+
+    Examples
+    --------
+    >>> from mlens.parallel.backend import Session, ParallelProcessing
+    >>> with Session('multiprocessing', 4) as session:
+    ...     for X in batches:
+    ...         with ParallelProcessing(session=session) as manager:
+    ...             manager.stack(layers, 'predict', X)
+    """
+
+    def __init__(self, backend=None, n_jobs=None, verbose=None):
+        self.backend = config.get_backend() if not backend else backend
+        self.n_jobs = -1 if not n_jobs else n_jobs
+        self.verbose = False if not verbose else verbose
+        self._parallel = None
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __getstate__(self):
+        # Worker pools are not transferable: an unpickled session is closed
+        state = self.__dict__.copy()
+        state['_parallel'] = None
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    @property
+    def active(self):
+        """Whether the session holds a live worker pool"""
+        return self._parallel is not None
+
+    def open(self):
+        """Start the worker pool"""
+        with self._lock:
+            if self._parallel is None:
+                parallel = Parallel(
+                    n_jobs=self.n_jobs, max_nbytes=None, mmap_mode='w+',
+                    verbose=self.verbose, backend=self.backend)
+                self._parallel = parallel.__enter__()
+        return self
+
+    def close(self):
+        """Shut down the worker pool"""
+        with self._lock:
+            parallel = self._parallel
+            self._parallel = None
+            if parallel is not None:
+                parallel.__exit__(None, None, None)
+
+    def lease(self):
+        """Return a context manager that holds the worker pool for a job"""
+        return _Lease(self)
+
+
+class _Lease(object):
+
+    """Exclusive use of a session's worker pool"""
+
+    def __init__(self, session):
+        self.session = session
+
+    def __enter__(self):
+        self.session._lock.acquire()
+        if not self.session.active:
+            self.session._lock.release()
+            raise ParallelProcessingError("Session is closed.")
+        return self.session._parallel
+
+    def __exit__(self, *args):
+        self.session._lock.release()
+
+
 ###############################################################################
 class Job(object):
 
@@ -172,13 +590,31 @@ class Job(object):
 
     predict_out : array_like of shape [n_out_samples, n_out_features], optional
         prediction output array
+
+    shm : list, optional
+        shared memory segments owned by the job.
+
+    inputs : list, optional
+        keys of input arrays pinned in the input registry.
+
+    store : :class:`~mlens.parallel.store.CacheStore`, optional
+        estimation cache store. If set, sub-caches are created in the store
+        instead of in ``dir``.
+
+    order : array-like of shape [n_in_samples,], optional
+        permutation of the rows of ``predict_in`` and ``targets`` if
+        shuffled, applied when tasks slice their folds.
+
+        .. versionadded:: 0.2.3
     """
 
     __slots__ = ['targets', 'predict_in', 'predict_out', 'dir', 'job', 'tmp',
-                 '_n_dir', 'kwargs', 'stack', 'split']
+                 '_n_dir', 'kwargs', 'stack', 'split', 'shm', 'inputs',
+                 'store', 'order']
 
     def __init__(self, job, stack, split, dir=None, tmp=None, predict_in=None,
-                 targets=None, predict_out=None):
+                 targets=None, predict_out=None, shm=None, inputs=None,
+                 store=None, order=None):
         self.job = job
         self.stack = stack
         self.split = split
@@ -188,6 +624,10 @@ class Job(object):
         self.predict_out = predict_out
         self.tmp = tmp
         self.dir = dir
+        self.shm = shm if shm is not None else list()
+        self.inputs = inputs if inputs is not None else list()
+        self.store = store
+        self.order = order
         self._n_dir = 0
 
     def clear(self):
@@ -210,6 +650,10 @@ class Job(object):
 
         if self.stack:
             self.predict_in = self.predict_out
+            if self.order is not None:
+                # Predictions are in shuffled order
+                self.targets = self.targets[self.order]
+                self.order = None
             self.rebase()
 
     def rebase(self):
@@ -237,7 +681,11 @@ class Job(object):
     def shuffle(self, random_state):
         """Shuffle inputs.
 
-        Permutes the indexing of ``predict_in`` and ``y`` arrays.
+        Permutes the indexing of ``predict_in`` and ``y`` arrays. Arrays are
+        not copied: the permutation is stored in ``order`` and applied
+        when tasks slice their folds.
+
+        .. versionchanged:: 0.2.3
 
         Parameters
         ----------
@@ -246,8 +694,18 @@ class Job(object):
         """
         r = check_random_state(random_state)
         idx = r.permutation(self.targets.shape[0])
-        self.predict_in = self.predict_in[idx]
-        self.targets = self.targets[idx]
+        self.order = idx if self.order is None else self.order[idx]
+
+    def permute(self):
+        """Copy ``predict_in`` and ``targets`` in the order of ``order``.
+
+        .. versionadded:: 0.2.3
+        """
+        if self.order is None:
+            return
+        self.predict_in = self.predict_in[self.order]
+        self.targets = self.targets[self.order]
+        self.order = None
 
     def subdir(self):
         """Return a cache subdirectory
@@ -260,15 +718,19 @@ class Job(object):
 
         Returns
         -------
-        cache : str, list
-            Either a string pointing to a cache persisted to disk, or an
-            in-memory cache in the form of a list.
+        cache : str, list, :class:`~mlens.parallel.store.CacheStore`
+            Either a string pointing to a cache persisted to disk, an
+            in-memory cache in the form of a list, or a sub-cache of the
+            job's cache store.
         """
         path_name = "task_%s" % str(self._n_dir)
         if self.split:
             # Increment sub-cache counter
             self._n_dir += 1
 
+        if self.store is not None:
+            return self.store.subcache(path_name, exist_ok=not self.split)
+
         if isinstance(self.dir, str):
             path = os.path.join(self.dir, path_name)
             cache_exists = os.path.exists(path)
@@ -324,6 +786,10 @@ class Job(object):
             main_feed['y'] = self.targets
             aux_feed['y'] = self.targets
 
+            if self.order is not None:
+                main_feed['order'] = self.order
+                aux_feed['order'] = self.order
+
         out = dict()
         if kwargs:
             out.update(kwargs)
@@ -355,26 +821,71 @@ class BaseProcessor(object):
     verbose: bool, int, optional
         Level of verbosity of the
         :class:`~mlens.externals.joblib.parallel.Parallel` instance.
+
+    storage : str, optional
+        Storage of input and prediction arrays if ``backend != 'threading'``.
+        One of ``'mmap'`` (memory-mapped files in the estimation cache) and
+        ``'shm'`` (named shared memory segments). Defaults to the global
+        setting, see :func:`~mlens.config.set_storage`.
+
+    session : :class:`Session`, optional
+        Long-lived worker pool to run jobs on. If the session is active,
+        its ``backend`` and ``n_jobs`` take precedence.
+
+        .. versionadded:: 0.2.3
+
+    cache : str, :class:`~mlens.parallel.store.CacheStore`, optional
+        Store for fitted estimators. One of ``'memory'`` (indexed in-memory
+        store, requires ``backend='threading'``), ``'disk'`` (pickle files
+        with a manifest per learner) and ``'sqlite'`` (single database file),
+        or a store instance. Defaults to a list cache with threading and a
+        directory of pickle files otherwise.
+
+        .. versionadded:: 0.2.3
     """
 
     __meta_class__ = ABCMeta
 
     __slots__ = ['caller', '__initialized__', '__threading__', 'job',
-                 'n_jobs', 'backend', 'verbose']
+                 'n_jobs', 'backend', 'verbose', 'storage', 'session',
+                 'cache']
 
     @abstractmethod
-    def __init__(self, backend=None, n_jobs=None, verbose=None):
+    def __init__(self, backend=None, n_jobs=None, verbose=None, storage=None,
+                 session=None, cache=None):
         self.job = None
         self.__initialized__ = 0
+        self.cache = cache
 
+        if session is not None and session.active:
+            backend, n_jobs = session.backend, session.n_jobs
+            storage = getattr(session, 'storage', None) or storage
+        else:
+            session = None
+
+        self.session = session
         self.backend = config.get_backend() if not backend else backend
         self.n_jobs = -1 if not n_jobs else n_jobs
         self.verbose = False if not verbose else verbose
+        self.storage = config.get_storage() if not storage else storage
         self.__threading__ = self.backend == 'threading'
 
+        if self.storage not in ('mmap', 'shm'):
+            raise ValueError("Storage must be one of 'mmap', 'shm'. "
+                             "Got %r" % self.storage)
+
     def __enter__(self):
         return self
 
+    def _parallel(self):
+        """Return a worker pool context for the current job"""
+        if self.session is not None:
+            return self.session.lease()
+        tf = self.job.dir if not isinstance(self.job.dir, list) else None
+        return Parallel(n_jobs=self.n_jobs, temp_folder=tf, max_nbytes=None,
+                        mmap_mode='w+', verbose=self.verbose,
+                        backend=self.backend)
+
     def initialize(self, job, X, y, path,
                    warm_start=False, return_preds=False, **kwargs):
         """Initialize processing engine.
@@ -438,7 +949,9 @@ class BaseProcessor(object):
         further details.
         """
         job = Job(job, **kwargs)
-        job = _set_path(job, path, self.__threading__)
+        job = _set_path(job, path, self.__threading__, self.cache)
+        if self.cache is not None:
+            job.store = make_store(self.cache, job.dir, self.__threading__)
 
         # --- Prepare inputs
         for name, arr in zip(('X', 'y'), (X, y)):
@@ -448,18 +961,24 @@ class BaseProcessor(object):
             # Dump data in cache
             if self.__threading__:
                 # No need to memmap
-                f = None
                 if isinstance(arr, str):
                     arr = _load(arr)
+            elif config.get_input_cache() > 0 and not isinstance(arr, str):
+                # Re-use inputs materialized by previous calls
+                arr, key = _INPUTS.load(arr, self.storage)
+                job.inputs.append(key)
+            elif _shareable(arr, self.storage):
+                # Workers attach to the segment(s) without copying
+                arr = share_sparse(arr) if issparse(arr) else share_array(arr)
+                job.shm.extend(_shared_segments(arr))
             else:
-                f = dump_array(arr, name, job.dir)
+                arr = _load_mmap(dump_array(arr, name, job.dir))
 
             # Store data for processing
-            if name == 'y' and arr is not None:
-                job.targets = arr if self.__threading__ else _load_mmap(f)
+            if name == 'y':
+                job.targets = arr
             elif name == 'X':
-                job.predict_in = arr \
-                    if self.__threading__ else _load_mmap(f)
+                job.predict_in = arr
 
         self.job = job
         self.__initialized__ = 1
@@ -480,6 +999,23 @@ class BaseProcessor(object):
             path = job.dir
             path_handle = job.tmp
 
+            # Close stores created for the job
+            if job.store is not None and job.store is not self.cache:
+                job.store.close()
+
+            # Remove shared memory segments from the system namespace.
+            # Segments are unmapped once all views on them are released.
+            for shm in job.shm:
+                _unlink(shm)
+
+            # Unpin registered inputs
+            if job.inputs:
+                _INPUTS.release(job.inputs)
+
+            # Drop pipelines loaded from the cache before it is removed
+            if isinstance(path, str):
+                PIPELINES.clear(path)
+
             # Release shared memory references
             del job
             gc.collect()
@@ -707,10 +1243,7 @@ class ParallelProcessing(BaseProcessor):
         return_final = out.pop('return_final', False)
         out = list() if return_names else None
 
-        tf = self.job.dir if not isinstance(self.job.dir, list) else None
-        with Parallel(n_jobs=self.n_jobs, temp_folder=tf, max_nbytes=None,
-                      mmap_mode='w+', verbose=self.verbose,
-                      backend=self.backend) as parallel:
+        with self._parallel() as parallel:
 
             for task in caller:
                 self.job.clear()
@@ -730,6 +1263,11 @@ class ParallelProcessing(BaseProcessor):
         """Process given task"""
         if self.job.job == 'fit' and getattr(task, 'shuffle', False):
             self.job.shuffle(getattr(task, 'random_state', None))
+            if _fits_on_data(task):
+                # Indexers must be fitted on the shuffled data
+                self.job.permute()
+            elif not self.__threading__:
+                self._persist_order()
 
         task.setup(self.job.predict_in, self.job.targets, self.job.job)
 
@@ -741,6 +1279,16 @@ class ParallelProcessing(BaseProcessor):
         if not task.__no_output__ and getattr(task, 'n_feature_prop', 0):
             self._propagate_features(task)
 
+    def _persist_order(self):
+        """Persist the shuffle permutation for workers to read"""
+        order = self.job.order
+        if self.storage == 'shm':
+            order = share_array(order)
+            self.job.shm.append(order._shm)
+        else:
+            order = _load_mmap(dump_array(order, 'order', self.job.dir))
+        self.job.order = order
+
     def _propagate_features(self, task):
         """Propagate features from input array to output array."""
         p_out, p_in = self.job.predict_out, self.job.predict_in
@@ -749,15 +1297,22 @@ class ParallelProcessing(BaseProcessor):
         n_in, n_out = p_in.shape[0], p_out.shape[0]
         r = int(n_in - n_out)
 
+        if self.job.order is None:
+            p_prop = p_in[r:, task.propagate_features]
+        else:
+            # Rows of the shuffled input
+            p_prop = p_in[:, task.propagate_features][self.job.order[r:]]
+
         if not issparse(p_in):
             # Simple item setting
-            p_out[:, :task.n_feature_prop] = p_in[r:, task.propagate_features]
+            p_out[:, :task.n_feature_prop] = p_prop
         else:
-            # Need to populate propagated features using scipy sparse hstack
+            # Assemble sparse propagated features and dense predictions
+            # once, directly in the csr format used by subsequent layers
             self.job.predict_out = hstack(
-                [p_in[r:, task.propagate_features],
-                 p_out[:, task.n_feature_prop:]]
-            ).tolil()
+                [p_prop.tocsr(),
+                 csr_matrix(p_out[:, task.n_feature_prop:])],
+                format='csr')
 
     def _gen_prediction_array(self, task, job, threading):
         """Generate prediction array either in-memory or persist to disk."""
@@ -767,14 +1322,25 @@ class ParallelProcessing(BaseProcessor):
         else:
             f = os.path.join(self.job.dir, '%s_out_array.mmap' % task.name)
             try:
-                self.job.predict_out = np.memmap(
-                    filename=f, dtype=_dtype(task), mode='w+', shape=shape)
+                if self.storage == 'shm':
+                    self.job.predict_out = share_array(
+                        shape=shape, dtype=_dtype(task))
+                    self.job.shm.append(self.job.predict_out._shm)
+                else:
+                    self.job.predict_out = np.memmap(
+                        filename=f, dtype=_dtype(task), mode='w+',
+                        shape=shape)
+            except ParallelProcessingError:
+                raise
             except Exception as exc:
                 raise OSError(
                     "Cannot create prediction matrix of shape ("
-                    "%i, %i), size %i MBs, for %s.\n Details:\n%r" %
-                    (shape[0], shape[1], 8 * shape[0] * shape[1] / (1024 ** 2),
-                     task.name, exc))
+                    "%i, %i), size %i MBs, for %s. Use the planner in "
+                    "mlens.parallel.planner to check memory and disk needs "
+                    "upfront.\n Details:\n%r" %
+                    (shape[0], shape[1],
+                     np.dtype(_dtype(task)).itemsize * shape[0] * shape[1] /
+                     (1024 ** 2), task.name, exc))
 
     def get_preds(self, dtype=None, order='C'):
         """Return prediction matrix.
@@ -847,10 +1413,7 @@ class ParallelEvaluation(BaseProcessor):
         check_initialized(self)
 
         # Use context manager to ensure same parallel job during entire process
-        tf = self.job.dir if not isinstance(self.job.dir, list) else None
-        with Parallel(n_jobs=self.n_jobs, temp_folder=tf, max_nbytes=None,
-                      mmap_mode='w+', verbose=self.verbose,
-                      backend=self.backend) as parallel:
+        with self._parallel() as parallel:
 
             caller.indexer.fit(self.job.predict_in, self.job.targets, self.job.job)
             caller(parallel, self.job.args(**kwargs), case)
@@ -0,0 +1,747 @@
+"""ML-Ensemble
+
+:author: Sebastian Flennerhag
+:license: MIT
+:copyright: 2017-2018
+
+Multi-node estimation over TCP.
+
+A :class:`Cluster` is a :class:`~mlens.parallel.backend.Session` whose
+workers are processes on any host, connected over TCP to a coordinator in
+the main process. Start workers with :func:`serve`, or from the command
+line::
+
+    python -m mlens.parallel.cluster HOST:PORT --authkey KEY
+
+Each task is pickled and sent to an idle worker. References to arrays and
+caches are replaced in transit:
+
+    - input arrays are streamed once to each worker in row blocks and kept
+      until the end of the job, or opened from their file if the cluster
+      has a shared path.
+    - prediction arrays are replaced by a recorder. The prediction blocks
+      assigned by the task are returned with the task's result and written
+      into the prediction array by the coordinator.
+    - estimation caches are replaced by a :class:`RemoteStore` that
+      forwards cache reads and writes to the coordinator.
+
+Tasks and results are pickled, so workers must be able to import all
+estimators of the ensemble. Since unpickling can run arbitrary code,
+connections are authenticated with the cluster's ``authkey``, which is
+random unless given. Unauthenticated connections are only accepted on
+loopback addresses.
+"""
+from __future__ import division, print_function
+
+import io
+import os
+import sys
+import mmap
+import pickle
+import socket
+import argparse
+import binascii
+import threading
+import traceback
+from collections import deque
+from multiprocessing.connection import Listener, Client
+
+import numpy as np
+
+from .. import config
+from ..utils import pickle_load, time
+from ..utils.utils import pickled
+from ..utils.exceptions import ParallelProcessingError
+from ..externals.joblib.parallel import Parallel
+from ..externals.joblib._parallel_backends import ParallelBackendBase
+from ._base_functions import save, prune_files, _exists
+from .backend import Session, _Lease
+from .store import CacheStore
+
+# Plain arrays smaller than this are pickled with the task
+INLINE_NBYTES = 2 ** 20
+
+# Inputs are sent to workers in row blocks of at most this size
+BLOCK_NBYTES = 2 ** 24
+
+
+def _loopback(host):
+    """Check if a host only accepts connections from the local machine"""
+    try:
+        return socket.gethostbyname(host).startswith('127.')
+    except (socket.error, UnicodeError):
+        return False
+
+
+def _check_authkey(address, authkey):
+    """Refuse unauthenticated connections beyond the local machine"""
+    if not authkey and not _loopback(address[0]):
+        raise ValueError(
+            "An authkey is required for connections on %r: workers and "
+            "coordinators unpickle the messages they receive." % (address,))
+
+
+def _dumps(obj):
+    """Pickle a message"""
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _transportable(exc):
+    """Return the exception if it can be pickled, else a generic error"""
+    try:
+        pickle.dumps(exc)
+        return exc
+    except Exception:  # pylint: disable=broad-except
+        return ParallelProcessingError(
+            "Task failed on worker:\n%s" % traceback.format_exc())
+
+
+###############################################################################
+class _TaskPickler(pickle.Pickler):
+
+    """Pickler replacing arrays and caches with references"""
+
+    def __init__(self, file, cluster):
+        pickle.Pickler.__init__(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.cluster = cluster
+        self.inputs = set()
+
+    def persistent_id(self, obj):
+        pid = self.cluster._reference(obj, self.inputs)
+        if pid is not None:
+            # Components of the pid would be passed to persistent_id again
+            pid = pickle.dumps(pid, protocol=pickle.HIGHEST_PROTOCOL)
+        return pid
+
+
+class _TaskUnpickler(pickle.Unpickler):
+
+    """Unpickler resolving references to arrays and caches"""
+
+    def __init__(self, file, worker):
+        pickle.Unpickler.__init__(self, file)
+        self.worker = worker
+
+    def persistent_load(self, pid):
+        return self.worker._resolve(pickle.loads(pid))
+
+
+class _OutputBlocks(object):
+
+    """Recorder of the prediction blocks assigned by a remote task"""
+
+    def __init__(self, key, shape, dtype):
+        self.key = key
+        self.shape = shape
+        self.ndim = len(shape)
+        self.dtype = np.dtype(dtype)
+        self.blocks = list()
+
+    def __setitem__(self, index, value):
+        self.blocks.append((index, np.asarray(value)))
+
+
+class RemoteStore(CacheStore):
+
+    """Estimation cache of the coordinator, as seen from a worker.
+
+    Cache reads and writes are forwarded to the coordinator, which applies
+    them to the job's cache.
+
+    .. versionadded:: 0.2.3
+
+    Parameters
+    ----------
+    worker : obj
+        worker connection.
+
+    key : str, tuple
+        reference of the cache on the coordinator.
+    """
+
+    def __init__(self, worker, key):
+        self.worker = worker
+        self.key = key
+
+    def __repr__(self):
+        return 'RemoteStore(%r)' % (self.key,)
+
+    def save(self, name, obj):
+        self.worker.call('save', self.key, name, obj)
+
+    def load(self, name):
+        return self.worker.call('load', self.key, name)
+
+    def exists(self, name):
+        return self.worker.call('exists', self.key, name)
+
+    def prune(self, name):
+        return self.worker.call('prune', self.key, name)
+
+    def subcache(self, name, exist_ok=True):
+        raise ParallelProcessingError(
+            "Sub-caches of a job are created by the coordinator.")
+
+
+class _Worker(object):
+
+    """Worker end of a connection to a coordinator"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.arrays = dict()
+        self.outputs = list()
+
+    def send(self, msg):
+        self.conn.send_bytes(_dumps(msg))
+
+    def recv(self):
+        return pickle.loads(self.conn.recv_bytes())
+
+    def call(self, method, *args):
+        """Call a cache method on the coordinator"""
+        self.send(('call', method) + args)
+        while True:
+            msg = self.recv()
+            if msg[0] == 'return':
+                return msg[1]
+            if msg[0] == 'raise':
+                raise msg[1]
+            self._handle(msg)
+
+    def _handle(self, msg):
+        """Handle a control message. Returns False on close"""
+        if msg[0] == 'array':
+            _, key, shape, dtype, order = msg
+            self.arrays[key] = np.empty(shape, dtype=dtype, order=order)
+        elif msg[0] == 'block':
+            _, key, start, block = msg
+            self.arrays[key][start:start + block.shape[0]] = block
+        elif msg[0] == 'clear':
+            self.arrays.clear()
+        return msg[0] != 'close'
+
+    def _resolve(self, pid):
+        """Object referenced by a persistent id"""
+        kind = pid[0]
+        if kind == 'in':
+            return self.arrays[pid[1]]
+        if kind == 'file':
+            _, f, offset, shape, dtype, order = pid
+            key = (f, offset)
+            if key not in self.arrays:
+                self.arrays[key] = np.memmap(
+                    f, dtype=dtype, mode='r', offset=offset, shape=shape,
+                    order=order)
+            return self.arrays[key]
+        if kind == 'out':
+            out = _OutputBlocks(*pid[1:])
+            self.outputs.append(out)
+            return out
+        if kind == 'cache':
+            return RemoteStore(self, pid[1])
+        raise ParallelProcessingError("Unknown reference: %r" % (pid,))
+
+    def run(self):
+        """Process tasks until the coordinator closes the connection"""
+        while True:
+            try:
+                msg = self.recv()
+            except (EOFError, OSError, IOError):
+                break
+
+            if msg[0] == 'task':
+                msg = self._run(msg[1])
+                try:
+                    data = _dumps(msg)
+                except Exception as exc:  # pylint: disable=broad-except
+                    data = _dumps(('error', _transportable(exc)))
+                self.conn.send_bytes(data)
+            elif not self._handle(msg):
+                break
+        self.conn.close()
+
+    def _run(self, payload):
+        """Run a batch of tasks"""
+        self.outputs = list()
+        try:
+            batch = _TaskUnpickler(io.BytesIO(payload), self).load()
+            result = batch()
+            blocks = [(out.key, out.blocks) for out in self.outputs
+                      if out.blocks]
+            msg = ('done', result, blocks)
+        except Exception as exc:  # pylint: disable=broad-except
+            traceback.print_exc(file=sys.stderr)
+            msg = ('error', _transportable(exc))
+        self.outputs = list()
+        return msg
+
+
+def serve(address, authkey=None):
+    """Run a worker for a :class:`Cluster`.
+
+    Connects to the coordinator and processes tasks until the cluster is
+    closed.
+
+    .. versionadded:: 0.2.3
+
+    Parameters
+    ----------
+    address : tuple
+        ``(host, port)`` of the coordinator.
+
+    authkey : bytes, optional
+        authentication key of the cluster. Required unless the coordinator
+        is on a loopback address.
+    """
+    _check_authkey(address, authkey)
+    _Worker(Client(address, authkey=authkey or None)).run()
+
+
+###############################################################################
+class _Future(object):
+
+    """Result of a batch sent to a worker"""
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self._event = threading.Event()
+        self._result = None
+        self._error = None
+
+    def set(self, result=None, error=None):
+        """Set the result of the batch"""
+        self._result = result
+        self._error = error
+        self._event.set()
+        if error is None and self.callback is not None:
+            self.callback(result)
+
+    def get(self):
+        """Wait for and return the result of the batch"""
+        self._event.wait()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class _Node(object):
+
+    """Coordinator end of a connection to a worker"""
+
+    def __init__(self, conn, cluster):
+        self.conn = conn
+        self.cluster = cluster
+        self.future = None
+        self.sent = set()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self.listen)
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+
+    def send(self, msg):
+        with self._lock:
+            self.conn.send_bytes(_dumps(msg))
+
+    def close(self):
+        try:
+            self.send(('close',))
+        except (OSError, IOError, ValueError):
+            pass
+        self.conn.close()
+
+    def listen(self):
+        """Handle messages from the worker"""
+        while True:
+            try:
+                msg = pickle.loads(self.conn.recv_bytes())
+            except (EOFError, OSError, IOError):
+                self.cluster._lost(self)
+                return
+
+            if msg[0] == 'call':
+                try:
+                    reply = ('return', self.cluster._call(*msg[1:]))
+                except Exception as exc:  # pylint: disable=broad-except
+                    reply = ('raise', _transportable(exc))
+                self.send(reply)
+            elif msg[0] == 'done':
+                self.cluster._write(msg[2])
+                self.cluster._complete(self, result=msg[1])
+            elif msg[0] == 'error':
+                self.cluster._complete(self, error=msg[1])
+
+
+def _stream(node, key, array):
+    """Send an input array to a worker in row blocks"""
+    array = np.asarray(array)
+    order = 'F' if (array.flags.f_contiguous and not
+                    array.flags.c_contiguous) else 'C'
+    node.send(('array', key, array.shape, array.dtype.str, order))
+
+    row = array.itemsize * int(np.prod(array.shape[1:]))
+    step = max(1, BLOCK_NBYTES // max(row, 1))
+    for start in range(0, array.shape[0], step):
+        block = np.ascontiguousarray(array[start:start + step])
+        node.send(('block', key, start, block))
+
+
+class SocketBackend(ParallelBackendBase):
+
+    """Joblib backend dispatching batches to the workers of a cluster.
+
+    .. versionadded:: 0.2.3
+    """
+
+    def __init__(self, cluster):
+        self.cluster = cluster
+
+    def effective_n_jobs(self, n_jobs):
+        return max(1, len(self.cluster._nodes))
+
+    def apply_async(self, func, callback=None):
+        return self.cluster.submit(func, callback)
+
+    def abort_everything(self, ensure_ready=True):
+        self.cluster._abort()
+
+
+class _ClusterLease(_Lease):
+
+    """Exclusive use of a cluster. Releases job data on exit"""
+
+    def __exit__(self, *args):
+        try:
+            self.session._clear()
+        finally:
+            super(_ClusterLease, self).__exit__(*args)
+
+
+class Cluster(Session):
+
+    """Worker pool of processes connected over TCP.
+
+    A cluster listens for workers started with :func:`serve` on this or
+    other hosts, and is used as a :class:`~mlens.parallel.backend.Session`
+    by processing managers. Opening the cluster waits for ``n_workers``
+    workers to connect. Workers can join at any time, and a worker that
+    disconnects fails the task it was running.
+
+    Input and prediction arrays are memory-mapped on the coordinator. Inputs
+    are sent to each worker once per job, unless ``shared=True``, in which
+    case workers open the coordinator's files directly and use its cache
+    directory. This requires :func:`~mlens.config.set_tmpdir` to point to a
+    file system shared with all workers.
+
+    .. versionadded:: 0.2.3
+
+    Parameters
+    ----------
+    address : tuple, optional
+        ``(host, port)`` to listen on. Defaults to ``('localhost', 0)``,
+        with port 0 binding to a free port.
+
+    n_workers : int (default = 1)
+        number of workers to wait for when opening the cluster.
+
+    authkey : bytes, optional
+        authentication key. Workers must connect with the same key, which is
+        available as the ``authkey`` attribute. Defaults to a random key.
+        Pass ``b''`` to accept unauthenticated workers, which is only allowed
+        on loopback addresses.
+
+    shared : bool (default = False)
+        whether workers share the coordinator's file system.
+
+    timeout : float (default = 60)
+        seconds to wait for workers to connect.
+
+    verbose : bool, int, optional
+        Level of verbosity of the
+        :class:`~mlens.externals.joblib.parallel.Parallel` instance.
+
+    Examples
+    --------
+    >>> from mlens.parallel import Cluster, ParallelProcessing
+    >>> with Cluster(('0.0.0.0', 5000), 8, authkey=b'key') as cluster:
+    ...     with ParallelProcessing(session=cluster) as manager:
+    ...         manager.stack(layers, 'fit', X, y)
+    """
+
+    _RUNTIME = ['_listener', '_nodes', '_idle', '_queue', '_inputs',
+                '_outputs', '_caches', '_cond']
+
+    def __init__(self, address=None, n_workers=1, authkey=None, shared=False,
+                 timeout=60, verbose=None):
+        super(Cluster, self).__init__('socket', n_workers, verbose)
+        self.address = address if address is not None else ('localhost', 0)
+        if authkey is None:
+            # Printable, so that it can be passed on the command line
+            authkey = binascii.hexlify(os.urandom(16))
+        self.authkey = authkey
+        self.shared = shared
+        self.timeout = timeout
+        self.storage = 'mmap'
+        self._reset()
+
+    def _reset(self):
+        """Initialize runtime state"""
+        self._listener = None
+        self._nodes = list()
+        self._idle = deque()
+        self._queue = deque()
+        self._inputs = dict()
+        self._outputs = dict()
+        self._caches = dict()
+        self._cond = threading.Condition()
+
+    def __getstate__(self):
+        state = super(Cluster, self).__getstate__()
+        for attr in self._RUNTIME:
+            state.pop(attr, None)
+        return state
+
+    def __setstate__(self, state):
+        super(Cluster, self).__setstate__(state)
+        self._reset()
+
+    def listen(self):
+        """Start accepting workers. Returns the bound address"""
+        with self._lock:
+            if self._listener is None:
+                _check_authkey(self.address, self.authkey)
+                self._listener = Listener(self.address,
+                                          authkey=self.authkey or None)
+                self.address = self._listener.address
+
+                thread = threading.Thread(target=self._accept,
+                                          args=(self._listener,))
+                thread.daemon = True
+                thread.start()
+        return self.address
+
+    def open(self):
+        """Start the cluster and wait for workers to connect"""
+        with self._lock:
+            if self._parallel is None:
+                self.listen()
+                deadline = time() + self.timeout
+                with self._cond:
+                    while (len(self._nodes) < self.n_jobs and
+                           time() < deadline):
+                        self._cond.wait(deadline - time())
+                    if len(self._nodes) < self.n_jobs:
+                        raise ParallelProcessingError(
+                            "%i of %i workers connected to %r within %is." %
+                            (len(self._nodes), self.n_jobs, self.address,
+                             self.timeout))
+                parallel = Parallel(n_jobs=self.n_jobs, verbose=self.verbose,
+                                    backend=SocketBackend(self))
+                self._parallel = parallel.__enter__()
+        return self
+
+    def close(self):
+        """Disconnect workers and stop listening"""
+        super(Cluster, self).close()
+        with self._lock:
+            with self._cond:
+                listener, self._listener = self._listener, None
+                nodes = list(self._nodes)
+                del self._nodes[:]
+                self._idle.clear()
+            for node in nodes:
+                node.close()
+            if listener is not None:
+                listener.close()
+
+    def lease(self):
+        """Return a context manager that holds the cluster for a job"""
+        return _ClusterLease(self)
+
+    def submit(self, func, callback=None):
+        """Send a batch to the next idle worker"""
+        future = _Future(callback)
+        with self._cond:
+            if not self._nodes:
+                raise ParallelProcessingError("No workers connected.")
+            self._queue.append((func, future))
+        self._dispatch()
+        return future
+
+    def _accept(self, listener):
+        """Accept worker connections until the listener is closed"""
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception:  # pylint: disable=broad-except
+                if self._listener is not listener:
+                    return
+                # Failed authentication
+                continue
+
+            node = _Node(conn, self)
+            with self._cond:
+                self._nodes.append(node)
+                self._idle.append(node)
+                self._cond.notify_all()
+            node.start()
+            self._dispatch()
+
+    def _dispatch(self):
+        """Send queued batches to idle workers"""
+        while True:
+            with self._cond:
+                if not self._queue or not self._idle:
+                    return
+                func, future = self._queue.popleft()
+                node = self._idle.popleft()
+                node.future = future
+
+            try:
+                buf = io.BytesIO()
+                pickler = _TaskPickler(buf, self)
+                pickler.dump(func)
+                for key in pickler.inputs:
+                    if key not in node.sent:
+                        _stream(node, key, self._inputs[key])
+                        node.sent.add(key)
+                node.send(('task', buf.getvalue()))
+            except (OSError, IOError):
+                # Connection lost: the node's listener fails the batch
+                pass
+            except Exception as exc:  # pylint: disable=broad-except
+                self._complete(node, error=exc)
+
+    def _complete(self, node, result=None, error=None):
+        """Resolve the batch of a worker and mark the worker idle"""
+        with self._cond:
+            future, node.future = node.future, None
+            if node in self._nodes:
+                self._idle.append(node)
+        if future is not None:
+            future.set(result, error)
+        self._dispatch()
+
+    def _lost(self, node):
+        """Remove a disconnected worker"""
+        with self._cond:
+            if node in self._nodes:
+                self._nodes.remove(node)
+            if node in self._idle:
+                self._idle.remove(node)
+            future, node.future = node.future, None
+            queued = list()
+            if not self._nodes:
+                queued = [f for _, f in self._queue]
+                self._queue.clear()
+
+        error = ParallelProcessingError("Lost connection to worker.")
+        for f in [future] + queued:
+            if f is not None:
+                f.set(error=error)
+
+    def _abort(self):
+        """Drop queued batches"""
+        with self._cond:
+            self._queue.clear()
+
+    def _clear(self):
+        """Release arrays and caches of the finished job"""
+        with self._cond:
+            self._inputs.clear()
+            self._outputs.clear()
+            self._caches.clear()
+            nodes = list(self._nodes)
+        for node in nodes:
+            node.sent.clear()
+            try:
+                node.send(('clear',))
+            except (OSError, IOError):
+                pass
+
+    def _reference(self, obj, inputs):
+        """Persistent id of an object sent to a worker"""
+        if isinstance(obj, np.ndarray):
+            if (isinstance(obj, np.memmap) and
+                    isinstance(obj.base, mmap.mmap)):
+                key = (obj.filename, obj.offset)
+                order = 'F' if (obj.flags.f_contiguous and not
+                                obj.flags.c_contiguous) else 'C'
+                if obj.mode in ('w+', 'r+'):
+                    self._outputs[key] = obj
+                    return ('out', key, obj.shape, obj.dtype.str)
+                if self.shared:
+                    return ('file', obj.filename, obj.offset, obj.shape,
+                            obj.dtype.str, order)
+            elif obj.nbytes >= INLINE_NBYTES:
+                # Held in the registry until the job ends: id is not reused
+                key = ('id', id(obj))
+            else:
+                return None
+            self._inputs[key] = obj
+            inputs.add(key)
+            return ('in', key)
+
+        if self.shared:
+            return None
+
+        if isinstance(obj, CacheStore):
+            key = ('store', id(obj))
+            self._caches[key] = obj
+            return ('cache', key)
+
+        if isinstance(obj, str) and obj.startswith(
+                os.path.join(config.get_tmpdir(), config.get_prefix())):
+            self._caches[obj] = obj
+            return ('cache', obj)
+        return None
+
+    def _call(self, method, key, name, obj=None):
+        """Apply a cache method of a worker's remote store"""
+        cache = self._caches[key]
+        if method == 'save':
+            return save(cache, name, obj)
+        if method == 'exists':
+            return _exists(cache, name)
+        if method == 'prune':
+            return prune_files(cache, name)
+        if method == 'load':
+            if isinstance(cache, CacheStore):
+                return cache.load(name)
+            f = pickled(os.path.join(cache, name))
+            if not os.path.exists(f):
+                raise KeyError(name)
+            return pickle_load(f)
+        raise ValueError("Unknown cache method: %s" % method)
+
+    def _write(self, blocks):
+        """Write prediction blocks returned by a worker"""
+        for key, items in blocks:
+            out = self._outputs.get(key)
+            if out is None:
+                # Job was aborted
+                continue
+            for index, value in items:
+                out[index] = value
+
+
+def main(argv=None):
+    """Command line entry point for workers"""
+    parser = argparse.ArgumentParser(
+        description="Start an ML-Ensemble cluster worker.")
+    parser.add_argument('address', help="coordinator address as HOST:PORT")
+    parser.add_argument('--authkey', default=os.environ.get('MLENS_AUTHKEY'),
+                        help="authentication key of the cluster. Defaults "
+                             "to the MLENS_AUTHKEY environment variable. "
+                             "Required unless HOST is a loopback address.")
+    args = parser.parse_args(argv)
+
+    host, port = args.address.rsplit(':', 1)
+    authkey = args.authkey.encode() if args.authkey else None
+    serve((host, int(port)), authkey)
+
+
+if __name__ == '__main__':
+    main()
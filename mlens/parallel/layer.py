@@ -14,9 +14,14 @@ Layer module.
 from __future__ import division, print_function
 
 from .base import OutputMixin, IndexMixin, BaseStacker
+from ._base_functions import mark, IndexedTask
+from .scheduler import schedule, batch, provides, COSTS
+from .threads import govern
 from ..utils import time, print_time, safe_print, format_name
 from ..utils.exceptions import NotFittedError
 from ..externals.joblib import delayed
+from ..externals.joblib._parallel_backends import (ThreadingBackend,
+                                                   SequentialBackend)
 from ..metrics import Data
 
 
@@ -131,32 +136,54 @@ class Layer(OutputMixin, IndexMixin, BaseStacker):
                        file=f, end=e1)
             t0 = time()
 
-        if self.transformers:
-            if self.verbose >= 2:
-                safe_print(msg.format('Preprocess pipelines ...'),
-                           file=f, end=e2)
-                t1 = time()
-
-            parallel(delayed(subtransformer, not _threading)()
-                     for transformer in self.transformers
-                     for subtransformer in transformer(args, 'auxiliary'))
-
-            if self.verbose >= 2:
-                print_time(t1, 'done', file=f)
-
         if self.verbose >= 2:
-            safe_print(msg.format('Learners ...'), file=f, end=e2)
+            safe_print(msg.format('Pipelines and learners ...'),
+                       file=f, end=e2)
             t1 = time()
 
-        parallel(delayed(sublearner, not _threading)()
-                 for learner in self.learners
-                 for sublearner in learner(args, 'main'))
+        # Tasks are ordered by the costs recorded in previous runs of this
+        # layer
+        scope = self.name
+        transformers = [subtransformer for transformer in self.transformers
+                        for subtransformer in transformer(args, 'auxiliary')]
+        tasks = schedule(
+            transformers,
+            (sublearner for learner in self.learners
+             for sublearner in learner(args, 'main')), scope=scope)
+
+        # pylint: disable=protected-access
+        in_process = (ThreadingBackend, SequentialBackend)
+        if isinstance(parallel._backend, in_process):
+            # Learners start as soon as their own pipeline is cached. Marking
+            # pipelines as running lets learners wait on pipelines that are
+            # yet to start
+            for task in transformers:
+                mark(args['dir'], provides(task), 'run')
+            phases = [tasks]
+            path = None
+        else:
+            # Workers in other processes are not notified of cache writes:
+            # pipelines are cached before learners start
+            n = len(transformers)
+            phases = [tasks[:n], tasks[n:]]
+
+            # Workers share the fold indexes they compile through the cache
+            path = args['dir']
+
+        with govern(parallel, _threading) as wrap:
+            for tasks in [phase for phase in phases if phase]:
+                # pylint: disable=protected-access
+                tasks = batch(tasks, parallel._effective_n_jobs(),
+                              scope=scope)
+                parallel(delayed(IndexedTask(wrap(task), path),
+                                 not _threading)() for task in tasks)
 
         if self.verbose >= 2:
             print_time(t1, 'done', file=f)
 
         if job == 'fit':
             self.collect()
+            COSTS.record(self.transformers + self.learners, scope)
 
         if self.verbose:
             msg = "done" if self.verbose == 1 \
@@ -14,14 +14,17 @@ estimation on cross-validation sub-graphs.
 from __future__ import print_function, division
 
 import warnings
-from copy import deepcopy
+from copy import copy, deepcopy
 from abc import ABCMeta, abstractmethod
 
 from ._base_functions import (
     slice_array, set_output_columns, assign_predictions, score_predictions,
-    replace, save, load, prune_files, check_params)
+    replace, save, produce, wait, prune_files, check_params,
+    save_arrays, load_arrays, _exists, PIPELINES)
 from .base import OutputMixin, ProbaMixin, IndexMixin, BaseEstimator
+from .memo import fingerprint, memo_key, memo_load, memo_save
 
+from .. import config
 from ..metrics import Data
 from ..utils import safe_print, print_time, format_name, assert_valid_pipeline
 from ..utils.exceptions import (NotFittedError, FitFailedWarning,
@@ -43,6 +46,52 @@ GLOBAL_TRANSFORMER_NAMES = list()
 
 
 ###############################################################################
+def _copy_param(value):
+    """Copy an estimator, or the estimators in a list, tuple or dict"""
+    if hasattr(value, 'get_params'):
+        return copy(value)
+    if isinstance(value, dict):
+        return dict((k, _copy_param(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return [_copy_param(v) for v in value]
+    if isinstance(value, tuple):
+        # Named steps, i.e. (name, estimator)
+        return tuple(copy(v) if hasattr(v, 'get_params') else v
+                     for v in value)
+    return value
+
+
+def copy_estimator(estimator):
+    """Copy an estimator for prediction, sharing its fitted attributes.
+
+    The estimator is copied along with its parameters, and estimators
+    nested in its parameters (such as the steps of a pipeline) are copied
+    in turn. Fitted attributes (ending with an underscore) are shared.
+    Attributes set when predicting are therefore set on the copy, down to
+    one level of nesting. Estimators must not change fitted attributes, or
+    attributes of estimators nested deeper, when predicting.
+
+    .. versionadded:: 0.2.3
+
+    Parameters
+    ----------
+    estimator : obj
+        fitted estimator.
+
+    Returns
+    -------
+    estimator : obj
+        copy of the estimator.
+    """
+    estimator = copy(estimator)
+    state = getattr(estimator, '__dict__', None)
+    if state:
+        for key, value in list(state.items()):
+            if not key.endswith('_'):
+                state[key] = _copy_param(value)
+    return estimator
+
+
 class IndexedEstimator(object):
     """Indexed Estimator
 
@@ -62,8 +111,14 @@ class IndexedEstimator(object):
 
     @property
     def estimator(self):
-        """Deep copy of estimator"""
-        return deepcopy(self._estimator)
+        """Copy of estimator for prediction.
+
+        Fitted attributes are shared with the cached estimator. Parameters,
+        and estimators nested in parameters, are copied one level deep (see
+        :func:`copy_estimator`), so that concurrent tasks can predict with
+        the same fitted estimator.
+        """
+        return copy_estimator(self._estimator)
 
     @estimator.setter
     def estimator(self, estimator):
@@ -103,6 +158,10 @@ class SubLearner(object):
         self.scorer = parent.scorer
         self.raise_on_exception = parent.raise_on_exception
         self.verbose = parent.verbose
+        self.memo = getattr(parent, '_memo', None)
+        self.fingerprint = getattr(parent, '_fingerprint', None)
+        self.order = getattr(parent, '_order', None)
+        self._folds = None
 
         if not parent.__no_output__:
             self.output_columns = parent.output_columns[index[0]]
@@ -129,24 +188,43 @@ class SubLearner(object):
         if path is None:
             path = self.path
         t0 = time()
-        transformers = self._load_preprocess(path)
-
-        self._fit(transformers)
-
-        if self.out_array is not None:
-            self._predict(transformers, self.scorer is not None)
-
-        o = IndexedEstimator(estimator=self.estimator,
-                             name=self.name_index,
-                             index=self.index,
-                             in_index=self.in_index,
-                             out_index=self.out_index,
-                             data=self.data)
 
-        save(path, self.name_index, o)
+        with produce(path, self.name_index):
+            # Transformed folds spare loading the pipeline
+            self._folds = self._load_folds(path)
+            transformers = None
+            if (self._folds is None or self.memo or
+                    (self.out_array is not None and self._folds[2] is None)):
+                transformers = self._load_preprocess(path)
+
+            key = self._memo_key(transformers) if self.memo else None
+            restored = key is not None and self._restore(key)
+            if not restored:
+                self._fit(transformers)
+
+                predictions = None
+                if self.out_array is not None:
+                    predictions = self._predict(
+                        transformers, self.scorer is not None)
+
+                if key is not None:
+                    memo_save(self.memo, key, (self.estimator, predictions,
+                                               self.score_, self.fit_time_,
+                                               self.pred_time_))
+            self._folds = None
+
+            o = IndexedEstimator(estimator=self.estimator,
+                                 name=self.name_index,
+                                 index=self.index,
+                                 in_index=self.in_index,
+                                 out_index=self.out_index,
+                                 data=self.data)
+
+            save(path, self.name_index, o)
 
         if self.verbose:
-            msg = "{:<30} {}".format(self.name_index, "done")
+            msg = "{:<30} {}".format(
+                self.name_index, "restored" if restored else "done")
             f = "stdout" if self.verbose < 10 - 3 else "stderr"
             print_time(t0, msg, file=f)
 
@@ -169,12 +247,9 @@ class SubLearner(object):
 
     def _fit(self, transformers):
         """Sub-routine to fit sub-learner"""
-        xtemp, ytemp = slice_array(self.in_array, self.targets, self.in_index)
-
         # Transform input (triggers copying)
         t0 = time()
-        if transformers:
-            xtemp, ytemp = transformers.transform(xtemp, ytemp)
+        xtemp, ytemp = self._fold(transformers, self.in_index, False)
 
         # Fit estimator
         self.estimator.fit(xtemp, ytemp)
@@ -183,20 +258,64 @@ class SubLearner(object):
     def _load_preprocess(self, path):
         """Load preprocessing pipeline"""
         if self.preprocess is not None:
-            obj = load(path, self.preprocess_index, self.raise_on_exception)
+            obj = PIPELINES.load(
+                path, self.preprocess_index, self.raise_on_exception)
             return obj.estimator
         return
 
+    def _load_folds(self, path):
+        """Load folds transformed by the preprocessing pipeline, if cached"""
+        if self.preprocess is None:
+            return None
+
+        # Folds are saved before the pipeline
+        wait(path, self.preprocess_index)
+        name = '.%s.fold' % self.preprocess_index
+        if not _exists(path, name):
+            return None
+        return load_arrays(path, name)
+
+    def _fold(self, transformers, index, test):
+        """Slice and transform a fold, or get it from the cached folds"""
+        if self._folds is not None:
+            i = 2 if test else 0
+            if self._folds[i] is not None:
+                return self._folds[i], self._folds[i + 1]
+
+        xtemp, ytemp = slice_array(
+            self.in_array, self.targets, index, order=self.order)
+        if transformers:
+            xtemp, ytemp = transformers.transform(xtemp, ytemp)
+        return xtemp, ytemp
+
+    def _memo_key(self, transformers):
+        """Key of the sub-learner in the memo directory"""
+        return memo_key(self.estimator, self.attr, self.scorer,
+                        self.out_array is not None, self.fingerprint,
+                        transformers, self.in_index, self.out_index,
+                        self.index)
+
+    def _restore(self, key):
+        """Restore a memoized sub-learner. Returns False on a miss"""
+        memo = memo_load(self.memo, key)
+        if memo is None:
+            return False
+
+        (self.estimator, predictions, self.score_, self.fit_time_,
+         self.pred_time_) = memo
+
+        if predictions is not None:
+            assign_predictions(self.out_array, predictions, self.out_index,
+                               self.output_columns, self.in_array.shape[0])
+        return True
+
     def _predict(self, transformers, score_preds):
         """Sub-routine to with sublearner"""
         n = self.in_array.shape[0]
         # For training, use ytemp to score predictions
         # During test time, ytemp is None
-        xtemp, ytemp = slice_array(self.in_array, self.targets, self.out_index)
         t0 = time()
-
-        if transformers:
-            xtemp, ytemp = transformers.transform(xtemp, ytemp)
+        xtemp, ytemp = self._fold(transformers, self.out_index, True)
         predictions = getattr(self.estimator, self.attr)(xtemp)
 
         self.pred_time_ = time() - t0
@@ -209,6 +328,7 @@ class SubLearner(object):
         if score_preds:
             self.score_ = score_predictions(
                 ytemp, predictions, self.scorer, self.name_index, self.name)
+        return predictions
 
     @property
     def data(self):
@@ -239,6 +359,7 @@ class SubTransformer(object):
 
         self.path = parent._path
         self.verbose = parent.verbose
+        self.order = getattr(parent, '_order', None)
         self.name = parent.cache_name
         self.name_index = '.'.join(
             [self.name] + [str(i) for i in index])
@@ -263,7 +384,7 @@ class SubTransformer(object):
         t0 = time()
         n = self.in_array.shape[0]
         xtemp, ytemp = slice_array(
-            self.in_array, self.targets, self.out_index)
+            self.in_array, self.targets, self.out_index, order=self.order)
 
         xtemp, ytemp = self.estimator.transform(xtemp, ytemp)
 
@@ -279,28 +400,49 @@ class SubTransformer(object):
         """Fit transformers"""
         path = path if path else self.path
         t0 = time()
-        xtemp, ytemp = slice_array(
-            self.in_array, self.targets, self.in_index)
 
-        t0_f = time()
-        self.estimator.fit(xtemp, ytemp)
-        self.transform_time_ = time() - t0_f
-
-        if self.out_array is not None:
-            self._transform()
-
-        o = IndexedEstimator(estimator=self.estimator,
-                             name=self.name_index,
-                             index=self.index,
-                             in_index=self.in_index,
-                             out_index=self.out_index,
-                             data=self.data)
-        save(path, self.name_index, o)
+        # Let dependent sub-learners know the pipeline is being fitted
+        with produce(path, self.name_index):
+            xtemp, ytemp = slice_array(
+                self.in_array, self.targets, self.in_index, order=self.order)
+
+            t0_f = time()
+            self.estimator.fit(xtemp, ytemp)
+            self.transform_time_ = time() - t0_f
+
+            if self.out_array is not None:
+                self._transform()
+
+            if config.get_fold_cache():
+                self._cache_folds(path, xtemp, ytemp)
+
+            o = IndexedEstimator(estimator=self.estimator,
+                                 name=self.name_index,
+                                 index=self.index,
+                                 in_index=self.in_index,
+                                 out_index=self.out_index,
+                                 data=self.data)
+            save(path, self.name_index, o)
+
         if self.verbose:
             f = "stdout" if self.verbose < 10 else "stderr"
             msg = "{:<30} {}".format(self.name_index, "done")
             print_time(t0, msg, file=f)
 
+    def _cache_folds(self, path, xtemp, ytemp):
+        """Cache the transformed training and test folds"""
+        folds = list(self.estimator.transform(xtemp, ytemp))
+        if self.out_index is not None:
+            xtemp, ytemp = slice_array(
+                self.in_array, self.targets, self.out_index, order=self.order)
+            folds.extend(self.estimator.transform(xtemp, ytemp))
+        elif self.in_index is None:
+            # Fitted and tested on all data
+            folds.extend(folds)
+        else:
+            folds.extend([None, None])
+        save_arrays(path, '.%s.fold' % self.name_index, folds)
+
     @property
     def data(self):
         """fit data"""
@@ -333,17 +475,23 @@ class EvalSubLearner(SubLearner):
         if self.scorer is None:
             raise ValueError("Cannot generate CV-scores without a scorer")
         t0 = time()
-        transformers = self._load_preprocess(path)
-        self._fit(transformers)
-        self._predict(transformers)
 
-        o = IndexedEstimator(estimator=self.estimator,
-                             name=self.name_index,
-                             index=self.index,
-                             in_index=self.in_index,
-                             out_index=self.out_index,
-                             data=self.data)
-        save(path, self.name_index, o)
+        with produce(path, self.name_index):
+            self._folds = self._load_folds(path)
+            transformers = None
+            if self._folds is None or self._folds[2] is None:
+                transformers = self._load_preprocess(path)
+            self._fit(transformers)
+            self._predict(transformers)
+            self._folds = None
+
+            o = IndexedEstimator(estimator=self.estimator,
+                                 name=self.name_index,
+                                 index=self.index,
+                                 in_index=self.in_index,
+                                 out_index=self.out_index,
+                                 data=self.data)
+            save(path, self.name_index, o)
 
         if self.verbose:
             f = "stdout" if self.verbose else "stderr"
@@ -354,17 +502,15 @@ class EvalSubLearner(SubLearner):
         """Sub-routine to with sublearner"""
         # Train set
         self.train_score_, self.train_pred_time_ = self._score_preds(
-            transformers, self.in_index)
+            transformers, self.in_index, False)
 
         # Validation set
         self.test_score_, self.test_pred_time_ = self._score_preds(
-            transformers, self.out_index)
+            transformers, self.out_index, True)
 
-    def _score_preds(self, transformers, index):
+    def _score_preds(self, transformers, index, test):
         # Train scores
-        xtemp, ytemp = slice_array(self.in_array, self.targets, index)
-        if transformers:
-            xtemp, ytemp = transformers.transform(xtemp, ytemp)
+        xtemp, ytemp = self._fold(transformers, index, test)
 
         t0 = time()
 
@@ -409,7 +555,8 @@ class Cache(object):
     def __call__(self, path=None):
         """Cache estimator to path"""
         path = path if path else self.path
-        save(path, self.name, self.obj)
+        with produce(path, self.name):
+            save(path, self.name, self.obj)
         if self.verbose:
             msg = "{:<30} {}".format(self.name, "cached")
             f = "stdout" if self.verbose < 10 - 3 else "stderr"
@@ -437,6 +584,9 @@ class BaseNode(OutputMixin, IndexMixin, BaseEstimator):
 
         # Variables
         self._path = None
+        self._memo = None
+        self._fingerprint = None
+        self._order = None
         self._data_ = None
         self._times_ = None
         self._learner_ = None
@@ -529,7 +679,7 @@ class BaseNode(OutputMixin, IndexMixin, BaseEstimator):
                 targets=None,
                 )
 
-    def gen_fit(self, X, y, P=None):
+    def gen_fit(self, X, y, P=None, order=None):
         """Routine for generating fit jobs conditional on refit
 
         Parameters
@@ -543,6 +693,11 @@ class BaseNode(OutputMixin, IndexMixin, BaseEstimator):
         P: array-like of shape [n_samples, n_prediction_features], optional
             output array to populate. Must be writeable. Only pass if
             predictions are desired.
+
+        order : array-like of shape [n_samples,], optional
+            permutation of the rows of ``X`` and ``y`` if shuffled.
+
+            .. versionadded:: 0.2.3
         """
         # We use a derived cache_name during estimation: if the name of the
         # instance or the name of the preprocessing dependency changes, this
@@ -560,6 +715,11 @@ class BaseNode(OutputMixin, IndexMixin, BaseEstimator):
 
         self.__collect__ = True
 
+        # Fingerprint inputs once for all sub-learners if memoizing fits
+        self._memo = config.get_memo() or None
+        self._fingerprint = fingerprint(X, y, order) if self._memo else None
+        self._order = order
+
         # We use an index to keep track of partition and fold
         # For single-partition estimations, index[0] is constant
         i = 0
@@ -602,7 +762,7 @@ class BaseNode(OutputMixin, IndexMixin, BaseEstimator):
                     index=index,
                 )
 
-    def gen_transform(self, X, P=None):
+    def gen_transform(self, X, P=None, order=None):
         """Generate cross-validated predict jobs
 
         Parameters
@@ -616,10 +776,16 @@ class BaseNode(OutputMixin, IndexMixin, BaseEstimator):
         P: array-like of shape [n_samples, n_prediction_features], optional
             output array to populate. Must be writeable. Only pass if
             predictions are desired.
+
+        order : array-like of shape [n_samples,], optional
+            permutation of the rows of ``X`` and ``y`` if shuffled.
+
+            .. versionadded:: 0.2.3
         """
+        self._order = order
         return self._gen_pred('transform', X, P, self.sublearners)
 
-    def gen_predict(self, X, P=None):
+    def gen_predict(self, X, P=None, order=None):
         """Generate predicting jobs
 
         Parameters
@@ -633,7 +799,13 @@ class BaseNode(OutputMixin, IndexMixin, BaseEstimator):
         P: array-like of shape [n_samples, n_prediction_features], optional
             output array to populate. Must be writeable. Only pass if
             predictions are desired.
+
+        order : array-like of shape [n_samples,], optional
+            permutation of the rows of ``X`` and ``y`` if shuffled.
+
+            .. versionadded:: 0.2.3
         """
+        self._order = order
         return self._gen_pred('predict', X, P, self.learner)
 
     def collect(self, path=None):
@@ -668,6 +840,7 @@ class BaseNode(OutputMixin, IndexMixin, BaseEstimator):
         self._data_ = None
         self._times_ = None
         self._path = None
+        self._order = None
 
     def set_indexer(self, indexer):
         """Set indexer and auxiliary attributes
@@ -767,19 +940,25 @@ class BaseNode(OutputMixin, IndexMixin, BaseEstimator):
 
     @property
     def learner(self):
-        """Generator for learner fitted on full data"""
+        """Generator for learner fitted on full data.
+
+        Yields the fitted :class:`IndexedEstimator` instances, not copies.
+        """
         # pylint: disable=not-an-iterable
         out = self._return_attr('_learner_')
         for estimator in out:
-            yield deepcopy(estimator)
+            yield estimator
 
     @property
     def sublearners(self):
-        """Generator for learner fitted on folds"""
+        """Generator for learner fitted on folds.
+
+        Yields the fitted :class:`IndexedEstimator` instances, not copies.
+        """
         # pylint: disable=not-an-iterable
         out = self._return_attr('_sublearners_')
         for estimator in out:
-            yield deepcopy(estimator)
+            yield estimator
 
     @property
     def raw_data(self):
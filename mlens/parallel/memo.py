@@ -0,0 +1,66 @@
+"""ML-Ensemble
+
+:author: Sebastian Flennerhag
+:license: MIT
+:copyright: 2017-2018
+
+Persistent fit memoization.
+
+The estimation cache only lives for the duration of a call. When a memo
+directory is set (see :func:`mlens.config.set_memo`), fitted sub-learners are
+also saved to the directory together with their out-of-fold predictions.
+Entries are keyed by a hash of the estimator, the input data, the fitted
+preprocessing pipeline and the fold, so a sub-learner with a matching entry
+in a later run is restored instead of refit.
+"""
+from __future__ import division
+
+import os
+
+from ..utils import pickle_save, pickle_load
+from ..utils.utils import pickled
+from ..externals.joblib.hashing import hash as _hash
+
+
+def fingerprint(X, y=None, order=None):
+    """Fingerprint of the input data of a fit call"""
+    if order is None:
+        return _hash((X, y), coerce_mmap=True)
+    return _hash((X, y, order), coerce_mmap=True)
+
+
+def memo_key(*args):
+    """Key of a memo entry"""
+    return _hash(args, coerce_mmap=True)
+
+
+def memo_load(path, key):
+    """Load a memo entry. Returns None if missing or unreadable.
+
+    Unreadable entries, such as files truncated by an interrupted run, are
+    deleted so that the sub-learner is refit and the entry saved again.
+    """
+    f = pickled(os.path.join(path, key))
+    if not os.path.exists(f):
+        return None
+    try:
+        return pickle_load(f)
+    except Exception:  # pylint: disable=broad-except
+        # Corrupt files fail in the unpickler with any type of error
+        try:
+            os.remove(f)
+        except OSError:
+            # Removed by a concurrent task
+            pass
+        return None
+
+
+def memo_save(path, key, obj):
+    """Save a memo entry"""
+    try:
+        os.makedirs(path)
+    except OSError:
+        # Exists, or created by a concurrent task
+        if not os.path.isdir(path):
+            raise
+    pickle_save(obj, os.path.join(path, key))
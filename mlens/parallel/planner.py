@@ -0,0 +1,355 @@
+"""ML-Ensemble
+
+:author: Sebastian Flennerhag
+:license: MIT
+:copyright: 2017-2018
+
+Memory planning for estimation jobs.
+
+Prediction arrays are allocated one layer at a time, so a job that does not
+fit in memory or on disk fails only once the first layer that is too large is
+reached. The planner walks the stack upfront, using the output shape each
+layer would allocate, and estimates the peak memory and disk needs of the
+job. Given a memory limit, it picks a configuration that fits, or refuses
+before any estimation is done.
+
+The estimates cover the arrays managed by the backend: the input array, the
+prediction arrays of each layer, and the training folds copied by workers
+during fitting. Fitted estimators and transformed folds in the cache are not
+included.
+"""
+from __future__ import division
+
+import multiprocessing
+from copy import copy
+
+import numpy as np
+from scipy.sparse import issparse
+
+from .. import config
+from ..index import ClusteredSubsetIndex
+
+UNITS = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3,
+         'TB': 1024 ** 4}
+
+
+def parse_size(size):
+    """Convert a memory size to bytes.
+
+    Parameters
+    ----------
+    size : int, str
+        number of bytes, or a string with a unit suffix, such as ``'512MB'``
+        or ``'2GB'``.
+
+    Returns
+    -------
+    size : int
+        number of bytes.
+    """
+    if isinstance(size, str):
+        string = size.strip().upper()
+        for unit in sorted(UNITS, key=len, reverse=True):
+            if string.endswith(unit):
+                return int(float(string[:-len(unit)]) * UNITS[unit])
+        size = float(string)
+    if size <= 0:
+        raise ValueError("Memory size must be positive. Got %r" % size)
+    return int(size)
+
+
+def format_size(size):
+    """Format a number of bytes for printing"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024:
+            return '%.1f%s' % (size, unit)
+        size /= 1024
+    return '%.1fTB' % size
+
+
+def n_workers(backend, n_jobs):
+    """Number of workers used by a backend for a given n_jobs"""
+    if backend == 'sequential' or n_jobs == 0:
+        return 1
+    if n_jobs < 0:
+        return max(multiprocessing.cpu_count() + 1 + n_jobs, 1)
+    return n_jobs
+
+
+def on_disk(backend, storage):
+    """Check if prediction arrays of a backend are persisted to disk"""
+    return backend not in ['threading', 'sequential'] and storage != 'shm'
+
+
+def _nbytes(X):
+    """Size of an input array"""
+    if issparse(X):
+        return sum(getattr(X, attr).nbytes for attr in
+                   ['data', 'indices', 'indptr'] if hasattr(X, attr))
+    if isinstance(X, np.ndarray):
+        return X.nbytes
+    return int(np.prod(X.shape)) * np.dtype(X.dtype).itemsize
+
+
+class _Shape(object):
+
+    """Shape-only stand-in for an array when sizing indexers"""
+
+    def __init__(self, shape, dtype):
+        self.shape = shape
+        self.dtype = dtype
+
+
+def _rows(task, X, y, job):
+    """Number of rows of the prediction array of a task.
+
+    Indexers of the task are left untouched: sizes are read from copies
+    fitted on the shape of the input. Clustered indexers fit an estimator on
+    the data, but predict all rows of the input.
+    """
+    sizes = set()
+    for indexer in task._get_indexers():  # pylint: disable=protected-access
+        if isinstance(indexer, ClusteredSubsetIndex):
+            sizes.add(X.shape[0])
+            continue
+        indexer = copy(indexer)
+        indexer.fit(X, y, job)
+        sizes.add(indexer.n_samples if job == 'predict'
+                  else indexer.n_test_samples)
+    if len(sizes) != 1:
+        raise ValueError(
+            "Inconsistent output sizes generated by indexers of %s. Got "
+            "sizes %r" % (task.name, sorted(sizes)))
+    return sizes.pop()
+
+
+def _multiplier(learner, y):
+    """Number of prediction columns per partition of a learner"""
+    if not learner.proba:
+        return 1
+    return np.unique(y).shape[0] if y is not None else learner.classes_
+
+
+def _columns(task, y):
+    """Number of columns of the prediction array of a task"""
+    # pylint: disable=protected-access
+    if not hasattr(task, 'learners'):
+        # A learner in the stack outputs its own predictions only
+        return task._partitions * _multiplier(task, y)
+
+    columns = task.n_feature_prop
+    for learner in task.learners:
+        columns += learner._partitions * _multiplier(learner, y)
+    return columns
+
+
+class Plan(object):
+
+    """Memory and disk needs of an estimation job.
+
+    .. versionadded:: 0.2.3
+
+    Attributes
+    ----------
+    job : str
+        type of job planned for.
+
+    backend : str
+        backend to use.
+
+    storage : str
+        storage of arrays when the backend is not ``'threading'``.
+
+    dtype : obj
+        dtype of prediction arrays, or ``None`` to use each layer's dtype.
+
+    chunk_size : int, None
+        number of rows to process at a time, or ``None`` for the full array.
+
+    layers : list
+        list of ``(name, shape, nbytes)`` tuples of the prediction array of
+        each layer.
+
+    memory : int
+        estimated peak memory need, in bytes.
+
+    disk : int
+        estimated peak disk need, in bytes.
+    """
+
+    def __init__(self, job, backend, storage, dtype=None, chunk_size=None):
+        self.job = job
+        self.backend = backend
+        self.storage = storage
+        self.dtype = dtype
+        self.chunk_size = chunk_size
+        self.layers = list()
+        self.memory = 0
+        self.disk = 0
+
+    def __repr__(self):
+        return ("Plan(job=%r, backend=%r, storage=%r, dtype=%r, "
+                "chunk_size=%r, memory=%s, disk=%s)" % (
+                    self.job, self.backend, self.storage,
+                    None if self.dtype is None else np.dtype(self.dtype).name,
+                    self.chunk_size, format_size(self.memory),
+                    format_size(self.disk)))
+
+    def fits(self, memory_limit):
+        """Check if the plan fits a memory limit"""
+        return memory_limit is None or self.memory <= memory_limit
+
+
+def _walk(tasks, job, X, y, plan, n_jobs):
+    """Estimate the memory needs of a plan by walking the stack"""
+    disk = on_disk(plan.backend, plan.storage)
+    workers = n_workers(plan.backend, n_jobs)
+
+    n = plan.chunk_size if plan.chunk_size else X.shape[0]
+    n_full = X.shape[0]
+    in_bytes = int(_nbytes(X) * n / n_full)
+
+    # Inputs that are not already on disk are dumped by the backend
+    total_disk = in_bytes if disk and not isinstance(X, np.memmap) else 0
+    X = _Shape((n,) + tuple(X.shape[1:]), X.dtype)
+    peak = out_bytes = 0
+    for task in tasks:
+        if task.__no_output__:
+            continue
+
+        dtype = plan.dtype if plan.dtype is not None else task.dtype
+        shape = (_rows(task, X, y, job), _columns(task, y))
+        out_bytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        plan.layers.append((task.name, shape, out_bytes))
+
+        # Workers copy the training folds of the input, while
+        # predictions are written into the output array directly
+        work = workers * in_bytes if job == 'fit' else 0
+        held = 0 if disk else in_bytes + out_bytes
+        peak = max(peak, held + work)
+
+        # Inputs of previous layers remain in the cache until cleared
+        if disk:
+            total_disk += out_bytes
+
+        X, in_bytes = _Shape(shape, dtype), out_bytes
+        if y is not None and shape[0] != y.shape[0]:
+            y = y[y.shape[0] - shape[0]:]
+
+    # The final predictions are returned as an in-memory array. Blocks are
+    # assembled into it while the remaining blocks are processed.
+    final = int(out_bytes * n_full / n)
+    if plan.chunk_size:
+        peak += final
+    elif disk:
+        peak = max(peak, final)
+
+    plan.memory = peak
+    plan.disk = total_disk
+    return plan
+
+
+def plan(caller, job, X, y=None, backend=None, n_jobs=-1, storage=None,
+         memory_limit=None, keep_backend=False):
+    """Plan the memory and disk needs of an estimation job.
+
+    Walks the caller's tasks using the shape of the prediction array each
+    task would allocate, without running any estimation. If a
+    ``memory_limit`` is given and the job does not fit, the planner tries
+    in order to:
+
+        1. process ``predict`` jobs in row chunks;
+        2. persist arrays to disk, by switching a ``'threading'`` backend to
+           ``'multiprocessing'``, or shared memory storage to ``'mmap'``.
+           With ``keep_backend``, only the storage is switched;
+        3. use ``float32`` prediction arrays.
+
+    .. versionadded:: 0.2.3
+
+    Parameters
+    ----------
+    caller : obj
+        a :class:`~mlens.parallel.Layer`, or an iterable of layers, such as a
+        :class:`~mlens.ensemble.Sequential` instance.
+
+    job : str
+        type of job. One of ``'fit'``, ``'predict'`` and ``'transform'``.
+
+    X : array-like of shape [n_samples, n_features]
+        input array. Only the shape and dtype are used.
+
+    y : array-like of shape [n_samples,], optional
+        targets. Used to determine the number of classes of probability
+        outputs.
+
+    backend : str, optional
+        backend to plan for. Defaults to the global backend.
+
+    n_jobs : int (default = -1)
+        degree of concurrency.
+
+    storage : str, optional
+        array storage to plan for. Defaults to the global storage.
+
+    memory_limit : int, str, optional
+        memory budget, in bytes or as a string such as ``'2GB'``.
+
+    keep_backend : bool (default = False)
+        whether the backend is fixed, as for jobs run on an active session.
+
+    Returns
+    -------
+    plan : :class:`Plan`
+        the estimated needs of the job, in a configuration that fits the
+        memory limit.
+
+    Raises
+    ------
+    MemoryError :
+        if no configuration fits the memory limit.
+    """
+    backend = backend if backend else config.get_backend()
+    storage = storage if storage else config.get_storage()
+    tasks = [caller] if hasattr(caller, 'shape') else list(caller)
+    if memory_limit is not None:
+        memory_limit = parse_size(memory_limit)
+
+    out = _walk(tasks, job, X, y, Plan(job, backend, storage), n_jobs)
+    if out.fits(memory_limit):
+        return out
+    first = out
+
+    # Predictions scale with the number of rows, except for the output
+    # array the blocks are assembled into
+    final = first.layers[-1][2] if first.layers else 0
+    if job == 'predict':
+        chunk_size = int(X.shape[0] * (memory_limit - final) / first.memory)
+        while chunk_size >= 1:
+            out = _walk(tasks, job, X, y, Plan(
+                job, backend, storage, chunk_size=chunk_size), n_jobs)
+            if out.fits(memory_limit):
+                return out
+            chunk_size //= 2
+
+    # Move arrays to disk
+    threads = backend in ['threading', 'sequential']
+    if not on_disk(backend, storage) and not (threads and keep_backend):
+        if threads:
+            backend = 'multiprocessing'
+        storage = 'mmap'
+        out = _walk(tasks, job, X, y, Plan(job, backend, storage), n_jobs)
+        if out.fits(memory_limit):
+            return out
+
+    # Reduce precision of prediction arrays
+    if any(np.dtype(t.dtype).itemsize > 4 for t in tasks
+           if getattr(t, 'dtype', None) is not None):
+        out = _walk(tasks, job, X, y, Plan(
+            job, backend, storage, dtype=np.float32), n_jobs)
+        if out.fits(memory_limit):
+            return out
+
+    raise MemoryError(
+        "Cannot fit %s job in memory limit of %s. Estimated need: %s.\n"
+        "Details:\n%r" % (job, format_size(memory_limit),
+                          format_size(first.memory), first))
@@ -0,0 +1,356 @@
+"""ML-Ensemble
+
+:author: Sebastian Flennerhag
+:license: MIT
+:copyright: 2017-2018
+
+Dependency-aware ordering of layer tasks.
+
+Sub-learners depend only on the preprocessing pipeline fitted on their own
+fold. Rather than separating preprocessing and estimation by a barrier, a
+layer dispatches all tasks in a single parallel job, ordered so that every
+task is dispatched after the tasks it depends on. A sub-learner starts as
+soon as a worker is free and waits for its pipeline to be cached, if it is
+still being fitted.
+
+Within these constraints, tasks are dispatched longest first (LPT
+scheduling), using the costs recorded for each task and estimator in
+previous runs. This prevents slow estimators generated last from becoming
+stragglers that decide the wall-clock time.
+
+Tasks that are cheap according to the same history are then grouped into
+batches run in sequence by a single worker, so that the overhead of
+dispatching a task does not dominate the time spent on estimation.
+"""
+from __future__ import division
+
+import threading
+from collections import OrderedDict
+from numbers import Integral
+
+# Batches of cheap tasks are filled up to this cost, in seconds
+MIN_BATCH_COST = 0.2
+
+
+class CostHistory(object):
+
+    """Record of task costs from previous runs.
+
+    Costs are recorded from the fit data of collected nodes, for each task
+    (i.e. estimator, parameters and fold) and for each estimator class.
+    Class costs serve as fallback for tasks without history, such as new
+    hyper-parameter draws. Costs are smoothed exponentially over runs.
+
+    Costs are recorded under a scope, such as the name of the layer that
+    ran the tasks. Since tasks are identified by name and estimator
+    parameters, costs carry over to clones, while estimators of different
+    ensembles with the same names only share costs if their parameters
+    match. The history keeps the ``size`` most recently used costs.
+
+    .. versionadded:: 0.2.3
+
+    Parameters
+    ----------
+    smoothing : float (default = 0.5)
+        weight of the most recent observation.
+
+    size : int (default = 10000)
+        maximum number of costs to keep.
+    """
+
+    def __init__(self, smoothing=0.5, size=10000):
+        self.smoothing = smoothing
+        self.size = size
+        self.costs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def update(self, key, cost):
+        """Update the cost estimate of a key"""
+        with self._lock:
+            old = self.costs.pop(key, None)
+            if old is not None:
+                cost = self.smoothing * cost + (1 - self.smoothing) * old
+            self.costs[key] = cost
+            while len(self.costs) > self.size:
+                self.costs.popitem(last=False)
+
+    def get(self, key):
+        """Return the cost estimate of a key, or None if unknown"""
+        with self._lock:
+            cost = self.costs.pop(key, None)
+            if cost is not None:
+                self.costs[key] = cost
+        return cost
+
+    def record(self, nodes, scope=None):
+        """Record costs of fitted nodes.
+
+        Parameters
+        ----------
+        nodes : list
+            collected :class:`~mlens.parallel.learner.Learner` or
+            :class:`~mlens.parallel.learner.Transformer` instances.
+
+        scope : hashable, optional
+            scope to record costs under.
+        """
+        for node in nodes:
+            fitted = (getattr(node, '_learner_', None) or []) + \
+                (getattr(node, '_sublearners_', None) or [])
+            for obj in fitted:
+                data = obj.data
+                if not data:
+                    # Place holder for learners shared between types
+                    continue
+
+                ft = data.get('ft', data.get('fit_time'))
+                pt = data.get('pt', data.get('pred_time'))
+                if ft is None:
+                    continue
+
+                estimator = obj.estimator
+                sig = signature(estimator)
+                kls = estimator.__class__.__name__
+                for job, cost in [('fit', ft + (pt or 0)),
+                                  ('predict', pt if pt is not None else ft)]:
+                    self.update((scope, job, obj.name, sig), cost)
+                    self.update((scope, job, kls), cost)
+
+    def cost(self, task, scope=None):
+        """Return the estimated cost of a task, or None if unknown"""
+        job = 'fit' if getattr(task, 'job', None) == 'fit' else 'predict'
+        estimator = getattr(task, 'estimator', None)
+        if estimator is None and hasattr(task, 'obj'):
+            # Cache task of a fitted transformer
+            estimator = task.obj.estimator
+        if estimator is None:
+            return None
+
+        cost = self.get((scope, job, provides(task), signature(estimator)))
+        if cost is None:
+            cost = self.get((scope, job, estimator.__class__.__name__))
+        return cost
+
+    def clear(self):
+        """Drop all recorded costs"""
+        with self._lock:
+            self.costs = OrderedDict()
+
+
+COSTS = CostHistory()
+
+
+def signature(estimator):
+    """Class and parameters of an estimator, as a hashable key"""
+    try:
+        params = estimator.get_params(deep=False)
+    except AttributeError:
+        return estimator.__class__.__name__
+    return '%s(%r)' % (estimator.__class__.__name__, sorted(params.items()))
+
+
+def provides(task):
+    """Return the cache entry a task produces, if any"""
+    name = getattr(task, 'name_index', None)
+    if name is None:
+        # Cache task
+        name = getattr(task, 'name', None)
+    return name
+
+
+def depends(task):
+    """Return the cache entry a task depends on, if any"""
+    if getattr(task, 'preprocess', None) is None:
+        return None
+    return getattr(task, 'preprocess_index', None)
+
+
+def writes(task):
+    """Return the output columns a task writes to, if any"""
+    if getattr(task, 'out_array', None) is None:
+        return None
+    return getattr(task, 'name', None), getattr(task, 'index', (None,))[0]
+
+
+def _ranges(index):
+    """Return the ``(start, stop)`` ranges of an index"""
+    if index is None:
+        return []
+    if len(index) == 2 and isinstance(index[0], Integral):
+        return [tuple(index)]
+    return [tuple(idx) for idx in index]
+
+
+def _overlap(tasks):
+    """Check if tasks write to overlapping rows"""
+    ranges = sorted(idx for task in tasks for idx in _ranges(task.out_index))
+    return any(b[0] < a[1] for a, b in zip(ranges[:-1], ranges[1:]))
+
+
+def _keep_writes(tasks, generated):
+    """Run tasks writing to the same cells in the order generated.
+
+    Test sets of the same columns can overlap, as those of a
+    :class:`~mlens.index.ClusteredSubsetIndex` partition do, in which case
+    the prediction written last is kept.
+    """
+    groups = dict()
+    for task in generated:
+        key = writes(task)
+        if key is not None:
+            groups.setdefault(key, list()).append(task)
+    groups = dict((k, v) for k, v in groups.items() if _overlap(v))
+    if not groups:
+        return tasks
+
+    slots = dict()
+    for i, task in enumerate(tasks):
+        if writes(task) in groups:
+            slots.setdefault(writes(task), list()).append(i)
+
+    out = list(tasks)
+    for key, group in groups.items():
+        for i, task in zip(slots[key], group):
+            out[i] = task
+    return out
+
+
+def schedule(transformers, learners, costs=None, scope=None):
+    """Order tasks for a single parallel job.
+
+    Transformer tasks come first, since they unblock other tasks. Learner
+    tasks without preprocessing follow, and learner tasks with
+    preprocessing come last. Since workers pick up tasks in dispatch order,
+    every task a learner waits on has been started by the time the learner
+    runs.
+
+    Within each group, tasks are ordered by decreasing recorded cost, with
+    tasks without history first. Without history, dependent learners are
+    ordered as their pipelines are dispatched. Tasks writing to overlapping
+    rows of the same output columns keep the order they were generated in,
+    so that overlapping predictions are resolved as in a sequential run.
+
+    Parameters
+    ----------
+    transformers : iterable
+        sub-transformer or cache tasks.
+
+    learners : iterable
+        sub-learner tasks.
+
+    costs : :class:`CostHistory`, optional
+        cost history to order tasks by. Defaults to the global history.
+
+    scope : hashable, optional
+        scope of the costs in the history.
+
+    Returns
+    -------
+    tasks : list
+        ordered list of tasks.
+    """
+    costs = COSTS if costs is None else costs
+
+    def longest_first(task):
+        """Sort key for LPT ordering"""
+        cost = costs.cost(task, scope)
+        return -cost if cost is not None else -float('inf')
+
+    transformers = sorted(transformers, key=longest_first)
+    order = dict((provides(task), i) for i, task in enumerate(transformers))
+
+    learners = list(learners)
+    independent = list()
+    dependent = list()
+    for task in learners:
+        dep = depends(task)
+        if dep is None:
+            independent.append(task)
+        else:
+            # Unknown dependencies are cached by a previous job
+            dependent.append(
+                (longest_first(task), order.get(dep, -1), len(dependent),
+                 task))
+
+    independent.sort(key=longest_first)
+    dependent.sort(key=lambda x: x[:3])
+    tasks = _keep_writes(independent + [x[-1] for x in dependent], learners)
+    return transformers + tasks
+
+
+class Batch(object):
+
+    """Tasks run in sequence by a single worker.
+
+    .. versionadded:: 0.2.3
+
+    Parameters
+    ----------
+    tasks : list
+        tasks of the batch, in order of execution.
+    """
+
+    def __init__(self, tasks):
+        self.tasks = tasks
+
+    def __call__(self):
+        return [task() for task in self.tasks]
+
+    def __len__(self):
+        return len(self.tasks)
+
+
+def batch(tasks, n_jobs, costs=None, min_cost=MIN_BATCH_COST, scope=None):
+    """Group consecutive cheap tasks into batches.
+
+    Tasks are added to a batch until its recorded cost reaches
+    ``min_cost``, or an even share of the total cost between ``n_jobs``
+    workers if less. Tasks that exceed the limit on their own, and tasks
+    without history, run alone. Since batches keep the order of
+    :func:`schedule`, every task a learner waits on is started by the time
+    the learner runs.
+
+    Parameters
+    ----------
+    tasks : list
+        ordered list of tasks.
+
+    n_jobs : int
+        number of workers of the parallel job.
+
+    costs : :class:`CostHistory`, optional
+        cost history to batch tasks by. Defaults to the global history.
+
+    min_cost : float (default = 0.2)
+        cost to fill batches up to.
+
+    scope : hashable, optional
+        scope of the costs in the history.
+
+    Returns
+    -------
+    tasks : list
+        ordered list of tasks and :class:`Batch` instances.
+    """
+    costs = COSTS if costs is None else costs
+    task_costs = [costs.cost(task, scope) for task in tasks]
+    total = sum(c for c in task_costs if c is not None)
+    limit = min(min_cost, total / max(n_jobs, 1))
+
+    out = list()
+    current = list()
+    current_cost = 0
+    for task, cost in zip(tasks, task_costs):
+        alone = cost is None or cost >= limit
+        if not alone:
+            current.append(task)
+            current_cost += cost
+        if current and (alone or current_cost >= limit):
+            out.append(current[0] if len(current) == 1 else Batch(current))
+            current = list()
+            current_cost = 0
+        if alone:
+            out.append(task)
+    if current:
+        out.append(current[0] if len(current) == 1 else Batch(current))
+    return out
@@ -0,0 +1,358 @@
+"""ML-Ensemble
+
+:author: Sebastian Flennerhag
+:license: MIT
+:copyright: 2017-2018
+
+Estimation cache stores.
+
+Sub-learners and transformers save fitted estimators to a cache, and each
+learner collects the entries of its sub-learners once the layer has been
+fitted. With the default caches, a directory of pickle files or a list,
+every lookup scans the entire cache, so the cost of collecting a layer grows
+quadratically with the number of sub-learners.
+
+Cache stores index entries by name and by the learner they belong to. Three
+stores are available:
+
+    - :class:`MemoryStore`: indexed in-memory store (threading only).
+    - :class:`DiskStore`: pickle files with a manifest per learner.
+    - :class:`SQLiteStore`: a single SQLite database file.
+"""
+from __future__ import division
+
+import os
+import pickle
+import sqlite3
+import threading
+from copy import copy
+from abc import ABCMeta, abstractmethod
+
+from ..externals.six import add_metaclass
+from ..utils import pickle_load, pickle_save
+from ..utils.utils import pickled
+from ..utils.exceptions import ParallelProcessingError
+
+
+def group(name):
+    """Name of the learner a cache entry belongs to.
+
+    Entries are named ``[learner].[fold].[partition]``. Hidden entries, such
+    as status markers, belong to no learner.
+    """
+    if name.startswith('.'):
+        return None
+    return '.'.join(name.split('.')[:-2])
+
+
+@add_metaclass(ABCMeta)
+class CacheStore(object):
+
+    """Base class for estimation cache stores.
+
+    A store maps entry names to objects, and indexes entries by the learner
+    they belong to. Stores are split into sub-caches, one for each task
+    of a job.
+
+    .. versionadded:: 0.2.3
+    """
+
+    @abstractmethod
+    def save(self, name, obj):
+        """Save an object to the store"""
+        pass
+
+    @abstractmethod
+    def load(self, name):
+        """Load an object from the store. Raises KeyError if missing"""
+        pass
+
+    @abstractmethod
+    def exists(self, name):
+        """Check if an entry is in the store"""
+        pass
+
+    @abstractmethod
+    def prune(self, name):
+        """Return the entries of a learner, sorted by entry name"""
+        pass
+
+    @abstractmethod
+    def subcache(self, name, exist_ok=True):
+        """Return a sub-cache of the store"""
+        pass
+
+    def close(self):
+        """Release resources held by the store"""
+        pass
+
+
+class MemoryStore(CacheStore):
+
+    """Indexed in-memory cache store.
+
+    Requires the threading backend, as entries are not shared across
+    processes.
+
+    .. versionadded:: 0.2.3
+    """
+
+    def __init__(self):
+        self.entries = dict()
+        self.groups = dict()
+        self.caches = dict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return 'MemoryStore()'
+
+    def save(self, name, obj):
+        with self._lock:
+            if name not in self.entries:
+                self.groups.setdefault(group(name), list()).append(name)
+            self.entries[name] = obj
+
+    def load(self, name):
+        return self.entries[name]
+
+    def exists(self, name):
+        return name in self.entries
+
+    def prune(self, name):
+        names = sorted(self.groups.get(name, []))
+        return [self.entries[n] for n in names]
+
+    def subcache(self, name, exist_ok=True):
+        with self._lock:
+            if name in self.caches:
+                if not exist_ok:
+                    raise ParallelProcessingError(
+                        "Subcache %s exist. Clear cache." % name)
+                return self.caches[name]
+            cache = self.caches[name] = MemoryStore()
+        return cache
+
+
+class DiskStore(CacheStore):
+
+    """Cache store of pickle files in a directory.
+
+    Entries are saved as pickle files, as in the default cache. In addition,
+    the names of the entries of each learner are appended to a manifest,
+    so that a learner's entries are found without scanning the directory.
+
+    .. versionadded:: 0.2.3
+
+    Parameters
+    ----------
+    path : str
+        cache directory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __repr__(self):
+        return 'DiskStore(%r)' % self.path
+
+    def _manifest(self, name):
+        return os.path.join(self.path, '.%s.manifest' % name)
+
+    def save(self, name, obj):
+        pickle_save(obj, os.path.join(self.path, name))
+
+        grp = group(name)
+        if grp is not None:
+            # Single appends are atomic, concurrent writers do not clash
+            with open(self._manifest(grp), 'a') as f:
+                f.write(name + '\n')
+
+    def load(self, name):
+        f = pickled(os.path.join(self.path, name))
+        if not os.path.exists(f):
+            raise KeyError(name)
+        return pickle_load(f)
+
+    def exists(self, name):
+        return os.path.exists(pickled(os.path.join(self.path, name)))
+
+    def prune(self, name):
+        try:
+            with open(self._manifest(name), 'r') as f:
+                names = set(f.read().split())
+        except (IOError, OSError):
+            return list()
+        return [self.load(n) for n in sorted(names)]
+
+    def subcache(self, name, exist_ok=True):
+        path = os.path.join(self.path, name)
+        if os.path.exists(path):
+            if not exist_ok:
+                raise ParallelProcessingError(
+                    "Subdirectory %s exist. Clear cache." % name)
+        else:
+            os.mkdir(path)
+        return DiskStore(path)
+
+
+class _Connection(object):
+
+    """Connection to a database file, opened once per process"""
+
+    def __init__(self, path, timeout):
+        self.path = path
+        self.timeout = timeout
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def execute(self, query, args=()):
+        """Run a query and return all rows"""
+        with self._lock:
+            if self._conn is None or self._pid != os.getpid():
+                self._conn = sqlite3.connect(
+                    self.path, timeout=self.timeout, isolation_level=None,
+                    check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._pid = os.getpid()
+            return self._conn.execute(query, args).fetchall()
+
+    def close(self):
+        """Close the connection of the current process"""
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_conn'] = state['_pid'] = state['_lock'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class SQLiteStore(CacheStore):
+
+    """Cache store in a single SQLite database file.
+
+    Entries are pickled into a table indexed on the entry name and the
+    learner they belong to. Each process opens its own connection to the
+    database, which sub-caches share with the store they were created
+    from. Closing any of them closes the connection until the next query.
+
+    .. versionadded:: 0.2.3
+
+    Parameters
+    ----------
+    path : str
+        database file.
+
+    namespace : str (default = '')
+        name of the sub-cache.
+
+    timeout : float (default = 120)
+        seconds to wait for a concurrent writer to release the database.
+    """
+
+    def __init__(self, path, namespace='', timeout=120):
+        self.path = path
+        self.namespace = namespace
+        self.timeout = timeout
+        self._db = _Connection(path, timeout)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "ns TEXT, name TEXT, grp TEXT, obj BLOB, PRIMARY KEY (ns, name))")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS entries_grp ON entries (ns, grp)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS caches (ns TEXT PRIMARY KEY)")
+
+    def __repr__(self):
+        return 'SQLiteStore(%r, namespace=%r)' % (self.path, self.namespace)
+
+    def save(self, name, obj):
+        blob = sqlite3.Binary(
+            pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+        self._db.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+            (self.namespace, name, group(name), blob))
+
+    def load(self, name):
+        rows = self._db.execute(
+            "SELECT obj FROM entries WHERE ns = ? AND name = ?",
+            (self.namespace, name))
+        if not rows:
+            raise KeyError(name)
+        return pickle.loads(bytes(rows[0][0]))
+
+    def exists(self, name):
+        return bool(self._db.execute(
+            "SELECT 1 FROM entries WHERE ns = ? AND name = ?",
+            (self.namespace, name)))
+
+    def prune(self, name):
+        rows = self._db.execute(
+            "SELECT obj FROM entries WHERE ns = ? AND grp = ? ORDER BY name",
+            (self.namespace, name))
+        return [pickle.loads(bytes(row[0])) for row in rows]
+
+    def subcache(self, name, exist_ok=True):
+        namespace = '%s/%s' % (self.namespace, name)
+        try:
+            self._db.execute("INSERT INTO caches VALUES (?)", (namespace,))
+        except sqlite3.IntegrityError:
+            if not exist_ok:
+                raise ParallelProcessingError(
+                    "Subcache %s exist. Clear cache." % name)
+
+        # Tables exist: share the connection instead of opening another
+        cache = copy(self)
+        cache.namespace = namespace
+        return cache
+
+    def close(self):
+        self._db.close()
+
+
+STORES = {'memory': MemoryStore, 'disk': DiskStore, 'sqlite': SQLiteStore}
+
+
+def make_store(cache, path, threading_backend):
+    """Build a cache store for a job.
+
+    Parameters
+    ----------
+    cache : str, :class:`CacheStore`
+        type of store, one of ``'memory'``, ``'disk'`` and ``'sqlite'``, or
+        a store instance.
+
+    path : str, None
+        job cache directory. Required for disk and sqlite stores.
+
+    threading_backend : bool
+        whether the job is run with the threading backend.
+
+    Returns
+    -------
+    store : :class:`CacheStore`
+        cache store.
+    """
+    if isinstance(cache, CacheStore):
+        store = cache
+    elif cache == 'memory':
+        store = MemoryStore()
+    elif cache == 'disk':
+        store = DiskStore(path)
+    elif cache == 'sqlite':
+        store = SQLiteStore(os.path.join(path, 'cache.db'))
+    else:
+        raise ValueError("cache must be one of %s, or a CacheStore. Got %r"
+                         % (sorted(STORES), cache))
+
+    if isinstance(store, MemoryStore) and not threading_backend:
+        raise ValueError(
+            "An in-memory cache requires backend='threading'.")
+    return store
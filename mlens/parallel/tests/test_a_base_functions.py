@@ -3,7 +3,179 @@
 Test base functions used by sublearners
 """
 import os
+import tempfile
 import numpy as np
-from mlens.parallel._base_functions import slice_array,  assign_predictions
+from scipy.sparse import csr_matrix
+from mlens import config
+from mlens.index.base import BaseIndex
+from mlens.parallel._base_functions import (slice_array, assign_predictions,
+                                            save_arrays, load_arrays, save,
+                                            LoadCache, IndexCache, INDEXES,
+                                            PIPELINES, IndexedTask)
+from mlens.parallel import Layer, ParallelProcessing, make_group
+from mlens.index import FoldIndex
+from mlens.testing.dummy import ESTIMATORS, PREPROCESSING
 
 # TODO: Write tests
+
+
+def test_slice_array_sparse():
+    """[Parallel | Base functions] Test csr fold slicing stays sparse"""
+    X = np.arange(40).reshape(20, 2).astype(np.float64)
+    y = np.arange(20)
+    idx = ((0, 3), (5, 8), (12, 14))
+    rows = np.hstack([np.arange(t0, t1) for t0, t1 in idx])
+
+    xs, ys = slice_array(csr_matrix(X), y, idx)
+    assert xs.format == 'csr'
+    np.testing.assert_array_equal(xs.toarray(), X[rows])
+    np.testing.assert_array_equal(ys, y[rows])
+
+    # Row offset of the input array
+    xs, _ = slice_array(csr_matrix(X[5:]), None, ((5, 8), (12, 14)), r=5)
+    np.testing.assert_array_equal(xs.toarray(), X[[5, 6, 7, 12, 13]])
+
+
+def test_slice_array():
+    """[Parallel | Base functions] Test fold slicing and assignment"""
+    X = np.arange(6000).reshape(3000, 2).astype(np.float64)
+    y = np.arange(3000)
+    for idx in [(10, 20), ((0, 3), (5, 8)), tuple((i, i + 1) for i in
+                                                   range(0, 3000, 2))]:
+        rows = BaseIndex._build_range(idx)
+        xs, ys = slice_array(X, y, idx)
+        np.testing.assert_array_equal(xs, X[rows])
+        np.testing.assert_array_equal(ys, y[rows])
+
+        pred = np.zeros((3000, 3))
+        assign_predictions(pred, xs, idx, 1, 3000)
+        np.testing.assert_array_equal(pred[rows, 1:], X[rows])
+
+        pred = np.zeros((3000, 1))
+        assign_predictions(pred, ys, idx, 0, 3000)
+        np.testing.assert_array_equal(pred[rows, 0], y[rows])
+
+    # Folds are compiled once
+    assert INDEXES.get(idx) is INDEXES.get(list(idx))
+
+
+def test_index_cache():
+    """[Parallel | Base functions] Test index cache evicts large entries"""
+    idx = tuple((i, i + 1) for i in range(0, 4000, 2))
+    cache = IndexCache()
+    a = cache.get(idx)
+
+    # Keys count towards the limit
+    size = cache.nbytes
+    assert size > 10 * a.nbytes
+
+    cache = IndexCache(limit=int(1.5 * size))
+    cache.get(idx)
+    cache.get(idx, 1)
+    assert len(cache.entries) == 1
+    assert (idx, 0) not in cache.entries
+
+    # Slices count towards the limit
+    cache = IndexCache(limit=10000)
+    for i in range(1000):
+        assert cache.get((i, i + 10)) == slice(i, i + 10)
+    assert 0 < cache.nbytes <= 10000
+    assert len(cache.entries) < 1000
+
+
+def test_index_cache_stored():
+    """[Parallel | Base functions] Test compiled indexes are shared on disk"""
+    idx = tuple((i, i + 1) for i in range(0, 4000, 2))
+    path = tempfile.mkdtemp()
+    cache = IndexCache()
+    with cache.stored(path):
+        a = cache.get(idx)
+    assert len(os.listdir(path)) == 1
+
+    # Other processes load the stored index instead of compiling it
+    with INDEXES.stored(path):
+        INDEXES.clear()
+        b = INDEXES.get(idx)
+    assert isinstance(b, np.memmap)
+    np.testing.assert_array_equal(a, b)
+    INDEXES.clear()
+
+    # Only arrays are stored, and only in cache directories
+    IndexedTask(lambda: INDEXES.get((0, 10)), path)()
+    IndexedTask(lambda: INDEXES.get(idx, 1), list())()
+    assert len(os.listdir(path)) == 1
+    INDEXES.clear()
+
+
+def test_save_arrays():
+    """[Parallel | Base functions] Test arrays are memory-mapped from disk"""
+    X = np.arange(40).reshape(20, 2).astype(np.float64)
+    arrays = [X, None, csr_matrix(X)]
+
+    path = tempfile.mkdtemp()
+    save_arrays(path, '.sc.0.1.fold', arrays)
+    out = load_arrays(path, '.sc.0.1.fold')
+    assert isinstance(out[0], np.memmap)
+    assert out[1] is None
+    np.testing.assert_array_equal(out[0], X)
+    np.testing.assert_array_equal(out[2].toarray(), X)
+
+    # Copy-on-write
+    out[0][0, 0] = -1
+    np.testing.assert_array_equal(load_arrays(path, '.sc.0.1.fold')[0], X)
+
+    path = list()
+    save_arrays(path, '.sc.0.1.fold', arrays)
+    assert load_arrays(path, '.sc.0.1.fold')[0] is X
+
+
+def test_load_cache():
+    """[Parallel | Base functions] Test loaded entries are cached"""
+    path = tempfile.mkdtemp()
+    cache = LoadCache()
+    save(path, 'sc.0.1', np.arange(10))
+    save(path, 'sc.0.2', np.arange(10))
+
+    obj = cache.load(path, 'sc.0.1')
+    assert cache.load(path, 'sc.0.1') is obj
+
+    # Entries written anew are reloaded
+    os.remove(os.path.join(path, 'sc.0.1.pkl'))
+    save(path, 'sc.0.1', np.arange(10))
+    assert cache.load(path, 'sc.0.1') is not obj
+    assert len(cache.entries) == 1
+
+    # Least recently used entries are evicted
+    size = cache.nbytes / 2 ** 20
+    limit = config.get_pipeline_cache()
+    config.set_pipeline_cache(1.5 * size)
+    try:
+        obj = cache.load(path, 'sc.0.2')
+        assert len(cache.entries) == 1
+        assert cache.load(path, 'sc.0.2') is obj
+    finally:
+        config.set_pipeline_cache(limit)
+
+    # Entries are dropped by cache directory
+    other = tempfile.mkdtemp()
+    save(other, 'sc.0.1', np.arange(10))
+    cache.load(other, 'sc.0.1')
+    cache.clear(path)
+    assert len(cache.entries) == 1
+    assert cache.load(other, 'sc.0.1') is not None
+    cache.clear()
+    assert not cache.entries and not cache.nbytes
+
+
+def test_load_cache_job():
+    """[Parallel | Base functions] Test job pipelines are dropped on exit"""
+    X = np.arange(48).reshape(24, 2).astype(np.float64)
+    y = X[:, 0] * 2 + X[:, 1]
+    layer = Layer()
+    layer.push(make_group(FoldIndex(3), ESTIMATORS, PREPROCESSING))
+
+    PIPELINES.clear()
+    with ParallelProcessing('threading', 2, cache='disk') as mgr:
+        mgr.map(layer, 'fit', X, y)
+        assert PIPELINES.entries
+    assert not PIPELINES.entries and not PIPELINES.nbytes
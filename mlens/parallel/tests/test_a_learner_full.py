@@ -2,7 +2,12 @@
 
 Testing suite for Learner and Transformer
 """
+import numpy as np
+
+from mlens.index import FoldIndex
+from mlens.parallel import Learner, ParallelProcessing
 from mlens.testing import Data, EstimatorContainer, get_learner, run_learner
+from mlens.utils.dummy import OLS
 
 
 def test_predict():
@@ -51,3 +56,32 @@ def test_transform_prep_proba():
     """[Parallel | Learner | Full | Proba | Prep] test transform"""
     args = get_learner('transform', 'full', True, True)
     run_learner(*args)
+
+
+class MutatingOLS(OLS):
+
+    """OLS setting an attribute on predict"""
+
+    def predict(self, X):
+        self.n_predict_ = getattr(self, 'n_predict_', 0) + 1
+        return super(MutatingOLS, self).predict(X)
+
+
+def test_predict_shared():
+    """[Parallel | Learner | Full] test predict shares fitted estimators"""
+    X = np.arange(24).reshape(12, 2).astype(np.float64)
+    y = X[:, 0] * 2 + X[:, 1]
+
+    lr = Learner(MutatingOLS(), indexer=FoldIndex(2), name='lr')
+    with ParallelProcessing('threading', 2) as mgr:
+        mgr.map(lr, 'fit', X, y)
+        p = mgr.map(lr, 'predict', X, return_preds=True)
+        q = mgr.map(lr, 'predict', X, return_preds=True)
+    np.testing.assert_array_equal(p, q)
+
+    # Fitted estimators are handed out without copies
+    assert list(lr.learner)[0] is lr._learner_[0]
+
+    # Attributes set on predict do not reach the fitted estimator
+    for obj in lr.learner:
+        assert not hasattr(obj._estimator, 'n_predict_')
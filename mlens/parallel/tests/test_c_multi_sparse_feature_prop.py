@@ -3,8 +3,10 @@ Test specific functionality of the parallel manager module.
 """
 import numpy as np
 from scipy.sparse import csr_matrix
-from mlens.index import FoldIndex
+from sklearn.cluster import KMeans
+from mlens.index import FoldIndex, ClusteredSubsetIndex
 from mlens.ensemble.base import BaseEnsemble
+from mlens.parallel.backend import Job
 from mlens.externals.sklearn.validation import check_random_state
 from mlens.utils.dummy import OLS
 
@@ -14,8 +16,8 @@ SEED = 1324
 
 class TempClass(BaseEnsemble):
 
-    def __init__(self):
-        super(TempClass, self).__init__()
+    def __init__(self, **kwargs):
+        super(TempClass, self).__init__(**kwargs)
 
 
 def _shuffled(X, y, seed):
@@ -100,6 +102,15 @@ def test_sparse():
         out_1, out_2.toarray().astype(dtype=np.float32))
 
 
+def test_sparse_format():
+    """[Parallel] Test sparse feature propagation outputs csr."""
+    Z = csr_matrix(X)
+    out = ens3.fit(Z, y, return_preds=True)
+    assert out.format == 'csr'
+    np.testing.assert_array_equal(
+        out[:, :n_first_prop].toarray(), X[:, first_prop])
+
+
 def test_shuffle():
     """[Parallel] Test shuffle between layers."""
     h, s = X.copy(), y.copy()
@@ -110,3 +121,55 @@ def test_shuffle():
     z = ens4.fit(X, y, return_preds=True)
 
     np.testing.assert_array_equal(h.astype(np.float32), z)
+
+
+def test_shuffle_propagation():
+    """[Parallel] Test shuffle with feature propagation."""
+    ens = TempClass()
+    ens.add([OLS(0), OLS(1)], FoldIndex(), propagate_features=first_prop,
+            shuffle=True, random_state=SEED)
+    h, s = _shuffled(X, y, ens.layers[0].random_state)
+    np.testing.assert_array_equal(
+        ens1.fit(h, s, return_preds=True), ens.fit(X, y, return_preds=True))
+
+
+def test_shuffle_clustered():
+    """[Parallel] Test shuffle with a clustered indexer."""
+    ens = TempClass()
+    ens.add([OLS(0), OLS(1)],
+            ClusteredSubsetIndex(KMeans(2, random_state=SEED), 2, 2),
+            shuffle=True, random_state=SEED)
+    ref = TempClass()
+    ref.add([OLS(0), OLS(1)],
+            ClusteredSubsetIndex(KMeans(2, random_state=SEED), 2, 2))
+    h, s = _shuffled(X, y, ens.layers[0].random_state)
+    np.testing.assert_array_equal(
+        ref.fit(h, s, return_preds=True), ens.fit(X, y, return_preds=True))
+
+
+def test_shuffle_multiprocessing():
+    """[Parallel] Test shuffle between layers with multiprocessing."""
+    z = ens4.fit(X, y, return_preds=True)
+    ens = TempClass(backend='multiprocessing')
+    for _ in range(3):
+        ens.add([OLS(), OLS(1), OLS(2)], FoldIndex(), shuffle=True,
+                random_state=SEED)
+    np.testing.assert_array_equal(ens.fit(X, y, return_preds=True), z)
+
+
+def test_shuffle_no_copy():
+    """[Parallel] Test shuffle does not copy inputs."""
+    job = Job('fit', stack=True, split=False, predict_in=X, targets=y)
+    job.shuffle(SEED)
+    job.shuffle(SEED)
+    assert job.predict_in is X
+    assert job.targets is y
+
+    h, s = _shuffled(*_shuffled(X, y, SEED), seed=SEED)
+    np.testing.assert_array_equal(X[job.order], h)
+
+    # Stacking puts targets in shuffled order
+    job.predict_out = h
+    job.update()
+    assert job.order is None
+    np.testing.assert_array_equal(job.targets, s)
@@ -0,0 +1,143 @@
+"""ML-ENSEMBLE
+
+Test of backend input and output array management.
+"""
+import pickle
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.linear_model import LinearRegression
+
+from mlens import config
+from mlens.index import FoldIndex
+from mlens.parallel import (ParallelProcessing, Layer, make_group,
+                            share_array, share_sparse, clear_inputs,
+                            Session)
+from mlens.parallel.backend import shared_memory, _INPUTS
+from mlens.utils.dummy import OLS
+
+
+X = np.arange(24).reshape(12, 2).astype(np.float64)
+y = np.arange(12).astype(np.float64)
+
+
+def get_layer(sparse=False):
+    """Build a simple layer"""
+    layer = Layer(backend='multiprocessing', n_jobs=2)
+    est = [LinearRegression()] if sparse else [OLS(), OLS(1)]
+    layer.push(make_group(FoldIndex(3), est, None))
+    return layer
+
+
+if shared_memory is not None:
+    def test_share_array_pickle():
+        """[Parallel | Backend] Test shared arrays pickle by reference"""
+        a = share_array(X)
+        b = pickle.loads(pickle.dumps(a))
+        b[0, 0] = -1
+        assert a[0, 0] == -1
+
+        # Partial views are pickled by value
+        c = pickle.loads(pickle.dumps(a[1:]))
+        c[0, 0] = -1
+        assert a[1, 0] == X[1, 0]
+        a._shm.unlink()
+
+    def test_shm_storage():
+        """[Parallel | Backend] Test shared memory storage"""
+        preds = list()
+        for storage in ['mmap', 'shm']:
+            layer = get_layer()
+            with ParallelProcessing(
+                    'multiprocessing', 2, storage=storage) as mgr:
+                preds.append(mgr.map(layer, 'fit', X, y, return_preds=True))
+            with ParallelProcessing(
+                    'multiprocessing', 2, storage=storage) as mgr:
+                preds.append(mgr.map(layer, 'predict', X, return_preds=True))
+        np.testing.assert_array_equal(preds[0], preds[2])
+        np.testing.assert_array_equal(preds[1], preds[3])
+
+    def test_share_sparse():
+        """[Parallel | Backend] Test sparse matrices share their buffers"""
+        a = share_sparse(csr_matrix(X))
+        b = pickle.loads(pickle.dumps(a))
+        assert b.format == 'csr'
+        np.testing.assert_array_equal(b.toarray(), X)
+        b.data[0] = -1
+        assert a.data[0] == -1
+        for attr in ['data', 'indices', 'indptr']:
+            getattr(a, attr)._shm.unlink()
+
+    def test_shm_sparse_storage():
+        """[Parallel | Backend] Test shared memory storage of sparse inputs"""
+        preds = list()
+        for storage in ['mmap', 'shm']:
+            layer = get_layer(sparse=True)
+            with ParallelProcessing(
+                    'multiprocessing', 2, storage=storage) as mgr:
+                preds.append(mgr.map(
+                    layer, 'fit', csr_matrix(X), y, return_preds=True))
+                if storage == 'shm':
+                    assert len(mgr.job.shm) >= 3
+        np.testing.assert_array_equal(preds[0], preds[1])
+
+    def test_shm_clear():
+        """[Parallel | Backend] Test shared memory segments are unlinked"""
+        mgr = ParallelProcessing('multiprocessing', 2, storage='shm')
+        mgr.map(get_layer(), 'fit', X, y)
+        names = [shm.name for shm in mgr.job.shm]
+        assert names
+        mgr.clear()
+        for name in names:
+            np.testing.assert_raises(
+                OSError, shared_memory.SharedMemory, name=name)
+
+
+def test_input_cache():
+    """[Parallel | Backend] Test inputs are re-used across calls"""
+    config.set_input_cache(2)
+    try:
+        with ParallelProcessing('multiprocessing', 2) as mgr:
+            p1 = mgr.map(get_layer(), 'fit', X, y, return_preds=True)
+            f1 = mgr.job.predict_in.filename
+
+        with ParallelProcessing('multiprocessing', 2) as mgr:
+            p2 = mgr.map(get_layer(), 'fit', X.copy(), y, return_preds=True)
+            f2 = mgr.job.predict_in.filename
+
+        assert f1 == f2
+        assert _INPUTS.hits == 2
+        np.testing.assert_array_equal(p1, p2)
+
+        # Least recently used input is evicted once unpinned
+        config.set_input_cache(1)
+        with ParallelProcessing('multiprocessing', 2) as mgr:
+            mgr.map(get_layer(), 'fit', X + 1, y)
+            assert len(_INPUTS.entries) == 2
+        assert len(_INPUTS.entries) == 1
+    finally:
+        config.set_input_cache(0)
+        clear_inputs()
+    assert not _INPUTS.entries
+
+
+def test_session():
+    """[Parallel | Backend] Test worker pool is re-used across calls"""
+    layer = get_layer()
+    with ParallelProcessing('multiprocessing', 2) as mgr:
+        p1 = mgr.map(layer, 'fit', X, y, return_preds=True)
+
+    with Session('multiprocessing', 2) as session:
+        pool = session._parallel._backend._pool
+        for _ in range(2):
+            with ParallelProcessing(session=session) as mgr:
+                p2 = mgr.map(get_layer(), 'fit', X, y, return_preds=True)
+            np.testing.assert_array_equal(p1, p2)
+            assert session._parallel._backend._pool is pool
+    assert not session.active
+
+    # Closed sessions are ignored
+    mgr = ParallelProcessing('threading', 1, session=session)
+    assert mgr.session is None
+
+    # Sessions pickle without their pool
+    assert not pickle.loads(pickle.dumps(session)).active
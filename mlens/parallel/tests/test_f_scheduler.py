@@ -0,0 +1,245 @@
+"""ML-ENSEMBLE
+
+Test of dependency-aware task scheduling.
+"""
+import tempfile
+import threading
+import numpy as np
+from sklearn.cluster import KMeans
+
+from mlens.index import FoldIndex, ClusteredSubsetIndex
+from mlens.parallel import Layer, ParallelProcessing, make_group
+from mlens.parallel.scheduler import (schedule, batch, depends, provides,
+                                      writes, signature, CostHistory, Batch,
+                                      COSTS)
+from mlens.parallel._base_functions import mark, wait, load, save, produce
+from mlens.testing.dummy import PREPROCESSING, ESTIMATORS, ECM
+from mlens.utils.exceptions import ParallelProcessingError
+from mlens.externals.sklearn.base import clone
+
+
+X = np.arange(48).reshape(24, 2).astype(np.float64)
+y = X[:, 0] * 2 + X[:, 1]
+
+
+def get_layer(backend):
+    """Build a layer with preprocessing and non-preprocessing learners"""
+    layer = Layer(backend=backend, n_jobs=2)
+    layer.push(make_group(FoldIndex(3), ESTIMATORS, PREPROCESSING))
+    layer.push(make_group(FoldIndex(3), ECM, None))
+    return layer
+
+
+def test_schedule():
+    """[Parallel | Scheduler] Test tasks are ordered after dependencies"""
+    tasks = schedule(*get_tasks(get_layer('threading')),
+                     costs=CostHistory())
+
+    assert any(depends(task) is not None for task in tasks)
+
+    seen = set()
+    independent = True
+    for task in tasks:
+        dep = depends(task)
+        if dep is not None:
+            assert dep in seen
+            independent = False
+        elif not hasattr(task, 'preprocess'):
+            # Transformer
+            seen.add(provides(task))
+        else:
+            # Independent learners precede dependent learners
+            assert independent
+
+
+def get_tasks(layer, P=None):
+    """Generate fit tasks of a layer"""
+    args = {'job': 'fit', 'dir': list(),
+            'auxiliary': {'X': X, 'y': y, 'P': None},
+            'main': {'X': X, 'y': y, 'P': P}}
+    layer.setup(X, y, 'fit')
+    return ([st for tr in layer.transformers for st in tr(args, 'auxiliary')],
+            [sl for lr in layer.learners for sl in lr(args, 'main')])
+
+
+def key(task, scope=None):
+    """Cost history key of a fit task"""
+    return (scope, 'fit', provides(task), signature(task.estimator))
+
+
+def test_cost_history():
+    """[Parallel | Scheduler] Test costs are recorded on fit"""
+    COSTS.clear()
+    layer = get_layer('threading')
+    with ParallelProcessing('threading', 2) as mgr:
+        mgr.map(layer, 'fit', X, y)
+    assert (layer.name, 'fit', 'OLS') in COSTS.costs
+    for task in get_tasks(layer)[1]:
+        assert key(task, layer.name) in COSTS.costs
+        assert COSTS.cost(task, layer.name) is not None
+        assert COSTS.cost(task) is None
+
+    # Costs carry over to clones, but not to other parameters
+    other = clone(layer)
+    for task in get_tasks(other)[1]:
+        assert COSTS.cost(task, other.name) is not None
+    task = get_tasks(other)[1][0]
+    task.estimator.set_params(offset=1)
+    assert key(task, other.name) not in COSTS.costs
+    COSTS.clear()
+
+
+def test_cost_history_size():
+    """[Parallel | Scheduler] Test least recently used costs are dropped"""
+    costs = CostHistory(size=2)
+    costs.update(('a', 'fit', 'ols'), 1.)
+    costs.update(('b', 'fit', 'ols'), 2.)
+    assert costs.get(('a', 'fit', 'ols')) == 1.
+    costs.update(('c', 'fit', 'ols'), 3.)
+    assert list(costs.costs) == [('a', 'fit', 'ols'), ('c', 'fit', 'ols')]
+
+
+def test_longest_first():
+    """[Parallel | Scheduler] Test tasks are ordered by decreasing cost"""
+    transformers, learners = get_tasks(get_layer('threading'))
+
+    costs = CostHistory()
+    for i, task in enumerate(learners):
+        costs.update(key(task), i)
+    tasks = schedule(transformers, learners, costs)
+
+    n = len(transformers)
+    independent = [t for t in tasks[n:] if depends(t) is None]
+    dependent = [t for t in tasks[n:] if depends(t) is not None]
+    assert tasks[n:] == independent + dependent
+    for group in [independent, dependent]:
+        c = [costs.cost(t) for t in group]
+        assert c == sorted(c, reverse=True)
+
+
+def test_keep_writes():
+    """[Parallel | Scheduler] Test overlapping writes keep their order"""
+    layer = Layer(n_jobs=2)
+    layer.push(make_group(
+        ClusteredSubsetIndex(KMeans(2, random_state=0), 2, 2), ECM, None))
+    transformers, learners = get_tasks(layer, np.zeros((24, 2 * len(ECM))))
+
+    costs = CostHistory()
+    for i, task in enumerate(learners):
+        costs.update(key(task), i)
+    tasks = schedule(transformers, learners, costs)
+    assert tasks[0] is not learners[0]
+    keys = set(writes(t) for t in learners)
+    assert len(keys) == 2 * len(ECM) + 1
+    keys.discard(None)
+    for k in keys:
+        assert [t for t in tasks if writes(t) == k] == \
+            [t for t in learners if writes(t) == k]
+
+
+def test_batch():
+    """[Parallel | Scheduler] Test cheap tasks are batched in order"""
+    transformers, learners = get_tasks(get_layer('threading'))
+    tasks = schedule(transformers, learners, CostHistory())
+
+    costs = CostHistory()
+    for i, task in enumerate(tasks):
+        if i != 3:
+            costs.update(key(task), 1. if i == 6 else 0.01)
+    batches = batch(tasks, 2, costs, min_cost=0.05)
+
+    flat = list()
+    for b in batches:
+        if isinstance(b, Batch):
+            assert 1 < len(b) <= 5
+            assert all(costs.cost(t) == 0.01 for t in b.tasks)
+            flat.extend(b.tasks)
+        else:
+            flat.append(b)
+    assert flat == tasks
+    assert tasks[3] in batches and tasks[6] in batches
+    assert len(batches) < len(tasks)
+
+    # Without history, tasks run alone
+    assert batch(tasks, 2, CostHistory()) == tasks
+
+
+def test_batch_layer():
+    """[Parallel | Scheduler] Test estimation with batched tasks"""
+    preds = list()
+    for i in range(2):
+        # Costs are recorded on the first run
+        layer = get_layer('threading')
+        with ParallelProcessing('threading', 2) as mgr:
+            preds.append(mgr.map(layer, 'fit', X, y, return_preds=True))
+    np.testing.assert_array_equal(preds[0], preds[1])
+    COSTS.clear()
+
+
+def test_layer():
+    """[Parallel | Scheduler] Test single pass layer estimation"""
+    preds = list()
+    for backend in ['threading', 'multiprocessing']:
+        layer = get_layer(backend)
+        with ParallelProcessing(backend, 2) as mgr:
+            preds.append(mgr.map(layer, 'fit', X, y, return_preds=True))
+        with ParallelProcessing(backend, 2) as mgr:
+            preds.append(mgr.map(layer, 'predict', X, return_preds=True))
+    np.testing.assert_array_equal(preds[0], preds[2])
+    np.testing.assert_array_equal(preds[1], preds[3])
+
+
+def test_wait_failed():
+    """[Parallel | Scheduler] Test waiting on a failed task raises"""
+    path = list()
+    mark(path, 'sc.0.1', 'run')
+    mark(path, 'sc.0.1', 'err')
+    np.testing.assert_raises(ParallelProcessingError, wait, path, 'sc.0.1')
+
+
+def test_wait_list():
+    """[Parallel | Scheduler] Test waiting on in-memory cache entries"""
+    path = list()
+    mark(path, 'sc.0.1', 'run')
+    timer = threading.Timer(0.1, save, (path, 'sc.0.1', 1))
+    timer.start()
+    assert load(path, 'sc.0.1') == 1
+    timer.join()
+
+
+def test_wait_unmarked():
+    """[Parallel | Scheduler] Test unmarked entries are not awaited"""
+    path = list()
+    wait(path, 'sc.0.1')
+    np.testing.assert_raises_regex(
+        ValueError, r"No entry sc\.0\.1", load, path, 'sc.0.1')
+
+
+def test_wait_dir():
+    """[Parallel | Scheduler] Test waiting on a task producing to disk"""
+    path = tempfile.mkdtemp()
+    started = threading.Event()
+
+    def fit():
+        with produce(path, 'sc.0.1'):
+            started.set()
+            save(path, 'sc.0.1', 1)
+
+    def fail():
+        with produce(path, 'sc.0.2'):
+            started.set()
+            raise ValueError("failed")
+
+    thread = threading.Thread(target=fit)
+    thread.start()
+    started.wait()
+    assert load(path, 'sc.0.1') == 1
+    thread.join()
+
+    started.clear()
+    thread = threading.Thread(target=lambda: np.testing.assert_raises(
+        ValueError, fail))
+    thread.start()
+    started.wait()
+    np.testing.assert_raises(ParallelProcessingError, wait, path, 'sc.0.2')
+    thread.join()
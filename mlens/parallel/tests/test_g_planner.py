@@ -0,0 +1,137 @@
+"""ML-ENSEMBLE
+
+Test of memory planning.
+"""
+import numpy as np
+from sklearn.cluster import KMeans
+
+from mlens.ensemble import Subsemble
+from mlens.ensemble.base import Sequential
+from mlens.index import FoldIndex, BlendIndex, ClusteredSubsetIndex
+from mlens.parallel import Layer, Learner, ParallelProcessing, make_group
+from mlens.parallel.planner import plan, parse_size
+from mlens.utils.dummy import OLS
+
+
+X = np.arange(240).reshape(24, 10).astype(np.float64)
+y = np.arange(24).astype(np.float64)
+
+
+def get_stack(dtype=np.float64):
+    """Build a two-layer stack"""
+    l1 = Layer('layer-1', dtype=dtype)
+    l1.push(make_group(FoldIndex(3), [OLS(), OLS(1)], None))
+    l2 = Layer('layer-2', dtype=dtype)
+    l2.push(make_group(BlendIndex(0.5), [OLS()], None))
+    return [l1, l2]
+
+
+def test_parse_size():
+    """[Parallel | Planner] Test memory sizes are converted to bytes"""
+    assert parse_size(100) == 100
+    assert parse_size('2KB') == 2048
+    assert parse_size('1.5 mb') == int(1.5 * 1024 ** 2)
+    np.testing.assert_raises(ValueError, parse_size, 0)
+
+
+def test_plan_shapes():
+    """[Parallel | Planner] Test planned shapes match prediction arrays"""
+    stack = get_stack()
+    p = plan(stack, 'fit', X, y, 'threading', 2)
+    assert [name for name, _, _ in p.layers] == ['layer-1', 'layer-2']
+
+    with ParallelProcessing('threading', 2) as mgr:
+        out = mgr.stack(stack, 'fit', X, y, return_preds=True)
+    assert p.layers[-1][1] == out.shape
+    assert p.layers[-1][2] == out.nbytes
+
+    # Training folds are copied by each worker
+    assert p.memory == X.nbytes + p.layers[0][2] + 2 * X.nbytes
+    assert not p.disk
+
+    p = plan(stack, 'fit', X, y, 'multiprocessing', 2)
+    assert p.memory == 2 * X.nbytes
+    assert p.disk == X.nbytes + sum(b for _, _, b in p.layers)
+
+
+def test_plan_limit():
+    """[Parallel | Planner] Test plan is adapted to a memory limit"""
+    stack = get_stack()
+    full = plan(stack, 'fit', X, y, 'threading', 2)
+    assert plan(stack, 'fit', X, y, 'threading', 2,
+                memory_limit=full.memory).backend == 'threading'
+
+    p = plan(stack, 'fit', X, y, 'threading', 2,
+             memory_limit=full.memory - 1)
+    assert p.backend == 'multiprocessing'
+    assert p.storage == 'mmap'
+
+    # Folds of the first layer's predictions dominate narrow inputs
+    p = plan(stack, 'fit', X[:, :1], y, 'threading', 1, memory_limit=300)
+    assert p.dtype == np.float32
+    assert p.memory == 24 * 2 * 4
+
+    np.testing.assert_raises(
+        MemoryError, plan, stack, 'fit', X, y, 'threading', 2, 'mmap', 1)
+
+
+def test_plan_chunks():
+    """[Parallel | Planner] Test predictions are planned in chunks"""
+    stack = get_stack()
+    with ParallelProcessing('threading', 2) as mgr:
+        mgr.stack(stack, 'fit', X, y)
+
+    full = plan(stack, 'predict', X, None, 'threading', 2)
+    p = plan(stack, 'predict', X, None, 'threading', 2,
+             memory_limit=full.memory // 2)
+    assert p.backend == 'threading'
+    assert 1 <= p.chunk_size < X.shape[0]
+    assert p.memory <= full.memory // 2
+
+
+def test_plan_clustered():
+    """[Parallel | Planner] Test planning leaves clustered indexers unfitted"""
+    km = KMeans(2, random_state=0)
+    layer = Layer(dtype=np.float64)
+    layer.push(make_group(ClusteredSubsetIndex(km, 2, 2), [OLS()], None))
+    p = plan(layer, 'fit', X, y, 'threading', 2)
+    assert not hasattr(km, 'cluster_centers_')
+
+    with ParallelProcessing('threading', 2) as mgr:
+        out = mgr.map(layer, 'fit', X, y, return_preds=True)
+    assert p.layers[-1][1] == out.shape
+
+
+def test_plan_subsemble():
+    """[Parallel | Planner] Test planning a subsemble with clusters"""
+    km = KMeans(2, random_state=0)
+    ens = Subsemble(partitions=2, partition_estimator=km, folds=2)
+    ens.add([OLS(), OLS(1)])
+    p = ens.plan(X, y, memory_limit='1GB')
+    assert p.fits(parse_size('1GB'))
+
+    out = ens.fit(X, y, memory_limit='1GB', return_preds=True)
+    assert p.layers[-1][1] == out.shape
+
+
+def test_plan_learner():
+    """[Parallel | Planner] Test planning a stack of learners"""
+    seq = Sequential(stack=[Learner(OLS(), indexer=FoldIndex(3))])
+    p = seq.plan(X, y, memory_limit='1GB')
+    assert p.layers[-1][1] == (24, 1)
+
+    out = seq.fit(X, y, memory_limit='1GB', return_preds=True)
+    assert p.layers[-1][1][0] == out.shape[0]
+    assert seq.predict(X, memory_limit='1GB').shape == (24,)
+
+
+def test_plan_session():
+    """[Parallel | Planner] Test plans keep the backend of a session"""
+    seq = Sequential(stack=get_stack(), backend='threading', n_jobs=2)
+    limit = seq.plan(X, y).memory - 1
+    assert seq.plan(X, y, memory_limit=limit).backend == 'multiprocessing'
+
+    with seq.session():
+        p = seq.plan(X, y, memory_limit=limit)
+    assert p.backend == 'threading'
+    assert p.dtype == np.float32
@@ -0,0 +1,124 @@
+"""ML-ENSEMBLE
+
+Test of estimation cache stores.
+"""
+import os
+import re
+import pickle
+import tempfile
+import numpy as np
+
+from mlens.index import FoldIndex
+from mlens.parallel import (Layer, ParallelProcessing, make_group,
+                            MemoryStore, DiskStore, SQLiteStore)
+from mlens.parallel.store import CacheStore
+from mlens.parallel._base_functions import save, load, prune_files
+from mlens.testing.dummy import PREPROCESSING, ESTIMATORS
+
+
+X = np.arange(48).reshape(24, 2).astype(np.float64)
+y = X[:, 0] * 2 + X[:, 1]
+
+
+def get_layer(backend):
+    """Build a layer with preprocessing"""
+    layer = Layer(backend=backend, n_jobs=2)
+    layer.push(make_group(FoldIndex(3), ESTIMATORS, PREPROCESSING))
+    return layer
+
+
+def check_store(store):
+    """Check store lookups"""
+    for name in ['lr.1.1', 'lr.0.0', 'lr.1.0', 'lr2.0.0', '.lr.0.0.run']:
+        save(store, name, name)
+    assert load(store, 'lr.1.0') == 'lr.1.0'
+    assert prune_files(store, 'lr') == ['lr.0.0', 'lr.1.0', 'lr.1.1']
+    assert prune_files(store, 'lr2') == ['lr2.0.0']
+    assert prune_files(store, 'lr3') == []
+
+    # Missing entries without a producer raise at once
+    np.testing.assert_raises_regex(
+        ValueError, r"lr\.2\.0 in cache %s" % re.escape(repr(store)),
+        load, store, 'lr.2.0')
+
+    sub = store.subcache('task_0')
+    assert prune_files(sub, 'lr') == []
+    np.testing.assert_raises(
+        Exception, store.subcache, 'task_0', exist_ok=False)
+
+
+def test_memory_store():
+    """[Parallel | Store] Test in-memory store"""
+    check_store(MemoryStore())
+
+
+def test_disk_store():
+    """[Parallel | Store] Test disk store"""
+    path = tempfile.mkdtemp()
+    check_store(DiskStore(path))
+    assert '.lr.manifest' in os.listdir(path)
+
+
+def test_sqlite_store():
+    """[Parallel | Store] Test sqlite store"""
+    f = os.path.join(tempfile.mkdtemp(), 'cache.db')
+    store = SQLiteStore(f)
+    check_store(store)
+
+    # Sub-caches share the connection of the store
+    sub = store.subcache('task_1')
+    assert sub._db is store._db
+    save(sub, 'lr.0.0', 'sub')
+    sub.close()
+    assert load(store, 'lr.0.0') == 'lr.0.0'
+
+    # Connections are re-opened after unpickling
+    store = pickle.loads(pickle.dumps(store))
+    assert load(store, 'lr.0.0') == 'lr.0.0'
+    store.close()
+
+
+def test_store_interface():
+    """[Parallel | Store] Test stores must implement the interface"""
+
+    class Incomplete(CacheStore):
+
+        """Store without sub-caches"""
+
+        def save(self, name, obj):
+            pass
+
+        def load(self, name):
+            pass
+
+        def exists(self, name):
+            pass
+
+        def prune(self, name):
+            pass
+
+    np.testing.assert_raises(TypeError, Incomplete)
+
+
+def test_cache():
+    """[Parallel | Store] Test estimation with cache stores"""
+    for backend in ['threading', 'multiprocessing']:
+        preds = list()
+        caches = [None, 'disk', 'sqlite']
+        if backend == 'threading':
+            caches.append('memory')
+        for cache in caches:
+            layer = get_layer(backend)
+            with ParallelProcessing(backend, 2, cache=cache) as mgr:
+                p = mgr.map(layer, 'fit', X, y, return_preds=True)
+            with ParallelProcessing(backend, 2, cache=cache) as mgr:
+                q = mgr.map(layer, 'predict', X, return_preds=True)
+            preds.append((p, q))
+        for p, q in preds[1:]:
+            np.testing.assert_array_equal(preds[0][0], p)
+            np.testing.assert_array_equal(preds[0][1], q)
+
+    np.testing.assert_raises(
+        ValueError, ParallelProcessing('multiprocessing', 2,
+                                       cache='memory').map,
+        get_layer('multiprocessing'), 'fit', X, y)
@@ -0,0 +1,95 @@
+"""ML-ENSEMBLE
+
+Test of persistent fit memoization.
+"""
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from mlens import config
+from mlens.index import FoldIndex
+from mlens.parallel import Layer, ParallelProcessing, make_group
+from mlens.utils.dummy import OLS
+
+
+X = np.arange(48).reshape(24, 2).astype(np.float64)
+y = X[:, 0] * 2 + X[:, 1]
+
+FITS = list()
+
+
+class CountOLS(OLS):
+
+    """OLS recording calls to fit"""
+
+    def fit(self, X, y):
+        FITS.append(self.offset)
+        return super(CountOLS, self).fit(X, y)
+
+
+def run(offsets):
+    """Fit a layer and return predictions"""
+    layer = Layer()
+    layer.push(make_group(FoldIndex(3), [CountOLS(o) for o in offsets], None))
+    with ParallelProcessing('threading', 2) as mgr:
+        return mgr.map(layer, 'fit', X, y, return_preds=True)
+
+
+def test_memo():
+    """[Parallel | Memo] Test unchanged sub-learners are restored"""
+    path = tempfile.mkdtemp()
+    config.set_memo(path)
+    try:
+        p = run([0])
+        n = len(FITS)
+        assert len(os.listdir(path)) == n
+
+        # No refits with unchanged estimators
+        q = run([0])
+        assert len(FITS) == n
+        np.testing.assert_array_equal(p, q)
+
+        # Only new estimators are fitted
+        run([0, 1])
+        assert FITS[n:] == [1] * n
+
+        # Memoized fits are ignored for different data
+        del FITS[:]
+        layer = Layer()
+        layer.push(make_group(FoldIndex(3), [CountOLS()], None))
+        with ParallelProcessing('threading', 2) as mgr:
+            mgr.map(layer, 'fit', X + 1, y)
+        assert len(FITS) == n
+    finally:
+        config.set_memo('')
+        shutil.rmtree(path)
+
+
+def test_memo_corrupt():
+    """[Parallel | Memo] Test corrupt entries are refit"""
+    path = tempfile.mkdtemp()
+    config.set_memo(path)
+    try:
+        del FITS[:]
+        p = run([0])
+        n = len(FITS)
+
+        # Truncate entries as an interrupted save would
+        for f in os.listdir(path):
+            f = os.path.join(path, f)
+            with open(f, 'rb') as fh:
+                data = fh.read()
+            with open(f, 'wb') as fh:
+                fh.write(data[:len(data) // 2])
+
+        q = run([0])
+        assert len(FITS) == 2 * n
+        np.testing.assert_array_equal(p, q)
+
+        # Entries are saved again
+        run([0])
+        assert len(FITS) == 2 * n
+    finally:
+        config.set_memo('')
+        shutil.rmtree(path)
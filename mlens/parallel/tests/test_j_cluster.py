@@ -0,0 +1,134 @@
+"""ML-ENSEMBLE
+
+Test of the multi-node socket backend on localhost workers.
+"""
+import multiprocessing
+import numpy as np
+
+from mlens.index import FoldIndex
+from mlens.parallel import (Layer, ParallelProcessing, make_group, Cluster,
+                            serve)
+from mlens.parallel import cluster as cluster_module
+from mlens.testing.dummy import PREPROCESSING, ESTIMATORS
+from mlens.utils.dummy import OLS
+
+
+X = np.arange(48).reshape(24, 2).astype(np.float64)
+y = X[:, 0] * 2 + X[:, 1]
+
+AUTHKEY = b'mlens'
+
+
+class Fail(OLS):
+
+    """OLS failing on fit"""
+
+    def fit(self, X, y):
+        raise ValueError("Failed on worker.")
+
+
+def get_layer():
+    """Build a layer with preprocessing"""
+    layer = Layer(backend='multiprocessing', n_jobs=2)
+    layer.push(make_group(FoldIndex(3), ESTIMATORS, PREPROCESSING))
+    return layer
+
+
+def start(cluster, n):
+    """Start n local workers"""
+    address = cluster.listen()
+    workers = [multiprocessing.Process(target=serve,
+                                       args=(address, cluster.authkey))
+               for _ in range(n)]
+    for w in workers:
+        w.start()
+    return workers
+
+
+def run(cluster, cache=None):
+    """Fit and predict with a layer on a cluster"""
+    layer = get_layer()
+    with ParallelProcessing(session=cluster, cache=cache) as mgr:
+        p = mgr.map(layer, 'fit', X, y, return_preds=True)
+    with ParallelProcessing(session=cluster, cache=cache) as mgr:
+        q = mgr.map(layer, 'predict', X, return_preds=True)
+    return p, q
+
+
+def run_local():
+    """Fit and predict with a layer on local processes"""
+    layer = get_layer()
+    with ParallelProcessing('multiprocessing', 2) as mgr:
+        p = mgr.map(layer, 'fit', X, y, return_preds=True)
+    with ParallelProcessing('multiprocessing', 2) as mgr:
+        q = mgr.map(layer, 'predict', X, return_preds=True)
+    return p, q
+
+
+def test_cluster():
+    """[Parallel | Cluster] Test estimation on socket workers"""
+    p, q = run_local()
+
+    for shared, cache in [(False, None), (False, 'disk'), (True, None)]:
+        cluster = Cluster(n_workers=2, authkey=AUTHKEY, shared=shared,
+                          timeout=30)
+        workers = start(cluster, 2)
+        with cluster:
+            assert cluster.active
+            r, s = run(cluster, cache)
+        for w in workers:
+            w.join(10)
+            assert w.exitcode == 0
+
+        np.testing.assert_array_equal(p, r)
+        np.testing.assert_array_equal(q, s)
+
+
+def test_cluster_error():
+    """[Parallel | Cluster] Test worker errors are raised"""
+    cluster = Cluster(n_workers=1, authkey=AUTHKEY, timeout=30)
+    workers = start(cluster, 1)
+    with cluster:
+        layer = Layer()
+        layer.push(make_group(FoldIndex(2), [Fail()], None))
+        with ParallelProcessing(session=cluster) as mgr:
+            np.testing.assert_raises(ValueError, mgr.map, layer, 'fit', X, y)
+
+        # Cluster remains usable
+        with ParallelProcessing(session=cluster) as mgr:
+            mgr.map(get_layer(), 'fit', X, y)
+    for w in workers:
+        w.join(10)
+
+
+def test_cluster_blocks():
+    """[Parallel | Cluster] Test inputs are streamed in row blocks"""
+    p, q = run_local()
+
+    block = cluster_module.BLOCK_NBYTES
+    cluster_module.BLOCK_NBYTES = 5 * X.itemsize * X.shape[1]
+    try:
+        cluster = Cluster(n_workers=2, timeout=30)
+        workers = start(cluster, 2)
+        with cluster:
+            r, s = run(cluster)
+        for w in workers:
+            w.join(10)
+            assert w.exitcode == 0
+    finally:
+        cluster_module.BLOCK_NBYTES = block
+
+    np.testing.assert_array_equal(p, r)
+    np.testing.assert_array_equal(q, s)
+
+
+def test_cluster_authkey():
+    """[Parallel | Cluster] Test connections are authenticated by default"""
+    assert Cluster().authkey
+    assert Cluster().authkey != Cluster().authkey
+
+    # Unauthenticated connections only on the local machine
+    Cluster(authkey=b'').listen()
+    np.testing.assert_raises(
+        ValueError, Cluster(('0.0.0.0', 0), authkey=b'').listen)
+    np.testing.assert_raises(ValueError, serve, ('10.0.0.1', 5000))
@@ -0,0 +1,149 @@
+"""ML-ENSEMBLE
+
+Test of the thread budget.
+"""
+from copy import copy
+import numpy as np
+from sklearn.pipeline import Pipeline
+
+from mlens import config
+from mlens.index import FoldIndex
+from mlens.parallel import Layer, ParallelProcessing, make_group
+from mlens.parallel.learner import copy_estimator
+from mlens.parallel.threads import cap_jobs, threadpool_limits
+from mlens.utils.dummy import OLS
+
+try:
+    from threadpoolctl import threadpool_info
+except ImportError:
+    threadpool_info = None
+
+
+X = np.arange(48).reshape(24, 2).astype(np.float64)
+y = X[:, 0] * 2 + X[:, 1]
+
+THREADS = list()
+
+
+class JobsOLS(OLS):
+
+    """OLS recording its n_jobs and thread pool sizes on fit"""
+
+    def __init__(self, offset=0, n_jobs=-1):
+        super(JobsOLS, self).__init__(offset)
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y):
+        pools = [p['num_threads'] for p in threadpool_info()] \
+            if threadpool_info is not None else []
+        THREADS.append((self.n_jobs, pools))
+        return super(JobsOLS, self).fit(X, y)
+
+
+class PredictOLS(OLS):
+
+    """OLS setting an attribute when predicting"""
+
+    def predict(self, X):
+        self.rows = X.shape[0]
+        return super(PredictOLS, self).predict(X)
+
+
+def run(est):
+    """Fit a layer on four threads"""
+    layer = Layer()
+    layer.push(make_group(FoldIndex(2), [est], None))
+    with ParallelProcessing('threading', 4) as mgr:
+        return mgr.map(layer, 'fit', X, y, return_preds=True)
+
+
+def test_cap_jobs():
+    """[Parallel | Threads] Test capping estimator n_jobs"""
+    est = JobsOLS(n_jobs=-1)
+    with cap_jobs([est], 2):
+        assert est.n_jobs == 2
+    assert est.n_jobs == -1
+
+    est = JobsOLS(n_jobs=1)
+    with cap_jobs([est], 2):
+        assert est.n_jobs == 1
+
+    # Sub-estimators are restored
+    est = Pipeline([('ols', JobsOLS(n_jobs=-1))])
+    with cap_jobs([copy(est)], 2):
+        assert est.steps[0][1].n_jobs == 2
+    assert est.steps[0][1].n_jobs == -1
+
+    # No-op on objects without parameters
+    with cap_jobs([None], 2):
+        pass
+
+
+def test_pipeline():
+    """[Parallel | Threads] Test predicting does not change fitted estimators"""
+    layer = Layer()
+    layer.push(make_group(
+        FoldIndex(2), [Pipeline([('ols', JobsOLS(n_jobs=-1))])], None))
+    with ParallelProcessing('threading', 4) as mgr:
+        mgr.map(layer, 'fit', X, y)
+        p = mgr.map(layer, 'predict', X, return_preds=True)
+
+    config.set_threads(8, True)
+    try:
+        with ParallelProcessing('threading', 4) as mgr:
+            q = mgr.map(layer, 'predict', X, return_preds=True)
+    finally:
+        config.set_threads(0)
+
+    np.testing.assert_array_equal(p, q)
+    learner = layer.learners[0]
+    for obj in list(learner.learner) + list(learner.sublearners):
+        assert obj.estimator.steps[0][1].n_jobs == -1
+
+
+def test_copy_estimator():
+    """[Parallel | Threads] Test prediction copies share fitted attributes"""
+    est = Pipeline([('ols', PredictOLS())]).fit(X, y)
+    cp = copy_estimator(est)
+    assert cp.steps is not est.steps
+    assert cp.steps[0][1] is not est.steps[0][1]
+    assert cp.steps[0][1].coef_ is est.steps[0][1].coef_
+
+    layer = Layer()
+    layer.push(make_group(
+        FoldIndex(2), [Pipeline([('ols', PredictOLS())])], None))
+    with ParallelProcessing('threading', 4) as mgr:
+        mgr.map(layer, 'fit', X, y)
+
+    # pylint: disable=protected-access
+    learner = layer.learners[0]
+    fitted = [obj._estimator.steps[0][1]
+              for obj in list(learner.learner) + list(learner.sublearners)]
+    rows = [getattr(step, 'rows', None) for step in fitted]
+    with ParallelProcessing('threading', 4) as mgr:
+        mgr.map(layer, 'predict', X[:5])
+    assert [getattr(step, 'rows', None) for step in fitted] == rows
+
+
+def test_threads():
+    """[Parallel | Threads] Test estimation within a thread budget"""
+    p = run(JobsOLS())
+    assert all(n == -1 for n, _ in THREADS)
+
+    est = JobsOLS()
+    config.set_threads(8, True)
+    try:
+        del THREADS[:]
+        q = run(est)
+    finally:
+        config.set_threads(0)
+
+    np.testing.assert_array_equal(p, q)
+    assert THREADS
+    for n_jobs, pools in THREADS:
+        assert n_jobs == 2
+        if threadpool_limits is not None:
+            assert all(n <= 2 for n in pools)
+
+    # Only the copies fitted by workers are capped
+    assert est.n_jobs == -1
@@ -0,0 +1,60 @@
+"""ML-ENSEMBLE
+
+Test of the transformed fold cache.
+"""
+import numpy as np
+
+from mlens import config
+from mlens.index import FoldIndex
+from mlens.parallel import Layer, ParallelProcessing, make_group
+from mlens.utils.dummy import OLS, Scale
+
+
+X = np.arange(48).reshape(24, 2).astype(np.float64)
+y = X[:, 0] * 2 + X[:, 1]
+
+TRANSFORMS = list()
+
+
+class CountScale(Scale):
+
+    """Scale recording calls to transform"""
+
+    def transform(self, X):
+        TRANSFORMS.append(X.shape[0])
+        return super(CountScale, self).transform(X)
+
+
+def run(backend, cache=None):
+    """Fit and predict with a layer with one preprocessing case"""
+    layer = Layer()
+    layer.push(make_group(FoldIndex(3),
+                          {'sc': [OLS(i) for i in range(4)]},
+                          {'sc': [CountScale()]}))
+    with ParallelProcessing(backend, 2, cache=cache) as mgr:
+        p = mgr.map(layer, 'fit', X, y, return_preds=True)
+    with ParallelProcessing(backend, 2, cache=cache) as mgr:
+        q = mgr.map(layer, 'predict', X, return_preds=True)
+    return p, q
+
+
+def test_fold_cache():
+    """[Parallel | Fold cache] Test learners read transformed folds"""
+    p, q = run('threading')
+    n = len(TRANSFORMS)
+
+    config.set_fold_cache(True)
+    try:
+        for backend, cache in [('threading', None),
+                               ('threading', 'memory'),
+                               ('multiprocessing', None),
+                               ('multiprocessing', 'disk')]:
+            del TRANSFORMS[:]
+            r, s = run(backend, cache)
+            np.testing.assert_array_equal(p, r)
+            np.testing.assert_array_equal(q, s)
+            if backend == 'threading':
+                # Fold transforms once per pipeline instead of per learner
+                assert len(TRANSFORMS) < n
+    finally:
+        config.set_fold_cache(False)
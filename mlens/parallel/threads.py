@@ -0,0 +1,137 @@
+"""ML-Ensemble
+
+:author: Sebastian Flennerhag
+:license: MIT
+:copyright: 2017-2018
+
+Thread budget of parallel estimation.
+
+Estimators parallelized with ``n_jobs``, or through a multi-threaded BLAS,
+start threads of their own in each worker, so a job with ``n_jobs=-1`` can
+run as many threads as the square of the number of cores. When a thread
+budget is set (see :func:`mlens.config.set_threads`), the budget is split
+between the workers of a job. OpenMP and BLAS thread pools are limited to
+the share of a worker while it runs a task, and the ``n_jobs`` parameters of
+the task's estimators are optionally capped to the share.
+"""
+from __future__ import division
+
+from contextlib import contextmanager
+
+from .. import config
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
+
+def share(parallel):
+    """Threads available to each worker of a parallel job. None if unset"""
+    threads, _ = config.get_threads()
+    if threads <= 0:
+        return None
+    # pylint: disable=protected-access
+    n_jobs = max(parallel._effective_n_jobs(), 1)
+    return max(threads // n_jobs, 1)
+
+
+@contextmanager
+def cap_jobs(estimators, n):
+    """Cap the n_jobs parameters of estimators and their sub-estimators.
+
+    The estimators of prediction tasks are copied only one level deep, and
+    share deeper sub-estimators with the fitted estimators, so the original
+    parameters are restored on exit.
+    """
+    capped = list()
+    for estimator in estimators:
+        try:
+            params = estimator.get_params(deep=True)
+        except (AttributeError, TypeError):
+            continue
+        old = dict((k, v) for k, v in params.items()
+                   if (k == 'n_jobs' or k.endswith('__n_jobs')) and
+                   isinstance(v, int) and (v < 0 or v > n))
+        if old:
+            estimator.set_params(**dict((k, n) for k in old))
+            capped.append((estimator, old))
+    try:
+        yield
+    finally:
+        for estimator, old in capped:
+            estimator.set_params(**old)
+
+
+@contextmanager
+def limit(n):
+    """Limit OpenMP and BLAS thread pools of the current process"""
+    if n is None or threadpool_limits is None:
+        yield
+        return
+    with threadpool_limits(limits=n):
+        yield
+
+
+class Governed(object):
+
+    """Task run within a thread budget.
+
+    Parameters
+    ----------
+    task : obj
+        task to run, such as a ``SubLearner``.
+
+    n : int
+        number of threads available to the task.
+
+    n_jobs : bool
+        whether to cap the ``n_jobs`` parameters of the task's estimator.
+
+    pools : bool
+        whether to limit thread pools while running the task. Thread pools
+        are shared by all threads of a process, so thread-based jobs are
+        limited once in the calling thread instead.
+    """
+
+    def __init__(self, task, n, n_jobs, pools):
+        self.task = task
+        self.n = n
+        self.n_jobs = n_jobs
+        self.pools = pools
+
+    def __call__(self):
+        estimators = list()
+        if self.n_jobs:
+            # Batches run several tasks
+            estimators = [getattr(task, 'estimator', None)
+                          for task in getattr(self.task, 'tasks', [self.task])]
+        with cap_jobs(estimators, self.n):
+            if not self.pools:
+                return self.task()
+            with limit(self.n):
+                return self.task()
+
+
+@contextmanager
+def govern(parallel, threading):
+    """Context of a parallel job run within the thread budget.
+
+    Yields a function that wraps the tasks of the job.
+
+    Parameters
+    ----------
+    parallel : obj
+        the ``Parallel`` instance running the job.
+
+    threading : bool
+        whether the job runs on threads of the current process.
+    """
+    n = share(parallel)
+    if n is None:
+        yield lambda task: task
+        return
+
+    _, n_jobs = config.get_threads()
+    with limit(n if threading else None):
+        yield lambda task: Governed(task, n, n_jobs, not threading)
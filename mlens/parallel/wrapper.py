@@ -6,6 +6,8 @@
 
 Estimator wrappers around base classes.
 """
+import sys
+
 from .. import config
 from .base import BaseParallel, OutputMixin
 from .backend import ParallelProcessing
@@ -22,6 +24,18 @@ def check_inputs(X, y, check_level):
     return X, y
 
 
+if sys.version_info >= (3, 7):
+    from ._async import AsyncMixin
+else:
+    class AsyncMixin(object):
+
+        """Awaitable estimation calls.
+
+        Asynchronous estimation requires Python 3.7 or later. On earlier
+        versions, the mixin adds no methods.
+        """
+
+
 class EstimatorMixin(object):
 
     """Estimator mixin
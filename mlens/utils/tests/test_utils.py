@@ -143,6 +143,30 @@ def test_pickle():
     assert test['entry2'] == 'also_test'
 
 
+def test_pickle_formats():
+    """[Utils] Check that pickling works with protocol 5 and compression."""
+    obj = {'arr': np.arange(100.), 'ints': np.arange(7), 'str': 'test'}
+    settings = [(5, 0, None), (5, 0, 'r'), (5, 0, 'c'),
+                (None, 3, None), (-1, ('gzip', 1), None)]
+    try:
+        for protocol, compress, mmap_mode in settings:
+            config.set_protocol(protocol)
+            config.set_compress(compress)
+            config.set_mmap_mode(mmap_mode)
+
+            utils.pickle_save(obj, 'd')
+            test = utils.pickle_load('d')
+
+            np.testing.assert_array_equal(test['arr'], obj['arr'])
+            np.testing.assert_array_equal(test['ints'], obj['ints'])
+            assert test['str'] == 'test'
+    finally:
+        config.set_protocol(None)
+        config.set_compress(0)
+        config.set_mmap_mode(None)
+        subprocess.check_call(['rm', 'd.pkl'])
+
+
 def test_load():
     """[Utils] Check that load handles exceptions gracefully"""
 
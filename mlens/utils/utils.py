@@ -9,13 +9,17 @@ from __future__ import division, print_function, with_statement
 
 import os
 import sys
-import warnings
+import mmap
+import struct
+import tempfile
 
 import subprocess
 from numpy import array
 
-from ..config import get_ivals
-from .exceptions import ParallelProcessingError, ParallelProcessingWarning
+from ..config import get_protocol, get_compress, get_mmap_mode
+from ..externals.joblib.numpy_pickle_utils import (
+    _COMPRESSORS, _detect_compressor, _read_fileobject, _write_fileobject)
+from .exceptions import ParallelProcessingError
 
 try:
     import psutil
@@ -27,6 +31,13 @@ try:
 except ImportError:
     import pickle
 
+try:
+    # Atomic on all platforms
+    from os import replace as _replace
+except ImportError:
+    # Python 2: atomic on posix only
+    from os import rename as _replace
+
 from time import sleep
 try:
     # Try get performance counter
@@ -37,6 +48,71 @@ except ImportError:
 
 
 ###############################################################################
+# Files with out-of-band buffers. Not a valid start of a pickle stream.
+_BUFFERS_PREFIX = b'\x00mlens\x05\x00'
+_ALIGN = 64
+_MMAP_ACCESS = {'r': mmap.ACCESS_READ,
+                'c': mmap.ACCESS_COPY}
+
+
+def _aligned(offset):
+    """Next offset aligned for array buffers"""
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def _dump_buffers(obj, f, protocol):
+    """Pickle obj with numpy arrays as out-of-band buffers.
+
+    Layout: prefix, number of buffers, buffer sizes, pickle stream size,
+    pickle stream, and each buffer at an aligned offset.
+    """
+    buffers = list()
+    data = pickle.dumps(obj, protocol=protocol,
+                        buffer_callback=buffers.append)
+    buffers = [b.raw() for b in buffers]
+    sizes = [b.nbytes for b in buffers]
+
+    header = [len(sizes)] + sizes + [len(data)]
+    header = struct.pack('<%dQ' % len(header), *header)
+    f.write(_BUFFERS_PREFIX)
+    f.write(header)
+    f.write(data)
+    offset = len(_BUFFERS_PREFIX) + len(header) + len(data)
+    for buf in buffers:
+        start = _aligned(offset)
+        f.write(b'\x00' * (start - offset))
+        f.write(buf)
+        offset = start + buf.nbytes
+
+
+def _load_buffers(f, mmap_mode):
+    """Load a file written by _dump_buffers"""
+    if mmap_mode is not None:
+        data = memoryview(
+            mmap.mmap(f.fileno(), 0, access=_MMAP_ACCESS[mmap_mode]))
+    else:
+        data = bytearray(os.fstat(f.fileno()).st_size)
+        f.seek(0)
+        f.readinto(data)
+        data = memoryview(data)
+
+    offset = len(_BUFFERS_PREFIX)
+    n, = struct.unpack_from('<Q', data, offset)
+    sizes = struct.unpack_from('<%dQQ' % n, data, offset + 8)
+    sizes, size = sizes[:-1], sizes[-1]
+
+    offset += 8 * (n + 2)
+    stream = data[offset:offset + size]
+    offset += size
+
+    buffers = list()
+    for nbytes in sizes:
+        offset = _aligned(offset)
+        buffers.append(data[offset:offset + nbytes])
+        offset += nbytes
+    return pickle.loads(stream, buffers=buffers)
+
+
 def pickled(name):
     """Filetype enforcer"""
     if not name.endswith('.pkl'):
@@ -45,40 +121,66 @@ def pickled(name):
 
 
 def pickle_save(obj, name):
-    """Utility function for pickling an object"""
-    with open(pickled(name), 'wb') as f:
-        pickle.dump(obj, f)
+    """Utility function for pickling an object
+
+    The object is written to a temporary file that is renamed on completion,
+    so that concurrent readers never see a partially written file. The
+    pickle protocol and compression are set by
+    :func:`~mlens.config.set_protocol` and :func:`~mlens.config.set_compress`.
+    """
+    name = pickled(name)
+    protocol = get_protocol()
+    compress = get_compress()
+    fd, tmp = tempfile.mkstemp(
+        prefix='.', suffix='.tmp', dir=os.path.dirname(name) or None)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if compress[1]:
+                with _write_fileobject(f, compress) as fobj:
+                    pickle.dump(obj, fobj, protocol=protocol)
+            elif (protocol is not None and protocol >= 5 and
+                  pickle.HIGHEST_PROTOCOL >= 5):
+                _dump_buffers(obj, f, protocol)
+            else:
+                pickle.dump(obj, f, protocol=protocol)
+        _replace(tmp, name)
+    except Exception:
+        os.unlink(tmp)
+        raise
 
 
 def pickle_load(name):
-    """Utility function for loading pickled object"""
+    """Utility function for loading pickled object
+
+    Handles any format written by :func:`pickle_save`. Out-of-band arrays
+    are memory-mapped if set by :func:`~mlens.config.set_mmap_mode`.
+    """
     with open(pickled(name), 'rb') as f:
+        prefix = f.read(len(_BUFFERS_PREFIX))
+        f.seek(0)
+        if prefix == _BUFFERS_PREFIX:
+            return _load_buffers(f, get_mmap_mode())
+        if _detect_compressor(f) in _COMPRESSORS:
+            with _read_fileobject(f, name) as fobj:
+                return pickle.load(fobj)
         return pickle.load(f)
 
 
 def load(file, enforce_filetype=True):
-    """Utility exception handler for loading file"""
-    s, lim = get_ivals()
+    """Utility exception handler for loading file
+
+    Cache entries are written atomically and tasks wait for entries being
+    written by concurrent tasks before loading them (see
+    :func:`mlens.parallel._base_functions.wait`), so a missing or unreadable
+    file is an error.
+    """
     if enforce_filetype:
         file = pickled(file)
     try:
         return pickle_load(file)
     except (EOFError, OSError, IOError) as exc:
-        msg = str(exc)
-        warnings.warn(
-            "Could not load transformer at %s. Will check every %.1f seconds "
-            "for %i seconds before aborting. " % (file, s, lim),
-            ParallelProcessingWarning)
-
-        ts = time()
-        while not os.path.exists(file):
-            sleep(s)
-            if time() - ts > lim:
-                raise ParallelProcessingError(
-                    "Could not load transformer at %s\nDetails:\n%r" %
-                    (dir, msg))
-
-        return pickle_load(file)
+        raise ParallelProcessingError(
+            "Could not load transformer at %s\nDetails:\n%r" % (file, exc))
 
 
 ###############################################################################